@@ -0,0 +1,291 @@
+"""Set-based upsert engine for the activities Excel import.
+
+Parsed spreadsheet rows are matched to existing activities by ``code`` with
+one prefetch query per batch (instead of one SELECT per row), split into
+inserts and updates in memory, and written with ``bulk_insert_mappings`` /
+``bulk_update_mappings``. Rows identical to the current activity are not
+written at all (rows matching the import ledger are not even loaded, see
+import_ledger), and a dry run only records the diff (see import_diff).
+Dashboard rollups are adjusted from the same in-memory snapshots.
+``import_activities()`` runs a whole upload in one transaction and needs only
+an app context (it is run by import_jobs).
+"""
+import time
+from types import SimpleNamespace
+
+from flask import current_app
+
+from data_versions import ACTIVITIES, bump_data_version
+from import_diff import INSERTED, SKIPPED, UNCHANGED, UPDATED, ImportDiff, changed_fields
+from import_mapping import ACTIVITY_FIELDS, frame_rows, iter_field_frames
+from models import Activity, db
+from portfolio_rollups import RollupDelta
+
+
+BATCH_SIZE = 500
+
+# Order of the values in a parsed activity row
+ACTIVITY_IMPORT_FIELDS = (
+    "code",
+    "initial_activity",
+    "proposed_activity",
+    "implementing_entity",
+    "delivery_partner",
+    "results_area",
+    "category",
+    "budget_year1",
+    "budget_year2",
+    "budget_year3",
+    "budget_total",
+    "budget_used",  # Year 1 copy kept for backward compatibility
+    "budget_used_year1",
+    "budget_used_year2",
+    "budget_used_year3",
+    "status",
+    "progress",
+    "notes",
+)
+
+# Imported columns other than the code, compared to detect no-op updates
+_COMPARED_FIELDS = ACTIVITY_IMPORT_FIELDS[1:]
+
+# Columns needed to diff an existing activity and undo its rollup contribution
+_SNAPSHOT_COLUMNS = (Activity.id,) + tuple(getattr(Activity, f) for f in ACTIVITY_IMPORT_FIELDS)
+
+
+def _activity_frame_rows(frame, diff=None):
+    """Derive the computed columns of a cleaned activity frame and return its rows.
+
+    Computed over whole columns: a sheet without per-year "budget used" values
+    puts its single "Budget used" figure in Year 1, progress is total used /
+    total budget, and imported rows start as "Planned". Rows without a code,
+    initial or proposed activity are dropped (and recorded as skipped in ``diff``).
+    """
+    used_columns = ["budget_used_year1", "budget_used_year2", "budget_used_year3"]
+    no_yearly_used = (frame[used_columns] == 0.0).all(axis=1)
+    frame.loc[no_yearly_used, "budget_used_year1"] = frame.loc[no_yearly_used, "budget_used"]
+    frame["budget_used"] = frame["budget_used_year1"]
+
+    total_used = frame[used_columns].sum(axis=1)
+    has_budget = frame["budget_total"] > 0
+    progress = (total_used / frame["budget_total"].where(has_budget) * 100).round()
+    frame["progress"] = progress.where(has_budget, 0).astype(int)
+    frame["status"] = "Planned"
+
+    keep = frame[["code", "initial_activity", "proposed_activity"]].notna().any(axis=1)
+    if diff is not None:
+        for _ in range(int((~keep).sum())):
+            diff.record(SKIPPED, None, reason="No code, initial or proposed activity")
+    frame = frame[keep]
+    return frame_rows(frame[list(ACTIVITY_IMPORT_FIELDS)])
+
+
+def iter_activity_rows(stream, filename, progress=None, diff=None):
+    """Stream an uploaded activities sheet as tuples ordered like ACTIVITY_IMPORT_FIELDS."""
+    for frame in iter_field_frames(stream, filename, ACTIVITY_FIELDS, progress=progress):
+        yield from _activity_frame_rows(frame, diff)
+
+
+class ActivityUpserter:
+    """Insert-or-update parsed activity rows by code, one batch at a time.
+
+    Usage:
+        upserter = ActivityUpserter()
+        upserter.add_rows(rows)    # dicts keyed by ACTIVITY_IMPORT_FIELDS
+        upserter.finish()          # flush the last batch + apply rollups
+        db.session.commit()
+
+    Matches the old row-by-row behaviour: rows without a code are always
+    inserted, a code that already exists updates the first activity with that
+    code, and a code repeated in the file updates the row created for it.
+    A row that would not change its activity is counted as ``unchanged`` and
+    not written. With ``dry_run`` nothing is written; ``diff`` still says
+    what would have been. With a ``ledger`` (import_ledger.RowLedger), coded
+    rows whose content hash matches it are counted as unchanged up front.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, dry_run=False, diff=None, ledger=None):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.diff = diff if diff is not None else ImportDiff()
+        self.ledger = ledger
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.batch_timings = []  # (rows, inserted, updated, seconds) per batch
+        self._rollups = RollupDelta()
+        self._known = {}  # code -> snapshot of the activity that code resolves to
+        self._pending = []
+
+    def add_rows(self, rows):
+        for row in rows:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+
+    def finish(self):
+        """Write any remaining rows and the accumulated rollup deltas (no commit)."""
+        self._flush()
+        if not self.dry_run:
+            self._rollups.apply()
+
+    @property
+    def elapsed(self):
+        return sum(t[3] for t in self.batch_timings)
+
+    def _prefetch(self, codes):
+        """Load snapshots for codes not seen yet, in one query."""
+        codes = [c for c in codes if c not in self._known]
+        if not codes:
+            return
+        rows = (
+            db.session.query(*_SNAPSHOT_COLUMNS)
+            .filter(Activity.code.in_(codes))
+            .order_by(Activity.id)
+            .all()
+        )
+        for row in rows:
+            # First (lowest id) activity wins, like query.filter_by(code=...).first()
+            self._known.setdefault(row.code, SimpleNamespace(**row._asdict()))
+
+    def _flush(self):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        started = time.perf_counter()
+        rows_in_batch = len(batch)
+        if self.ledger is not None:
+            self.ledger.prefetch({row["code"] for row in batch if row.get("code")})
+            fresh = []
+            for row in batch:
+                if row.get("code") and self.ledger.unchanged(row["code"], row.values()):
+                    self._unchanged(row["code"])
+                else:
+                    fresh.append(row)
+            batch = fresh
+        self._prefetch({row["code"] for row in batch if row.get("code")})
+
+        inserts = []
+        inserts_by_code = {}
+        updates = {}
+        for row in batch:
+            code = row.get("code")
+            new = SimpleNamespace(**row)
+            if code and code in inserts_by_code:
+                # Repeated code within this batch: last row wins
+                previous = inserts_by_code[code]
+                current = SimpleNamespace(**previous)
+                changes = changed_fields(current, row, _COMPARED_FIELDS)
+                self._record(code, row)
+                if not changes:
+                    self._unchanged(code)
+                    continue
+                self._rollups.remove(current)
+                previous.update(row)
+                self._rollups.add(new)
+                self.diff.record(UPDATED, code, changes)
+                self.updated += 1
+            elif code and code in self._known:
+                existing = self._known[code]
+                changes = changed_fields(existing, row, _COMPARED_FIELDS)
+                self._record(code, row)
+                if not changes:
+                    self._unchanged(code)
+                    continue
+                self._rollups.remove(existing)
+                self._rollups.add(new)
+                updates[existing.id] = dict(row, id=existing.id)
+                self._known[code] = SimpleNamespace(**row, id=existing.id)
+                self.diff.record(UPDATED, code, changes)
+                self.updated += 1
+            else:
+                mapping = dict(row)
+                inserts.append(mapping)
+                if code:
+                    inserts_by_code[code] = mapping
+                    self._record(code, row)
+                self._rollups.add(new)
+                self.diff.record(INSERTED, code)
+                self.created += 1
+
+        if self.dry_run:
+            # Nothing is written; later batches resolve these codes to the pending rows
+            for code, mapping in inserts_by_code.items():
+                self._known[code] = SimpleNamespace(**mapping, id=None)
+        else:
+            if inserts:
+                db.session.bulk_insert_mappings(Activity, inserts)
+            if updates:
+                db.session.bulk_update_mappings(Activity, list(updates.values()))
+            if inserts_by_code:
+                # Later batches may repeat these codes; remember what they resolve to
+                self._prefetch(inserts_by_code)
+
+        seconds = time.perf_counter() - started
+        self.batch_timings.append((rows_in_batch, len(inserts), len(updates), seconds))
+        current_app.logger.debug(
+            "Activity import batch %d%s: %d rows, %d inserted, %d updated in %.3fs",
+            len(self.batch_timings), " (dry run)" if self.dry_run else "",
+            rows_in_batch, len(inserts), len(updates), seconds,
+        )
+
+    def _unchanged(self, code):
+        self.diff.record(UNCHANGED, code)
+        self.unchanged += 1
+
+    def _record(self, code, row):
+        if self.ledger is not None:
+            self.ledger.record(code, row.values())
+
+
+def import_activities(stream, filename, progress=None, dry_run=False, ledger=None):
+    """Upsert every activity in an uploaded sheet and commit (``dry_run``: only diff).
+
+    ``progress(rows_read)`` is called after each chunk; ``ledger`` is an
+    import_ledger.RowLedger, saved with the import. Returns a dict with the
+    counts, the row-level ``diff`` and the user-facing ``message`` /
+    ``category``.
+    """
+    # Cells are read as text so codes like "act001" are preserved exactly
+    diff = ImportDiff()
+    upserter = ActivityUpserter(dry_run=dry_run, diff=diff, ledger=ledger)
+    upserter.add_rows(
+        dict(zip(ACTIVITY_IMPORT_FIELDS, row))
+        for row in iter_activity_rows(stream, filename, progress=progress, diff=diff)
+    )
+    upserter.finish()
+    created, updated, unchanged = upserter.created, upserter.updated, upserter.unchanged
+    result = {
+        "created": created,
+        "updated": updated,
+        "unchanged": unchanged,
+        "skipped": diff.counts[SKIPPED],
+        "diff": diff.as_dict(),
+    }
+
+    if dry_run:
+        db.session.rollback()
+        return dict(result, message=diff.summary("activities"), category="info")
+
+    if not (created or updated):
+        if ledger is not None:
+            ledger.save()
+        db.session.commit()
+        if unchanged:
+            message = f"No changes: all {unchanged} rows match the current activities."
+        else:
+            message = "No valid rows found in Excel file."
+        return dict(result, message=message, category="info")
+
+    bump_data_version(ACTIVITIES)
+    if ledger is not None:
+        ledger.save()
+    db.session.commit()
+    current_app.logger.debug(
+        "Activity import: %d created, %d updated, %d unchanged in %d batches (%.3fs)",
+        created, updated, unchanged, len(upserter.batch_timings), upserter.elapsed,
+    )
+    message = f"Imported {created} new activities, updated {updated} existing."
+    if unchanged:
+        message += f" {unchanged} unchanged rows were skipped."
+    return dict(result, message=message, category="success")
@@ -0,0 +1,213 @@
+"""Query builders for the activity dashboard and activity exports.
+
+Filtering, sorting and pagination are pushed into SQL so that the cost of a
+dashboard request depends on the page size rather than on the table size.
+"""
+from sqlalchemy import Float, Numeric, case, cast, func
+
+from cache_utils import VersionedCache
+from data_versions import ACTIVITIES, get_data_version
+from models import Activity, db
+from search_index import search_condition
+
+
+_filter_options_cache = VersionedCache(max_entries=4)
+
+
+def activity_filters_from_args(args):
+    """Read the multi-select dashboard filters and search term from request args."""
+    return {
+        "status_list": args.getlist("status"),
+        "entity_list": args.getlist("implementing_entity"),
+        "category_list": args.getlist("category"),
+        "results_list": args.getlist("results_area"),
+        "search_query": args.get("q", "") or "",
+    }
+
+
+def apply_activity_filters(query, status_list=None, entity_list=None, category_list=None,
+                           results_list=None, search_query=None):
+    """Apply the dashboard WHERE clauses (multi-select filters + search) to a query."""
+    if status_list:
+        query = query.filter(Activity.status.in_(status_list))
+    if entity_list:
+        query = query.filter(Activity.implementing_entity.in_(entity_list))
+    if category_list:
+        query = query.filter(Activity.category.in_(category_list))
+    if results_list:
+        query = query.filter(Activity.results_area.in_(results_list))
+    if search_query:
+        condition = search_condition(search_query, Activity)
+        if condition is not None:
+            query = query.filter(condition)
+    return query
+
+
+def num(column):
+    """Coalesce a Float column to 0 in SQL, treating NULL and (on Postgres) NaN/Infinity alike."""
+    if db.engine.dialect.name == "postgresql":
+        return case(
+            (column.in_([float("nan"), float("inf"), float("-inf")]), 0.0),
+            else_=func.coalesce(column, 0.0),
+        )
+    # SQLite stores NaN as NULL, so COALESCE is enough
+    return func.coalesce(column, 0.0)
+
+
+def total_budget_used_expr():
+    """SQL expression for the budget used across all years (NULLs count as 0)."""
+    return num(Activity.budget_used_year1) + num(Activity.budget_used_year2) + num(Activity.budget_used_year3)
+
+
+def exec_pct_expr():
+    """SQL expression for the budget execution percentage, rounded half away from zero.
+
+    ROUND on a Postgres double precision may round halves to even, so the
+    value is rounded as NUMERIC (SQLite already rounds halves away from zero);
+    portfolio_rollups.round_half_up() is the Python twin.
+    """
+    budget_total = num(Activity.budget_total)
+    return case(
+        (
+            budget_total > 0,
+            func.round(cast(total_budget_used_expr() * 100.0 / budget_total, Numeric), type_=Float),
+        ),
+        else_=0,
+    )
+
+
+def _lower_text(column):
+    return func.lower(func.coalesce(column, ""))
+
+
+# Sort keys accepted by the dashboard's ?sort= parameter
+ACTIVITY_SORT_KEYS = {
+    "category": lambda: _lower_text(Activity.category),
+    "proposed": lambda: _lower_text(Activity.proposed_activity),
+    "entity": lambda: _lower_text(Activity.implementing_entity),
+    "status": lambda: _lower_text(Activity.status),
+    "progress": exec_pct_expr,
+    "budget_total": lambda: num(Activity.budget_total),
+    "budget_used": total_budget_used_expr,
+}
+
+
+def activity_order_by(sort_col, order_dir="asc"):
+    """Return ORDER BY clauses for a dashboard sort column.
+
+    Ties are broken by activity code then id so that pages are stable.
+    """
+    key = ACTIVITY_SORT_KEYS.get(sort_col, ACTIVITY_SORT_KEYS["category"])()
+    primary = key.desc() if order_dir == "desc" else key.asc()
+    return [primary, Activity.code.asc(), Activity.id.asc()]
+
+
+def paginate_query(query, page, per_page):
+    """Run COUNT + LIMIT/OFFSET for a query and build the template pagination dict.
+
+    Returns a tuple ``(items, pagination)``; ``page`` is clamped to the valid range.
+    """
+    total_count = query.order_by(None).count()
+    total_pages = max(1, (total_count + per_page - 1) // per_page)
+    page = max(1, min(page, total_pages))
+    items = query.offset((page - 1) * per_page).limit(per_page).all()
+    pagination = {
+        "page": page,
+        "per_page": per_page,
+        "total_count": total_count,
+        "total_pages": total_pages,
+        "has_prev": page > 1,
+        "has_next": page < total_pages,
+    }
+    return items, pagination
+
+
+def _seek_condition(sort_key, id_column, value, anchor_id, forward, descending):
+    """WHERE clause for rows after (or before) the anchor row, with NULL sort values last."""
+    if value is None:
+        if forward:
+            return db.and_(sort_key.is_(None), id_column > anchor_id)
+        return db.or_(sort_key.isnot(None), id_column < anchor_id)
+    beyond = (sort_key < value) if descending == forward else (sort_key > value)
+    tie = (id_column > anchor_id) if forward else (id_column < anchor_id)
+    clause = db.or_(beyond, db.and_(sort_key == value, tie))
+    if forward:
+        clause = db.or_(clause, sort_key.is_(None))
+    return clause
+
+
+def keyset_paginate(query, sort_key, id_column, order_dir, page, per_page, after=None, before=None):
+    """Seek-paginate an unordered query on ``(sort_key, id)`` plus one COUNT query.
+
+    ``after`` / ``before`` are the ids of the last / first row of the
+    neighbouring page (``pagination["next_cursor"]`` / ``["prev_cursor"]``),
+    so Previous/Next never scan the skipped rows. Without a usable cursor
+    (first visit, numbered page link, anchor row gone) the page is read with
+    LIMIT/OFFSET. Returns ``(items, pagination)`` like paginate_query().
+    """
+    descending = order_dir == "desc"
+    total_count = query.count()
+    total_pages = max(1, (total_count + per_page - 1) // per_page)
+    page = max(1, min(page, total_pages))
+
+    anchor_id = after if after is not None else before
+    anchor = None
+    if anchor_id is not None:
+        anchor = query.with_entities(sort_key).filter(id_column == anchor_id).first()
+
+    if anchor is not None:
+        forward = after is not None
+        if forward == (not descending):
+            primary = sort_key.asc()
+        else:
+            primary = sort_key.desc()
+        primary = primary.nulls_last() if forward else primary.nulls_first()
+        tiebreak = id_column.asc() if forward else id_column.desc()
+        items = (
+            query.filter(_seek_condition(sort_key, id_column, anchor[0], anchor_id, forward, descending))
+            .order_by(primary, tiebreak)
+            .limit(per_page)
+            .all()
+        )
+        if not forward:
+            items.reverse()
+    else:
+        primary = (sort_key.desc() if descending else sort_key.asc()).nulls_last()
+        items = query.order_by(primary, id_column.asc()).offset((page - 1) * per_page).limit(per_page).all()
+
+    pagination = {
+        "page": page,
+        "per_page": per_page,
+        "total_count": total_count,
+        "total_pages": total_pages,
+        "has_prev": page > 1,
+        "has_next": page < total_pages,
+        "prev_cursor": items[0].id if items else None,
+        "next_cursor": items[-1].id if items else None,
+    }
+    return items, pagination
+
+
+def _distinct_values(column):
+    return sorted(
+        row[0]
+        for row in db.session.query(column).filter(column.isnot(None), column != "").distinct()
+    )
+
+
+def activity_filter_options():
+    """Distinct entities, categories, results areas and statuses for filter dropdowns.
+
+    Cached in-process and rebuilt only when the activities data version changes,
+    so repeated page views skip the SELECT DISTINCT round trips.
+    """
+    return _filter_options_cache.get_or_set(
+        "activity",
+        get_data_version(ACTIVITIES),
+        lambda: {
+            "entities": _distinct_values(Activity.implementing_entity),
+            "categories": _distinct_values(Activity.category),
+            "results_areas": _distinct_values(Activity.results_area),
+            "statuses": _distinct_values(Activity.status),
+        },
+    )
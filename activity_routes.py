@@ -1,22 +1,68 @@
 from collections import defaultdict
 from datetime import datetime
+import hashlib
+import json
 
 from flask import Blueprint, flash, redirect, render_template, request, url_for, session, Response, jsonify
-import tempfile
 import io
 
-import pandas as pd
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend
 import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 import plotly.io as pio
+from plotly.utils import PlotlyJSONEncoder
 from sqlalchemy import inspect, text
 from sqlalchemy.exc import ProgrammingError
 
+from activity_queries import (
+    activity_filter_options,
+    activity_filters_from_args,
+    activity_order_by,
+    apply_activity_filters,
+    keyset_paginate,
+    paginate_query,
+)
 from auth_routes import admin_required, login_required, ADMIN_EMAIL
+from dashboard_stats import dashboard_summary, summarize_groups
+from cache_utils import VersionedCache
+from csv_export import (
+    ACTIVITY_CSV_HEADER,
+    CHALLENGE_CSV_HEADER,
+    INDICATOR_CSV_HEADER,
+    activity_csv_rows,
+    activity_export_rows,
+    challenge_csv_rows,
+    indicator_csv_rows,
+    indicator_export_rows,
+    iter_csv,
+)
+from excel_export import XLSX_MIMETYPE, indicator_excel_rows, write_workbook
+from export_cache import cached_file, cached_stream
+from parquet_export import (
+    ACTIVITY_PARQUET_COLUMNS,
+    HAS_PYARROW,
+    INDICATOR_PARQUET_COLUMNS,
+    PARQUET_MIMETYPE,
+    write_parquet,
+)
+from challenge_import import claim_content_hash, pass_on_content_hash
+from data_versions import ACTIVITIES, CHALLENGES, INDICATORS, bump_data_version, get_data_version
 from functools import wraps
-from models import Activity, ActivityReport, Challenge, SubActivity, Indicator, db
+from import_jobs import enqueue_import, fail_stale_jobs, job_status
+from indicator_progress import calculate_indicator_progress, get_progress_status
+from indicator_queries import (
+    EMPTY_HISTOGRAM,
+    indicator_base_query,
+    indicator_list_summary,
+    indicator_sort_key,
+    indicator_status_histogram,
+    progress_summary_from_histogram,
+)
+from models import Activity, ActivityReport, Challenge, ImportJob, SubActivity, Indicator, db
+from portfolio_rollups import RollupDelta, clear_rollups
+from search_index import rank_search_results, search_condition
+from usage_rollups import usage_summary
 from usage_tracking import log_user_activity
 from report_utils import sanitize_report_html
 
@@ -34,89 +80,6 @@ def login_required_json(view_func):
     return wrapper
 
 
-def calculate_indicator_progress(indicator_type, actual, target, baseline):
-    """Calculate progress percentage for an indicator.
-    
-    For quantitative indicators: progress = (actual / target) * 100
-    For qualitative indicators: returns None (manual status selection)
-    
-    Returns:
-        float: Progress percentage (0-100) or None if cannot calculate
-    """
-    if not actual or not target:
-        return None
-    
-    if indicator_type != "Quantitative":
-        return None  # Qualitative indicators use manual status
-    
-    try:
-        actual_num = float(str(actual).strip())
-        target_num = float(str(target).strip())
-        
-        if target_num == 0:
-            # If target is 0, return 100 if actual is also 0, otherwise None
-            return 100.0 if actual_num == 0 else None
-        
-        progress = (actual_num / target_num) * 100
-        return min(100.0, max(0.0, progress))  # Clamp between 0-100
-    except (ValueError, TypeError):
-        return None
-
-
-def status_for_qualitative(stage):
-    """Map qualitative stage to dashboard status.
-    
-    Args:
-        stage: Qualitative stage string (e.g., "Not Started", "In Progress", "Completed", "Delayed")
-    
-    Returns:
-        str: "Not Started", "On Track", "At Risk", or "Behind"
-    """
-    if not stage:
-        return "Not Started"
-    
-    s = str(stage).strip().lower()
-    
-    if s in ("not started", "pending", "not started"):
-        return "Not Started"
-    if s in ("in progress", "ongoing", "started"):
-        return "At Risk"  # Default to At Risk for in-progress items
-    if s in ("completed", "done", "achieved", "finished"):
-        return "On Track"
-    if s in ("delayed", "blocked", "stalled", "behind"):
-        return "Behind"
-    
-    # Default fallback
-    return "Not Started"
-
-
-def get_progress_status(progress_pct, indicator_type, qualitative_stage=None):
-    """Determine status based on progress percentage or qualitative stage.
-    
-    Args:
-        progress_pct: Progress percentage (0-100) for quantitative indicators
-        indicator_type: "Quantitative" or "Qualitative"
-        qualitative_stage: Stage string for qualitative indicators (optional)
-    
-    Returns:
-        str: "On Track" (>=80%), "At Risk" (50-79%), "Behind" (<50%), or "Not Started" (None)
-    """
-    # For qualitative indicators, use the stage mapping
-    if indicator_type == "Qualitative":
-        return status_for_qualitative(qualitative_stage)
-    
-    # For quantitative indicators, use progress percentage
-    if progress_pct is None:
-        return "Not Started"
-    
-    if progress_pct >= 80:
-        return "On Track"
-    elif progress_pct >= 50:
-        return "At Risk"
-    else:
-        return "Behind"
-
-
 @activity_bp.route("/test")
 def test():
     """Minimal test route to check if app is working."""
@@ -149,481 +112,88 @@ def index():
         except (TypeError, ValueError):
             pass
 
-    # Start with absolute minimal setup
-    try:
-        # Try to get activities - if this fails, use empty list
-        try:
-            activities = Activity.query.options(db.joinedload(Activity.report)).order_by(Activity.code).all()
-            
-            # One-time migration: Sync budget_used_year1 from budget_used for existing records
-            # This handles records that existed before the new columns were added
-            # Note: We keep this migration for backward compatibility, but all calculations use year-specific fields
-            needs_commit = False
-            for a in activities:
-                if a and (not getattr(a, 'budget_used_year1', None) or getattr(a, 'budget_used_year1', None) == 0):
-                    budget_used = getattr(a, 'budget_used', None) or 0
-                    if budget_used and budget_used > 0:
-                        a.budget_used_year1 = budget_used
-                        needs_commit = True
-            
-            if needs_commit:
-                try:
-                    db.session.commit()
-                    print("Migrated budget_used to budget_used_year1 for existing records")
-                except Exception as e:
-                    print(f"Error migrating budget data: {e}")
-                    db.session.rollback()
-                    
-        except Exception as db_error:
-            import traceback
-            print(f"Database error: {db_error}")
-            print(traceback.format_exc())
-            activities = []
-        
-        # Get filters and search term - support multiple values
-        # Use getlist() to handle multiple checkbox selections
-        status_list = request.args.getlist("status")
-        entity_list = request.args.getlist("implementing_entity")
-        category_list = request.args.getlist("category")
-        results_list = request.args.getlist("results_area")
-        search_query = request.args.get("q", "") or ""
-
-        # For backward compatibility and display, also keep string versions (comma-separated)
-        status_filter = ",".join(status_list) if status_list else ""
-        entity_filter = ",".join(entity_list) if entity_list else ""
-        category_filter = ",".join(category_list) if category_list else ""
-        results_filter = ",".join(results_list) if results_list else ""
-
-        # Apply filters if provided
-        try:
-            if status_list:
-                activities = [a for a in activities if getattr(a, "status", None) in status_list]
-            if entity_list:
-                activities = [a for a in activities if getattr(a, "implementing_entity", None) in entity_list]
-            if category_list:
-                activities = [a for a in activities if getattr(a, "category", None) in category_list]
-            if results_list:
-                activities = [a for a in activities if getattr(a, "results_area", None) in results_list]
-            
-            if search_query:
-                q = search_query.lower()
-                filtered = []
-                for a in activities:
-                    if not a:
-                        continue
-                    # Search over a few key text fields
-                    fields = [
-                        getattr(a, "code", None),
-                        getattr(a, "initial_activity", None),
-                        getattr(a, "proposed_activity", None),
-                        getattr(a, "implementing_entity", None),
-                        getattr(a, "results_area", None),
-                        getattr(a, "category", None),
-                    ]
-                    combined = " ".join([str(f) for f in fields if f]) .lower()
-                    if q in combined:
-                        filtered.append(a)
-                activities = filtered
-        except Exception as e:
-            import traceback
-            print(f"Error applying filters: {e}")
-            print(traceback.format_exc())
-                
-    except Exception as e:
-        import traceback
-        print(f"Error in index route: {e}")
-        print(traceback.format_exc())
-        activities = []
-        status_filter = ""
-        entity_filter = ""
+    # Get filters and search term - support multiple values
+    # Use getlist() to handle multiple checkbox selections
+    filters = activity_filters_from_args(request.args)
+    status_list = filters["status_list"]
+    entity_list = filters["entity_list"]
+    category_list = filters["category_list"]
+    results_list = filters["results_list"]
+    search_query = filters["search_query"]
 
-    # Summary metrics computed in Python
-    try:
-        import math
-        
-        def safe_float(value, default=0.0):
-            """Safely convert value to float, handling None, NaN, and invalid values."""
-            if value is None:
-                return default
-            try:
-                if isinstance(value, float) and math.isnan(value):
-                    return default
-            except (TypeError, ValueError):
-                pass
-            try:
-                val = float(value)
-                if math.isnan(val) or math.isinf(val):
-                    return default
-                return val
-            except (ValueError, TypeError):
-                return default
-        
-        total_activities = len(activities) if activities else 0
-        
-        # Calculate budgets by year
-        total_budget_year1 = 0.0
-        total_budget_year2 = 0.0
-        total_budget_year3 = 0.0
-        total_budget = 0.0
-        
-        total_used_year1 = 0.0
-        total_used_year2 = 0.0
-        total_used_year3 = 0.0
-        total_used = 0.0
-        
-        for a in activities:
-            if a:
-                # Allocated budgets
-                budget_year1 = safe_float(getattr(a, 'budget_year1', None), 0.0)
-                budget_year2 = safe_float(getattr(a, 'budget_year2', None), 0.0)
-                budget_year3 = safe_float(getattr(a, 'budget_year3', None), 0.0)
-                budget_total = safe_float(getattr(a, 'budget_total', None), 0.0)
-                
-                total_budget_year1 += budget_year1
-                total_budget_year2 += budget_year2
-                total_budget_year3 += budget_year3
-                total_budget += budget_total
-                
-                # Used budgets
-                used_year1 = safe_float(getattr(a, 'budget_used_year1', None), 0.0)
-                used_year2 = safe_float(getattr(a, 'budget_used_year2', None), 0.0)
-                used_year3 = safe_float(getattr(a, 'budget_used_year3', None), 0.0)
-                
-                total_used_year1 += used_year1
-                total_used_year2 += used_year2
-                total_used_year3 += used_year3
-                total_used += (used_year1 + used_year2 + used_year3)
-        
-        # Calculate execution percentages
-        exec_pct_year1 = (total_used_year1 / total_budget_year1 * 100) if total_budget_year1 > 0 else 0.0
-        exec_pct_total = (total_used / total_budget * 100) if total_budget > 0 else 0.0
-        
-        # Calculate average progress
-        avg_progress = (
-            sum((a.progress or 0) for a in activities) / total_activities
-            if total_activities > 0
-            else 0
-        )
-        
-        summary = {
-            "total_activities": total_activities,
-            "total_budget": safe_float(total_budget, 0.0),
-            "total_used": safe_float(total_used, 0.0),
-            "total_budget_year1": safe_float(total_budget_year1, 0.0),
-            "total_used_year1": safe_float(total_used_year1, 0.0),
-            "exec_pct_year1": safe_float(exec_pct_year1, 0.0),
-            "exec_pct_total": safe_float(exec_pct_total, 0.0),
-            "avg_progress": avg_progress,
-        }
-    except Exception as e:
-        import traceback
-        print(f"Error computing summary: {e}")
-        print(traceback.format_exc())
-        summary = {
-            "total_activities": 0, 
-            "total_budget": 0, 
-            "total_used": 0, 
-            "total_budget_year1": 0,
-            "total_used_year1": 0,
-            "exec_pct_year1": 0.0,
-            "exec_pct_total": 0.0,
-            "avg_progress": 0
-        }
+    # For backward compatibility and display, also keep string versions (comma-separated)
+    status_filter = ",".join(status_list) if status_list else ""
+    entity_filter = ",".join(entity_list) if entity_list else ""
+    category_filter = ",".join(category_list) if category_list else ""
+    results_filter = ",".join(results_list) if results_list else ""
 
-    # Breakdown by status
+    # Pure read path: the legacy budget_used -> budget_used_year1 backfill now
+    # runs once as an Alembic data migration (see migrate_budget_used.py)
     try:
-        by_status = defaultdict(lambda: {"count": 0, "budget": 0.0})
-        for a in activities:
-            if a:
-                key = a.status or "Unknown"
-                by_status[key]["count"] += 1
-                by_status[key]["budget"] += a.budget_total or 0
-
-        status_rows = [
-            {"status": status, "count": data["count"], "budget": data["budget"]}
-            for status, data in sorted(by_status.items())
-        ]
+        # Filters and search are applied in SQL (same WHERE clause for the table and the summaries)
+        filtered_query = apply_activity_filters(Activity.query, **filters)
     except Exception as e:
         import traceback
-        print(f"Error computing status breakdown: {e}")
+        print(f"Error in index route: {e}")
         print(traceback.format_exc())
-        status_rows = []
+        filtered_query = None
 
-    # For filter dropdowns (distinct implementing_entity)
+    # Summary cards, status breakdown and budget execution by year all come
+    # from one GROUP BY over the same filters as the table
     try:
-        entities = [
-            row[0]
-            for row in db.session.query(Activity.implementing_entity)
-            .filter(
-                Activity.implementing_entity.isnot(None),
-                Activity.implementing_entity != "",
-            )
-            .distinct()
-            .order_by(Activity.implementing_entity)
-            .all()
-        ]
+        stats = dashboard_summary(**filters)
     except Exception as e:
-        # If query fails, get entities from activities list
         import traceback
-        print(f"Error fetching entities: {e}")
+        print(f"Error computing dashboard summary: {e}")
         print(traceback.format_exc())
-        entities = list(set([a.implementing_entity for a in activities if a.implementing_entity]))
-        entities.sort()
+        stats = summarize_groups([])
+    summary = stats["summary"]
+    status_rows = stats["status_rows"]
+    budget_execution_by_year = stats["budget_execution_by_year"]
+    budget_execution_total = stats["budget_execution_total"]
 
-    # Compute per-activity budget execution percentage and overall summary safely
+    # Filter dropdown options (cached per process until activities change)
     try:
-        # Attach a computed execution percentage and total budget used to each activity
-        for a in activities or []:
-            try:
-                total = getattr(a, "budget_total", None) or 0
-                # Calculate total used from all years - use only year-specific fields
-                used_year1 = getattr(a, "budget_used_year1", None) or 0
-                used_year2 = getattr(a, "budget_used_year2", None) or 0
-                used_year3 = getattr(a, "budget_used_year3", None) or 0
-                used = used_year1 + used_year2 + used_year3
-                a.exec_pct = round((used / total) * 100) if total > 0 else 0
-                # Store total budget used (sum of all years) for display
-                a.total_budget_used = used
-            except Exception:
-                a.exec_pct = 0
-                a.total_budget_used = 0
-
-        # Sort activities by selected column (after exec_pct is attached)
-        _rev = order_dir == "desc"
-        def _key_category(a):
-            return (getattr(a, "category", None) or "").lower()
-        def _key_proposed(a):
-            return (getattr(a, "proposed_activity", None) or "").lower()
-        def _key_entity(a):
-            return (getattr(a, "implementing_entity", None) or "").lower()
-        def _key_status(a):
-            return (getattr(a, "status", None) or "").lower()
-        def _key_progress(a):
-            return getattr(a, "exec_pct", 0) or 0
-        def _key_budget_total(a):
-            return float(getattr(a, "budget_total", None) or 0)
-        def _key_budget_used(a):
-            return float(getattr(a, "total_budget_used", None) or 0)
-        _sort_keys = {
-            "category": _key_category,
-            "proposed": _key_proposed,
-            "entity": _key_entity,
-            "status": _key_status,
-            "progress": _key_progress,
-            "budget_total": _key_budget_total,
-            "budget_used": _key_budget_used,
-        }
-        key_fn = _sort_keys.get(sort_col, _key_category)
-        try:
-            activities = sorted(activities, key=key_fn, reverse=_rev)
-        except Exception:
-            pass
-
-        total_activities = len(activities) if activities else 0
-        total_budget = sum((getattr(a, "budget_total", None) or 0) for a in activities) if activities else 0
-        # Calculate total_used from all years - use only year-specific fields
-        total_used = sum(
-            (getattr(a, 'budget_used_year1', None) or 0) + 
-            (getattr(a, 'budget_used_year2', None) or 0) + 
-            (getattr(a, 'budget_used_year3', None) or 0)
-            for a in activities
-        ) if activities else 0
-        # Average progress now reflects average budget execution percentage
-        avg_progress = (
-            sum((getattr(a, "exec_pct", 0) or 0) for a in activities) / total_activities
-            if total_activities > 0
-            else 0
-        )
-        summary = {
-            "total_activities": total_activities,
-            "total_budget": total_budget,
-            "total_used": total_used,
-            "avg_progress": avg_progress,
-        }
+        options = activity_filter_options()
+        entities = options["entities"]
+        categories = options["categories"]
+        results_areas = options["results_areas"]
     except Exception as e:
         import traceback
-        print(f"Error computing summary: {e}")
+        print(f"Error fetching filter options: {e}")
         print(traceback.format_exc())
-        summary = {
-            "total_activities": 0, 
-            "total_budget": 0, 
-            "total_used": 0, 
-            "total_budget_year1": 0,
-            "total_used_year1": 0,
-            "exec_pct_year1": 0.0,
-            "exec_pct_total": 0.0,
-            "avg_progress": 0
-        }
+        entities, categories, results_areas = [], [], []
 
-    # Status breakdown
+    # Pagination: ORDER BY + LIMIT/OFFSET in SQL (summary/status/budget aggregate the full filtered set above)
     try:
-        by_status = {}
+        if filtered_query is None:
+            raise ValueError("activity query unavailable")
+        page_query = filtered_query.options(db.joinedload(Activity.report))
+        order_by = activity_order_by(sort_col, order_dir)
+        if search_query and not request.args.get("sort"):
+            # Searching without an explicit sort: best matches first
+            page_query, rank = rank_search_results(page_query, search_query, Activity)
+            if rank is not None:
+                order_by = [rank.desc()] + order_by
+        activities, pagination = paginate_query(page_query.order_by(*order_by), page, per_page)
         for a in activities:
-            if a:
-                key = getattr(a, 'status', None) or "Unknown"
-                if key not in by_status:
-                    by_status[key] = {"count": 0, "budget": 0.0}
-                by_status[key]["count"] += 1
-                by_status[key]["budget"] += getattr(a, 'budget_total', None) or 0
-        status_rows = [{"status": k, "count": v["count"], "budget": v["budget"]} for k, v in sorted(by_status.items())]
+            used = (a.budget_used_year1 or 0) + (a.budget_used_year2 or 0) + (a.budget_used_year3 or 0)
+            total = a.budget_total or 0
+            a.exec_pct = round((used / total) * 100) if total > 0 else 0
+            a.total_budget_used = used
     except Exception as e:
         import traceback
-        print(f"Error computing status breakdown: {e}")
+        print(f"Error loading activities page: {e}")
         print(traceback.format_exc())
-        status_rows = []
-
-    # Budget execution by year - use filtered activities so filters affect the calculation
-    try:
-        import math
-        # Use the filtered activities list (same as what's displayed in the table)
-        # This ensures budget execution by year reflects the current filters
-        
-        budget_by_year = {
-            "year1": {"allocated": 0.0, "used": 0.0, "execution_pct": 0.0},
-            "year2": {"allocated": 0.0, "used": 0.0, "execution_pct": 0.0},
-            "year3": {"allocated": 0.0, "used": 0.0, "execution_pct": 0.0},
-        }
-        
-        def safe_float(value, default=0.0):
-            """Safely convert value to float, handling None, NaN, and invalid values."""
-            if value is None:
-                return default
-            # Check if value is already NaN (can happen when reading from database)
-            try:
-                if isinstance(value, float) and math.isnan(value):
-                    return default
-            except (TypeError, ValueError):
-                pass
-            try:
-                val = float(value)
-                if math.isnan(val) or math.isinf(val):
-                    return default
-                return val
-            except (ValueError, TypeError):
-                return default
-        
-        for a in activities:
-            if a:
-                budget_year1 = safe_float(getattr(a, 'budget_year1', None), 0.0)
-                budget_year2 = safe_float(getattr(a, 'budget_year2', None), 0.0)
-                budget_year3 = safe_float(getattr(a, 'budget_year3', None), 0.0)
-                
-                # Get actual used budgets per year (new fields)
-                budget_used_year1 = safe_float(getattr(a, 'budget_used_year1', None), 0.0)
-                budget_used_year2 = safe_float(getattr(a, 'budget_used_year2', None), 0.0)
-                budget_used_year3 = safe_float(getattr(a, 'budget_used_year3', None), 0.0)
-                
-                # Sum allocated budgets by year
-                budget_by_year["year1"]["allocated"] += budget_year1
-                budget_by_year["year2"]["allocated"] += budget_year2
-                budget_by_year["year3"]["allocated"] += budget_year3
-                
-                # Sum actual used budgets by year
-                budget_by_year["year1"]["used"] += budget_used_year1
-                budget_by_year["year2"]["used"] += budget_used_year2
-                budget_by_year["year3"]["used"] += budget_used_year3
-        
-        # Calculate execution percentages and ensure no NaN values
-        for year_data in budget_by_year.values():
-            allocated = safe_float(year_data["allocated"], 0.0)
-            used = safe_float(year_data["used"], 0.0)
-            
-            # Ensure allocated and used are valid before calculation
-            allocated = max(0.0, allocated)  # Ensure non-negative
-            used = max(0.0, used)  # Ensure non-negative
-            
-            if allocated > 0:
-                execution_pct = (used / allocated) * 100
-                year_data["execution_pct"] = safe_float(execution_pct, 0.0)
-            else:
-                year_data["execution_pct"] = 0.0
-            
-            # Final validation - ensure all values are valid numbers and not NaN
-            year_data["allocated"] = safe_float(allocated, 0.0)
-            year_data["used"] = safe_float(used, 0.0)
-            year_data["execution_pct"] = safe_float(year_data["execution_pct"], 0.0)
-            
-            # Double-check: if any value is still NaN, force to 0
-            if math.isnan(year_data["allocated"]):
-                year_data["allocated"] = 0.0
-            if math.isnan(year_data["used"]):
-                year_data["used"] = 0.0
-            if math.isnan(year_data["execution_pct"]):
-                year_data["execution_pct"] = 0.0
-        
-        # Calculate execution percentages for each year (non-cumulative)
-        year1_allocated = safe_float(budget_by_year["year1"]["allocated"], 0.0)
-        year1_used = safe_float(budget_by_year["year1"]["used"], 0.0)
-        year1_exec_pct = (year1_used / year1_allocated * 100) if year1_allocated > 0 else 0.0
-        
-        year2_allocated = safe_float(budget_by_year["year2"]["allocated"], 0.0)
-        year2_used = safe_float(budget_by_year["year2"]["used"], 0.0)
-        year2_exec_pct = (year2_used / year2_allocated * 100) if year2_allocated > 0 else 0.0
-        
-        year3_allocated = safe_float(budget_by_year["year3"]["allocated"], 0.0)
-        year3_used = safe_float(budget_by_year["year3"]["used"], 0.0)
-        year3_exec_pct = (year3_used / year3_allocated * 100) if year3_allocated > 0 else 0.0
-        
-        # Calculate totals across all years
-        total_allocated = year1_allocated + year2_allocated + year3_allocated
-        total_used = year1_used + year2_used + year3_used
-        total_exec_pct = (total_used / total_allocated * 100) if total_allocated > 0 else 0.0
-        
-        budget_execution_by_year = [
-            {"year": "Year 1", "allocated": safe_float(year1_allocated, 0.0), 
-             "used": safe_float(year1_used, 0.0), 
-             "execution_pct": safe_float(year1_exec_pct, 0.0)},
-            {"year": "Year 2", "allocated": safe_float(year2_allocated, 0.0), 
-             "used": safe_float(year2_used, 0.0), 
-             "execution_pct": safe_float(year2_exec_pct, 0.0)},
-            {"year": "Year 3", "allocated": safe_float(year3_allocated, 0.0), 
-             "used": safe_float(year3_used, 0.0), 
-             "execution_pct": safe_float(year3_exec_pct, 0.0)},
-        ]
-        
-        budget_execution_total = {
-            "allocated": safe_float(total_allocated, 0.0),
-            "used": safe_float(total_used, 0.0),
-            "execution_pct": safe_float(total_exec_pct, 0.0)
+        activities = []
+        pagination = {
+            "page": 1,
+            "per_page": per_page,
+            "total_count": 0,
+            "total_pages": 1,
+            "has_prev": False,
+            "has_next": False,
         }
-    except Exception as e:
-        import traceback
-        print(f"Error computing budget execution by year: {e}")
-        print(traceback.format_exc())
-        budget_execution_by_year = []
-        budget_execution_total = {"allocated": 0.0, "used": 0.0, "execution_pct": 0.0}
-
-    # Entities for filter
-    try:
-        entities = sorted(list(set([getattr(a, 'implementing_entity', None) for a in activities if getattr(a, 'implementing_entity', None)])))
-    except:
-        entities = []
-
-    # Categories (activity type) for filter
-    try:
-        categories = sorted(list(set([getattr(a, 'category', None) for a in activities if getattr(a, 'category', None)])))
-    except:
-        categories = []
-
-    # Results areas for filter
-    try:
-        results_areas = sorted(list(set([getattr(a, 'results_area', None) for a in activities if getattr(a, 'results_area', None)])))
-    except:
-        results_areas = []
-
-    # Pagination: slice activities for current page (summary/status/budget use full list above)
-    total_count = len(activities) if activities else 0
-    total_pages = max(1, (total_count + per_page - 1) // per_page)
-    page = max(1, min(page, total_pages))
-    activities = (activities or [])[(page - 1) * per_page : page * per_page]
-    pagination = {
-        "page": page,
-        "per_page": per_page,
-        "total_count": total_count,
-        "total_pages": total_pages,
-        "has_prev": page > 1,
-        "has_next": page < total_pages,
-    }
     pager_preserve = {
         "q": request.args.get("q") or "",
         "status": request.args.getlist("status"),
@@ -786,6 +356,10 @@ def new_activity():
             end_date=end_date,
         )
         db.session.add(activity)
+        rollups = RollupDelta()
+        rollups.add(activity)
+        rollups.apply()
+        bump_data_version(ACTIVITIES)
         db.session.commit()
         log_user_activity("create_activity", resource_type="activity", resource_id=activity.id)
         flash("Activity created successfully", "success")
@@ -803,17 +377,12 @@ def edit_activity(activity_id):
         flash("Activity not found", "error")
         return redirect(url_for("activity.index"))
     
-    # Sync budget_used_year1 from budget_used if budget_used_year1 is 0 or None
-    # This handles existing records that haven't been migrated yet
-    # Note: We keep this migration for backward compatibility, but all calculations use year-specific fields
-    if activity and (not activity.budget_used_year1 or activity.budget_used_year1 == 0):
-        if activity.budget_used and activity.budget_used > 0:
-            activity.budget_used_year1 = activity.budget_used
-            db.session.commit()
-
     if request.method == "POST":
         # Check if user is super admin (only super admin can edit budget/cost fields)
         is_super_admin = session.get("email") and session.get("email").lower() == ADMIN_EMAIL.lower()
+        # Take the activity's current share out of the dashboard rollups before editing it
+        rollups = RollupDelta()
+        rollups.remove(activity)
         
         data = {
             "code": request.form.get("code") or None,
@@ -886,6 +455,9 @@ def edit_activity(activity_id):
         total_budget_used = budget_used_year1 + budget_used_year2 + budget_used_year3
         activity.progress = int(round((total_budget_used / budget_total) * 100)) if budget_total > 0 else 0
 
+        rollups.add(activity)
+        rollups.apply()
+        bump_data_version(ACTIVITIES)
         db.session.commit()
         log_user_activity("edit_activity", resource_type="activity", resource_id=activity_id)
         flash("Activity updated successfully", "success")
@@ -939,7 +511,9 @@ def add_challenge():
                 timeline=timeline or None,
             )
         
+        claim_content_hash(ch)
         db.session.add(ch)
+        bump_data_version(CHALLENGES)
         db.session.commit()
         flash("Challenge added.", "success")
 
@@ -994,44 +568,9 @@ def challenges_page():
 @activity_bp.route("/challenges/download", methods=["GET"])
 @login_required
 def download_challenges():
-    """Download all challenges as a CSV file."""
-    # Build CSV in memory
-    import csv
-    import io
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(
-        [
-            "challenge",
-            "action",
-            "responsible",
-            "timeline",
-            "status",
-        ]
-    )
-
-    rows = Challenge.query.order_by(Challenge.id).all()
-    for c in rows:
-        writer.writerow(
-            [
-                c.challenge or "",
-                c.action or "",
-                c.responsible or "",
-                c.timeline or "",
-                c.status or "",
-            ]
-        )
-
-    from flask import Response
-
-    output.seek(0)
-    return Response(
-        output.read(),
-        mimetype="text/csv",
-        headers={
-            "Content-Disposition": "attachment; filename=challenges.csv",
-        },
+    """Download all challenges as a CSV file (streamed)."""
+    return cached_stream(
+        "challenges.csv", "text/csv", (CHALLENGES,), iter_csv(CHALLENGE_CSV_HEADER, challenge_csv_rows())
     )
 
 
@@ -1053,88 +592,8 @@ def upload_challenges():
         flash("Please upload an Excel file (.xlsx or .xls) for challenges.", "error")
         return redirect(url_for("activity.challenges_page"))
 
-    try:
-        # Save to a temporary file so pandas can read it
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            file.save(tmp.name)
-            import pandas as pd  # local import in case global changes
-
-            df = pd.read_excel(tmp.name, dtype=str)
-
-        # Normalise column names
-        columns = list(df.columns)
-        lower_map = {str(c).strip().lower(): c for c in columns}
-
-        def get_val(row, *names):
-            for n in names:
-                key = str(n).strip().lower()
-                col = lower_map.get(key)
-                if not col:
-                    # fallback: partial match
-                    for c in columns:
-                        if key in str(c).strip().lower():
-                            col = c
-                            break
-                if col and col in row:
-                    val = row[col]
-                    if isinstance(val, str):
-                        val = val.strip()
-                    if val not in (None, "", "nan"):
-                        return str(val)
-            return None
-
-        created = 0
-        updated = 0
-        for _, row in df.iterrows():
-            challenge_text = get_val(row, "challenge")
-            action_text = get_val(row, "action", "agreed action")
-            responsible = get_val(row, "responsible")
-            timeline = get_val(row, "timeline")
-            status = (get_val(row, "status") or "pending").strip().lower()
-
-            if not challenge_text or not action_text:
-                continue
-
-            if status not in ["pending", "completed", "canceled"]:
-                status = "pending"
-
-            # Use challenge + action as a simple uniqueness key for updating
-            existing = (
-                Challenge.query.filter_by(challenge=challenge_text, action=action_text).first()
-            )
-            if existing:
-                existing.responsible = responsible or None
-                existing.timeline = timeline or None
-                existing.status = status
-                updated += 1
-            else:
-                ch = Challenge(
-                    challenge=challenge_text,
-                    action=action_text,
-                    responsible=responsible or None,
-                    timeline=timeline or None,
-                    status=status,
-                )
-                db.session.add(ch)
-                created += 1
-
-        db.session.commit()
-        if created or updated:
-            flash(
-                f"Challenges import complete. Created {created}, updated {updated}.",
-                "success",
-            )
-        else:
-            flash("No valid challenge rows found in the uploaded file.", "info")
-    except Exception as exc:  # pylint: disable=broad-except
-        import traceback
-
-        print(f"Error reading challenges file: {exc}")
-        print(traceback.format_exc())
-        db.session.rollback()
-        flash(f"Error reading challenges file: {exc}", "error")
-
-    return redirect(url_for("activity.challenges_page"))
+    job = enqueue_import("challenges", file.filename, file.read(), session.get("user_id"))
+    return _import_started_response(job, "activity.challenges_page")
 
 
 @activity_bp.route("/challenges/<int:challenge_id>/edit", methods=["GET", "POST"])
@@ -1145,6 +604,7 @@ def edit_challenge(challenge_id):
     
     if request.method == "POST":
         try:
+            previous_pair = (challenge.challenge, challenge.action)
             challenge.challenge = (request.form.get("challenge") or "").strip()
             challenge.action = (request.form.get("action") or "").strip()
             challenge.responsible = (request.form.get("responsible") or "").strip() or None
@@ -1159,7 +619,16 @@ def edit_challenge(challenge_id):
             if status not in ["pending", "completed", "canceled"]:
                 status = "pending"
             challenge.status = status
+
+            if (challenge.challenge, challenge.action) != previous_pair:
+                # Keep the import's content hash on the first row of each pair
+                held_hash = challenge.content_hash is not None
+                claim_content_hash(challenge)
+                if held_hash:
+                    db.session.flush()
+                    pass_on_content_hash(*previous_pair)
             
+            bump_data_version(CHALLENGES)
             db.session.commit()
             flash("Challenge updated.", "success")
             return redirect(request.form.get("next") or url_for("activity.challenges_page"))
@@ -1187,7 +656,13 @@ def delete_challenge(challenge_id):
     
     challenge = Challenge.query.get(challenge_id)
     if challenge:
+        previous_pair = (challenge.challenge, challenge.action)
+        held_hash = challenge.content_hash is not None
         db.session.delete(challenge)
+        if held_hash:
+            db.session.flush()
+            pass_on_content_hash(*previous_pair)
+        bump_data_version(CHALLENGES)
         db.session.commit()
         flash("Challenge deleted.", "info")
     else:
@@ -1205,7 +680,11 @@ def delete_activity(activity_id):
 
     activity = Activity.query.get(activity_id)
     if activity:
+        rollups = RollupDelta()
+        rollups.remove(activity)
         db.session.delete(activity)
+        rollups.apply()
+        bump_data_version(ACTIVITIES)
         db.session.commit()
         log_user_activity("delete_activity", resource_type="activity", resource_id=activity_id)
         flash("Activity deleted", "info")
@@ -1224,6 +703,8 @@ def delete_all_activities():
         return redirect(url_for("activity.index"))
 
     Activity.query.delete()
+    clear_rollups()
+    bump_data_version(ACTIVITIES)
     db.session.commit()
     flash("All activities have been deleted.", "info")
     return redirect(url_for("activity.index"))
@@ -1430,6 +911,34 @@ def delete_subactivity(sub_id):
         return redirect(url_for("activity.index"))
 
 
+def _import_started_response(job, endpoint):
+    """Answer an upload once its import job is queued.
+
+    Browsers are redirected back to ``endpoint`` with ``?import_job=<id>`` (the
+    page polls the job's progress); JSON clients get 202 with the status URL.
+    """
+    status_url = url_for("activity.import_job_status", job_id=job.id)
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify({"job_id": job.id, "status": job.status, "status_url": status_url}), 202
+    what = "Dry run" if job.dry_run else "Import"
+    flash(f"{what} started (job #{job.id}). You can keep working while it runs.", "info")
+    return redirect(url_for(endpoint, import_job=job.id))
+
+
+@activity_bp.route("/imports/<int:job_id>", methods=["GET"])
+@login_required_json
+def import_job_status(job_id):
+    """Progress of a background import job as JSON (polled by the upload pages)."""
+    job = db.session.get(ImportJob, job_id)
+    if job is None:
+        return jsonify({"error": "Import job not found"}), 404
+    if job.status in ("queued", "running") and fail_stale_jobs(job.kind):
+        db.session.commit()
+    response = jsonify(job_status(job))
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
 @activity_bp.route("/upload", methods=["POST"])
 @admin_required
 def upload_excel():
@@ -1448,303 +957,49 @@ def upload_excel():
         flash("Please upload an Excel file (.xlsx or .xls).", "error")
         return redirect(url_for("activity.index"))
 
-    try:
-        # Save to a temporary file so pandas can read it
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            file.save(tmp.name)
-            # Read as text so codes like "act001" are preserved exactly
-            df = pd.read_excel(tmp.name, dtype=str)
-
-        # Build a helper map so we can match column names case-insensitively
-        columns = list(df.columns)
-        lower_map = {str(c).strip().lower(): c for c in columns}
-
-        # Expected column names based on your sheet
-        def get_val(row, *names):
-            for n in names:
-                key = str(n).strip().lower()
-                col = lower_map.get(key)
-                if not col:
-                    # fallback: try partial match like anything containing the key
-                    for c in columns:
-                        if key in str(c).strip().lower():
-                            col = c
-                            break
-                if col and col in row:
-                    val = row[col]
-                    if isinstance(val, str):
-                        val = val.strip()
-                    if val not in (None, "", "nan", ""):
-                        return str(val)
-            return None
-
-        rows_to_insert = []
-        for _, row in df.iterrows():
-            code = get_val(row, "code", "code_new_improved_noch")
-            initial_activity = get_val(row, "Initial activities", "Initial Activity")
-            proposed_activity = get_val(row, "New Proposed Project Activity", "Proposed Activity")
-            implementing_entity = get_val(row, "IE in charge of impl", "Implementing Entity")
-            delivery_partner = get_val(row, "Delivery partner")
-            results_area = get_val(row, "results_area", "Results Area")
-            category = get_val(row, "sr_category", "Category")
-            notes = get_val(row, "Notes", "Note", "Comments")
-
-            def get_num(row, *names):
-                for n in names:
-                    key = str(n).strip().lower()
-                    col = lower_map.get(key)
-                    if col and col in row and row[col] not in (None, "", "nan"):
-                        try:
-                            return float(row[col])
-                        except ValueError:
-                            continue
-                return 0.0
-
-            budget_year1 = get_num(row, "Sum of adjusted_bdg_year1", "Budget Y1", "budget_year1")
-            budget_year2 = get_num(row, "Sum of adjusted_bdg_year2", "Budget Y2", "budget_year2")
-            budget_year3 = get_num(row, "Sum of adjusted_bdg_year3", "Budget Y3", "budget_year3")
-            budget_total = get_num(row, "Sum of TOTAL", "Total Budget", "budget_total")
-            
-            # Try to read year-specific budget used columns first
-            budget_used_year1 = get_num(row, "Budget Used Year 1", "budget_used_year1", "Budget used Year 1")
-            budget_used_year2 = get_num(row, "Budget Used Year 2", "budget_used_year2", "Budget used Year 2")
-            budget_used_year3 = get_num(row, "Budget Used Year 3", "budget_used_year3", "Budget used Year 3")
-            
-            # If year-specific columns are not found, fall back to "Budget used" for year 1 (backward compatibility)
-            if budget_used_year1 == 0.0 and budget_used_year2 == 0.0 and budget_used_year3 == 0.0:
-                budget_used_from_file = get_num(row, "Budget used", "Budget Used", "budget_used")
-                budget_used_year1 = budget_used_from_file
-                budget_used_year2 = 0.0
-                budget_used_year3 = 0.0
-
-            # Default status and progress for imported rows
-            status = "Planned"
-            # Calculate progress from total budget used (all years) and budget_total
-            total_budget_used = budget_used_year1 + budget_used_year2 + budget_used_year3
-            progress = int(round((total_budget_used / budget_total) * 100)) if budget_total > 0 else 0
-
-            # Skip completely empty rows
-            if not any([code, initial_activity, proposed_activity]):
-                continue
-
-            rows_to_insert.append(
-                (
-                    code,
-                    initial_activity,
-                    proposed_activity,
-                    implementing_entity,
-                    delivery_partner,
-                    results_area,
-                    category,
-                    budget_year1,
-                    budget_year2,
-                    budget_year3,
-                    budget_total,
-                    budget_used_year1,  # Use year1 for backward compatibility
-                    budget_used_year1,
-                    budget_used_year2,
-                    budget_used_year3,
-                    status,
-                    progress,
-                    notes,
-                )
-            )
-
-        if rows_to_insert:
-            created = 0
-            updated = 0
-            for row in rows_to_insert:
-                (
-                    code,
-                    initial_activity,
-                    proposed_activity,
-                    implementing_entity,
-                    delivery_partner,
-                    results_area,
-                    category,
-                    budget_year1,
-                    budget_year2,
-                    budget_year3,
-                    budget_total,
-                    budget_used,  # This is budget_used_year1 for backward compatibility
-                    budget_used_year1,
-                    budget_used_year2,
-                    budget_used_year3,
-                    status,
-                    progress,
-                    notes,
-                ) = row
-
-                existing = None
-                if code:
-                    existing = Activity.query.filter_by(code=code).first()
-                if existing:
-                    # Update existing record - use only year-specific fields for calculations
-                    existing.initial_activity = initial_activity
-                    existing.proposed_activity = proposed_activity
-                    existing.implementing_entity = implementing_entity
-                    existing.delivery_partner = delivery_partner
-                    existing.results_area = results_area
-                    existing.category = category
-                    existing.budget_year1 = budget_year1
-                    existing.budget_year2 = budget_year2
-                    existing.budget_year3 = budget_year3
-                    existing.budget_total = budget_total
-                    existing.budget_used = budget_used_year1  # Keep for backward compatibility only
-                    existing.budget_used_year1 = budget_used_year1
-                    existing.budget_used_year2 = budget_used_year2
-                    existing.budget_used_year3 = budget_used_year3
-                    existing.status = status
-                    existing.progress = progress
-                    existing.notes = notes
-                    updated += 1
-                else:
-                    activity = Activity(
-                        code=code,
-                        initial_activity=initial_activity,
-                        proposed_activity=proposed_activity,
-                        implementing_entity=implementing_entity,
-                        delivery_partner=delivery_partner,
-                        results_area=results_area,
-                        category=category,
-                        budget_year1=budget_year1,
-                        budget_year2=budget_year2,
-                        budget_year3=budget_year3,
-                        budget_total=budget_total,
-                        budget_used=budget_used_year1,  # Keep for backward compatibility only
-                        budget_used_year1=budget_used_year1,
-                        budget_used_year2=budget_used_year2,
-                        budget_used_year3=budget_used_year3,
-                        status=status,
-                        progress=progress,
-                        notes=notes,
-                    )
-                    db.session.add(activity)
-                    created += 1
+    # Parsing and writing happen in the background (see import_jobs)
+    job = enqueue_import(
+        "activities", file.filename, file.read(), session.get("user_id"),
+        dry_run=request.form.get("dry_run") == "1",
+    )
+    return _import_started_response(job, "activity.index")
 
-            db.session.commit()
-            flash(f"Imported {created} new activities, updated {updated} existing.", "success")
-        else:
-            flash("No valid rows found in Excel file.", "info")
-    except Exception as exc:  # pylint: disable=broad-except
-        flash(f"Error reading Excel file: {exc}", "error")
 
-    return redirect(url_for("activity.index"))
+def _parquet_download(filename, columns, rows, versions, fallback_endpoint):
+    """Parquet attachment (cached), or an error flash and redirect when pyarrow is not installed."""
+    if not HAS_PYARROW:
+        flash("Parquet export is not available on this server (pyarrow is not installed).", "error")
+        return redirect(url_for(fallback_endpoint))
+    return cached_file(filename, PARQUET_MIMETYPE, versions, lambda out: write_parquet(out, columns, rows))
 
 
 @activity_bp.route("/download", methods=["GET"])
 @login_required
 def download_activities():
-    """Download all (filtered) activities as a CSV file."""
-    log_user_activity("download_csv", resource_type="activities")
-    # Support multiple filter values (from multi-select)
-    status_list = request.args.getlist("status")
-    entity_list = request.args.getlist("implementing_entity")
-    category_list = request.args.getlist("category")
-    results_list = request.args.getlist("results_area")
-    search_query = request.args.get("q", "") or ""
-
-    query = Activity.query
-    
-    # Apply filters
-    if status_list:
-        query = query.filter(Activity.status.in_(status_list))
-    if entity_list:
-        query = query.filter(Activity.implementing_entity.in_(entity_list))
-    if category_list:
-        query = query.filter(Activity.category.in_(category_list))
-    if results_list:
-        query = query.filter(Activity.results_area.in_(results_list))
-    
-    # Apply search query
-    if search_query:
-        search_term = f"%{search_query}%"
-        query = query.filter(
-            db.or_(
-                Activity.code.ilike(search_term),
-                Activity.initial_activity.ilike(search_term),
-                Activity.proposed_activity.ilike(search_term),
-                Activity.implementing_entity.ilike(search_term),
-                Activity.results_area.ilike(search_term),
-                Activity.category.ilike(search_term),
-            )
+    """Download all (filtered) activities as a CSV file (streamed), or Parquet with ?format=parquet."""
+    parquet = request.args.get("format") == "parquet"
+    log_user_activity("download_parquet" if parquet else "download_csv", resource_type="activities")
+    # Support multiple filter values (from multi-select); same WHERE clause as the dashboard
+    query = apply_activity_filters(Activity.query, **activity_filters_from_args(request.args))
+    if parquet:
+        return _parquet_download(
+            "activities.parquet", ACTIVITY_PARQUET_COLUMNS, activity_export_rows(query), (ACTIVITIES,),
+            "activity.index",
         )
-
-    activities = query.order_by(Activity.code).all()
-
-    # Build CSV in memory
-    import csv
-    import io
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(
-        [
-            "code",
-            "initial_activity",
-            "proposed_activity",
-            "implementing_entity",
-            "delivery_partner",
-            "results_area",
-            "category",
-            "budget_year1",
-            "budget_year2",
-            "budget_year3",
-            "budget_total",
-            "budget_used",  # Keep for backward compatibility (stores Year 1 only)
-            "budget_used_year1",
-            "budget_used_year2",
-            "budget_used_year3",
-            "total_budget_used",  # Sum of all years (matches dashboard display)
-            "status",
-            "progress",
-            "notes",
-        ]
+    return cached_stream(
+        "activities.csv", "text/csv", (ACTIVITIES,), iter_csv(ACTIVITY_CSV_HEADER, activity_csv_rows(query))
     )
-    for a in activities:
-        # Auto-calculate progress from total budget used (all years) and budget_total
-        # Use only year-specific fields for all calculations
-        budget_total = a.budget_total or 0
-        budget_used_year1 = getattr(a, 'budget_used_year1', None) or 0
-        budget_used_year2 = getattr(a, 'budget_used_year2', None) or 0
-        budget_used_year3 = getattr(a, 'budget_used_year3', None) or 0
-        total_budget_used = budget_used_year1 + budget_used_year2 + budget_used_year3
-        # Match dashboard calculation: round() returns float, but we'll use int for CSV
-        calculated_progress = round((total_budget_used / budget_total) * 100) if budget_total > 0 else 0
-        
-        writer.writerow(
-            [
-                a.code or "",
-                a.initial_activity or "",
-                a.proposed_activity or "",
-                a.implementing_entity or "",
-                a.delivery_partner or "",
-                a.results_area or "",
-                a.category or "",
-                a.budget_year1 or 0,
-                a.budget_year2 or 0,
-                a.budget_year3 or 0,
-                budget_total,
-                budget_used_year1,  # Use year1 value for backward compatibility column
-                budget_used_year1,
-                budget_used_year2,
-                budget_used_year3,
-                total_budget_used,  # Total of all years (matches dashboard "Budget Used" column)
-                a.status or "",
-                calculated_progress,  # Use auto-calculated progress based on all years (matches dashboard)
-                (a.notes or "").replace("\n", " ").replace("\r", " "),
-            ]
-        )
 
-    from flask import Response
 
-    output.seek(0)
-    return Response(
-        output.read(),
-        mimetype="text/csv",
-        headers={
-            "Content-Disposition": "attachment; filename=activities.csv",
-        },
+@activity_bp.route("/download_excel", methods=["GET"])
+@login_required
+def download_activities_excel():
+    """Download all (filtered) activities as an Excel file (write-only workbook)."""
+    log_user_activity("download_excel", resource_type="activities")
+    query = apply_activity_filters(Activity.query, **activity_filters_from_args(request.args))
+    return cached_file(
+        "activities.xlsx", XLSX_MIMETYPE, (ACTIVITIES,),
+        lambda out: write_workbook(out, "Activities", ACTIVITY_CSV_HEADER, activity_csv_rows(query)),
     )
 
 
@@ -1759,125 +1014,47 @@ def indicators_progress():
     # Filter by progress status
     status_filter = (request.args.get("status") or "").strip()
 
-    # Base query
-    query = db.session.query(Indicator).join(Activity, Indicator.activity_id == Activity.id)
-    if entity_list:
-        query = query.filter(Activity.implementing_entity.in_(entity_list))
-    if type_filter in ("Quantitative", "Qualitative"):
-        query = query.filter(Indicator.indicator_type == type_filter)
-    if status_filter in ("On Track", "At Risk", "Behind", "Not Started"):
-        query = query.filter(Indicator.status_year1 == status_filter)
+    filters = {"entity_list": entity_list, "type_filter": type_filter, "status_filter": status_filter}
 
-    # Get indicators with progress data
+    # Progress-specific summary stats - per year, one conditional-aggregation query
     try:
-        indicators = query.order_by(Activity.code, Indicator.id).all()
+        progress_summary = progress_summary_from_histogram(indicator_status_histogram(**filters))
     except Exception as e:
         import traceback
-        print(f"Error loading indicator progress: {e}")
+        print(f"Error computing indicator progress summary: {e}")
         print(traceback.format_exc())
-        indicators = []
-
-    # Progress-specific summary stats - per year (from full filtered list)
-    total = len(indicators)
-    
-    # Year 1 summaries
-    on_track_y1 = sum(1 for ind in indicators if ind.status_year1 == "On Track")
-    at_risk_y1 = sum(1 for ind in indicators if ind.status_year1 == "At Risk")
-    behind_y1 = sum(1 for ind in indicators if ind.status_year1 == "Behind")
-    not_started_y1 = sum(1 for ind in indicators if not ind.status_year1 or ind.status_year1 == "Not Started")
-    
-    # Year 2 summaries
-    on_track_y2 = sum(1 for ind in indicators if ind.status_year2 == "On Track")
-    at_risk_y2 = sum(1 for ind in indicators if ind.status_year2 == "At Risk")
-    behind_y2 = sum(1 for ind in indicators if ind.status_year2 == "Behind")
-    not_started_y2 = sum(1 for ind in indicators if not ind.status_year2 or ind.status_year2 == "Not Started")
-    
-    # Year 3 summaries
-    on_track_y3 = sum(1 for ind in indicators if ind.status_year3 == "On Track")
-    at_risk_y3 = sum(1 for ind in indicators if ind.status_year3 == "At Risk")
-    behind_y3 = sum(1 for ind in indicators if ind.status_year3 == "Behind")
-    not_started_y3 = sum(1 for ind in indicators if not ind.status_year3 or ind.status_year3 == "Not Started")
-    
-    # Calculate average progress for indicators with progress data
-    progress_values = [ind.progress_year1 for ind in indicators if ind.progress_year1 is not None]
-    avg_progress_y1 = sum(progress_values) / len(progress_values) if progress_values else 0.0
-    
-    progress_values_y2 = [ind.progress_year2 for ind in indicators if ind.progress_year2 is not None]
-    avg_progress_y2 = sum(progress_values_y2) / len(progress_values_y2) if progress_values_y2 else 0.0
-    
-    progress_values_y3 = [ind.progress_year3 for ind in indicators if ind.progress_year3 is not None]
-    avg_progress_y3 = sum(progress_values_y3) / len(progress_values_y3) if progress_values_y3 else 0.0
-
-    # Count indicators with progress data
-    with_progress_y1 = len([ind for ind in indicators if ind.progress_year1 is not None])
-    with_progress_y2 = len([ind for ind in indicators if ind.progress_year2 is not None])
-    with_progress_y3 = len([ind for ind in indicators if ind.progress_year3 is not None])
-
-    progress_summary = {
-        "total": total,
-        # Overall (Year 1 for backward compatibility)
-        "on_track": on_track_y1,
-        "at_risk": at_risk_y1,
-        "behind": behind_y1,
-        "not_started": not_started_y1,
-        # Year 1
-        "on_track_y1": on_track_y1,
-        "at_risk_y1": at_risk_y1,
-        "behind_y1": behind_y1,
-        "not_started_y1": not_started_y1,
-        # Year 2
-        "on_track_y2": on_track_y2,
-        "at_risk_y2": at_risk_y2,
-        "behind_y2": behind_y2,
-        "not_started_y2": not_started_y2,
-        # Year 3
-        "on_track_y3": on_track_y3,
-        "at_risk_y3": at_risk_y3,
-        "behind_y3": behind_y3,
-        "not_started_y3": not_started_y3,
-        # Average progress
-        "avg_progress_y1": round(avg_progress_y1, 1),
-        "avg_progress_y2": round(avg_progress_y2, 1),
-        "avg_progress_y3": round(avg_progress_y3, 1),
-        "with_progress_y1": with_progress_y1,
-        "with_progress_y2": with_progress_y2,
-        "with_progress_y3": with_progress_y3,
-    }
+        db.session.rollback()
+        progress_summary = progress_summary_from_histogram(EMPTY_HISTOGRAM)
 
-    # Distinct implementing entities for filter dropdown
+    # Distinct implementing entities for filter dropdown (cached until activities change)
     try:
-        entities = [
-            row[0]
-            for row in db.session.query(Activity.implementing_entity)
-            .filter(
-                Activity.implementing_entity.isnot(None),
-                Activity.implementing_entity != "",
-            )
-            .distinct()
-            .order_by(Activity.implementing_entity)
-            .all()
-        ]
+        entities = activity_filter_options()["entities"]
     except Exception:
         entities = []
 
-    # Pagination: slice indicators for current page (summary uses full list above)
+    # Pagination: only the current page of indicators is loaded (summary aggregates the full set above)
     try:
         page = max(1, int(request.args.get("page") or 1))
     except (TypeError, ValueError):
         page = 1
     per_page = 25
-    total_count = len(indicators)
-    total_pages = max(1, (total_count + per_page - 1) // per_page)
-    page = max(1, min(page, total_pages))
-    indicators = indicators[(page - 1) * per_page : page * per_page]
-    pagination = {
-        "page": page,
-        "per_page": per_page,
-        "total_count": total_count,
-        "total_pages": total_pages,
-        "has_prev": page > 1,
-        "has_next": page < total_pages,
-    }
+    try:
+        indicators, pagination = paginate_query(
+            indicator_base_query(**filters).order_by(Activity.code, Indicator.id), page, per_page
+        )
+    except Exception as e:
+        import traceback
+        print(f"Error loading indicator progress: {e}")
+        print(traceback.format_exc())
+        db.session.rollback()
+        indicators, pagination = [], {
+            "page": 1,
+            "per_page": per_page,
+            "total_count": 0,
+            "total_pages": 1,
+            "has_prev": False,
+            "has_next": False,
+        }
     pager_preserve = {
         "implementing_entity": request.args.getlist("implementing_entity"),
         "indicator_type": request.args.get("indicator_type") or "",
@@ -1898,6 +1075,17 @@ def indicators_progress():
     )
 
 
+_progress_chart_cache = VersionedCache(max_entries=64)
+
+
+def _etagged_json_response(body, etag):
+    """Serve pre-serialized JSON bytes with an ETag; ``body=None`` means 304 Not Modified."""
+    response = Response(body, status=304 if body is None else 200, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
 @activity_bp.route("/indicators/progress/chart", methods=["GET"])
 def indicators_progress_chart():
     """Generate and return a stacked bar chart for indicator progress by year using Plotly."""
@@ -1914,17 +1102,21 @@ def indicators_progress_chart():
         entity_list = request.args.getlist("implementing_entity")
         # Filter by indicator type (Quantitative / Qualitative)
         type_filter = (request.args.get("indicator_type") or "").strip()
+
+        # The finished JSON is cached per (filters, data versions); browsers
+        # revalidate with If-None-Match and get a 304 while nothing has changed
+        cache_key = (tuple(sorted(set(entity_list))), type_filter)
+        version = (get_data_version(ACTIVITIES), get_data_version(INDICATORS))
+        etag = hashlib.sha1(repr((cache_key, version)).encode("utf-8")).hexdigest()
+        if request.if_none_match.contains(etag):
+            return _etagged_json_response(None, etag)
+        body = _progress_chart_cache.get(cache_key, version)
+        if body is not None:
+            return _etagged_json_response(body, etag)
         
-        # Base query
+        # Per-year status counts in a single aggregate query
         try:
-            query = db.session.query(Indicator).join(Activity, Indicator.activity_id == Activity.id)
-            if entity_list:
-                query = query.filter(Activity.implementing_entity.in_(entity_list))
-            if type_filter in ("Quantitative", "Qualitative"):
-                query = query.filter(Indicator.indicator_type == type_filter)
-            
-            # Get indicators - order by activity code and indicator id
-            indicators = query.order_by(Activity.code, Indicator.id).all()
+            stats = indicator_status_histogram(entity_list=entity_list, type_filter=type_filter)
         except Exception as db_error:
             error_msg = f"Database error loading indicators: {str(db_error)}"
             exc_type, exc_value, exc_traceback = sys.exc_info()
@@ -1933,22 +1125,11 @@ def indicators_progress_chart():
             print(f"Exception value: {exc_value}")
             print(traceback.format_exception(exc_type, exc_value, exc_traceback))
             return jsonify({"error": error_msg, "data": [], "layout": {}}), 500
-        
-        # Calculate per-year summaries (with defensive checks)
-        on_track_y1 = sum(1 for ind in indicators if getattr(ind, 'status_year1', None) == "On Track")
-        at_risk_y1 = sum(1 for ind in indicators if getattr(ind, 'status_year1', None) == "At Risk")
-        behind_y1 = sum(1 for ind in indicators if getattr(ind, 'status_year1', None) == "Behind")
-        not_started_y1 = sum(1 for ind in indicators if not getattr(ind, 'status_year1', None) or getattr(ind, 'status_year1', None) == "Not Started")
-        
-        on_track_y2 = sum(1 for ind in indicators if getattr(ind, 'status_year2', None) == "On Track")
-        at_risk_y2 = sum(1 for ind in indicators if getattr(ind, 'status_year2', None) == "At Risk")
-        behind_y2 = sum(1 for ind in indicators if getattr(ind, 'status_year2', None) == "Behind")
-        not_started_y2 = sum(1 for ind in indicators if not getattr(ind, 'status_year2', None) or getattr(ind, 'status_year2', None) == "Not Started")
-        
-        on_track_y3 = sum(1 for ind in indicators if getattr(ind, 'status_year3', None) == "On Track")
-        at_risk_y3 = sum(1 for ind in indicators if getattr(ind, 'status_year3', None) == "At Risk")
-        behind_y3 = sum(1 for ind in indicators if getattr(ind, 'status_year3', None) == "Behind")
-        not_started_y3 = sum(1 for ind in indicators if not getattr(ind, 'status_year3', None) or getattr(ind, 'status_year3', None) == "Not Started")
+
+        on_track_y1, on_track_y2, on_track_y3 = (stats[f"on_track_y{y}"] for y in (1, 2, 3))
+        at_risk_y1, at_risk_y2, at_risk_y3 = (stats[f"at_risk_y{y}"] for y in (1, 2, 3))
+        behind_y1, behind_y2, behind_y3 = (stats[f"behind_y{y}"] for y in (1, 2, 3))
+        not_started_y1, not_started_y2, not_started_y3 = (stats[f"not_started_y{y}"] for y in (1, 2, 3))
         
         # Create stacked bar chart with Plotly
         try:
@@ -2055,9 +1236,9 @@ def indicators_progress_chart():
                     "data": graph_dict.get("data", []),
                     "layout": graph_dict.get("layout", {})
                 }
-                response = jsonify(chart_data)
-                response.headers['Cache-Control'] = 'no-cache'
-                return response
+                body = json.dumps(chart_data, cls=PlotlyJSONEncoder).encode("utf-8")
+                _progress_chart_cache.set(cache_key, version, body)
+                return _etagged_json_response(body, etag)
             except Exception as json_error:
                 import traceback
                 error_msg = f"Error serializing chart to JSON: {str(json_error)}"
@@ -2116,126 +1297,68 @@ def indicators_list():
         page = 1
     per_page = 25
 
-    # Base query
-    query = db.session.query(Indicator).join(Activity, Indicator.activity_id == Activity.id)
-    if entity_list:
-        query = query.filter(Activity.implementing_entity.in_(entity_list))
-    if type_filter in ("Quantitative", "Qualitative"):
-        query = query.filter(Indicator.indicator_type == type_filter)
-    if search_query:
-        search_term = f"%{search_query}%"
-        query = query.filter(
-            db.or_(
-                Activity.code.ilike(search_term),
-                Indicator.activity_code.ilike(search_term),
-                Indicator.new_proposed_indicator.ilike(search_term),
-                Indicator.indicator_definition.ilike(search_term),
-                Indicator.data_source.ilike(search_term),
-                Indicator.comments.ilike(search_term),
-                Activity.proposed_activity.ilike(search_term),
-                Activity.implementing_entity.ilike(search_term),
-            )
-        )
+    # Keyset cursors (ids of the neighbouring page's edge rows) from Previous/Next links
+    after = request.args.get("after", type=int)
+    before = request.args.get("before", type=int)
+
+    filters = {
+        "entity_list": entity_list,
+        "type_filter": type_filter,
+        "search_query": search_query,
+    }
 
-    # Order by selected column (nulls last for text)
-    _order = db.asc if order_dir == "asc" else db.desc
+    # Summary stats for header cards (aggregated in SQL over all matching indicators)
     try:
-        if sort_col == "indicator":
-            query = query.order_by(_order(Indicator.new_proposed_indicator).nulls_last(), Indicator.id)
-        elif sort_col == "definition":
-            query = query.order_by(_order(Indicator.indicator_definition).nulls_last(), Indicator.id)
-        elif sort_col == "comments":
-            query = query.order_by(_order(Indicator.comments).nulls_last(), Indicator.id)
-        elif sort_col == "addressed":
-            query = query.order_by(_order(Indicator.comment_addressed).nulls_last(), Indicator.id)
-        else:
-            # default: activity (Activity.code)
-            query = query.order_by(_order(Activity.code).nulls_last(), Indicator.id)
-        indicators = query.all()
+        indicator_summary = indicator_list_summary(**filters)
     except Exception as e:
         import traceback
 
-        print(f"Error loading indicators: {e}")
+        print(f"Error computing indicator summary: {e}")
         print(traceback.format_exc())
-        indicators = []
+        db.session.rollback()
+        indicator_summary = {
+            "total": 0, "quantitative": 0, "qualitative": 0, "naphs_yes": 0,
+            "submitted_count": 0, "submitted_pct": 0.0,
+            "portal_edited_count": 0, "portal_edited_pct": 0.0,
+            "on_track": 0, "at_risk": 0, "behind": 0, "not_started": 0,
+            "avg_progress": 0.0,
+        }
 
-    # Summary stats for header cards
-    total = len(indicators)
-    quantitative = sum(
-        1 for ind in indicators if (ind.indicator_type or "").strip() == "Quantitative"
-    )
-    qualitative = sum(
-        1 for ind in indicators if (ind.indicator_type or "").strip() == "Qualitative"
-    )
-    naphs_yes = sum(
-        1
-        for ind in indicators
-        if str(ind.naphs).strip().lower() in ("true", "yes", "1")
-    )
-    submitted_count = sum(
-        1
-        for ind in indicators
-        if (ind.submitted or "").strip() == "Reported"
-    )
-    submitted_pct = (submitted_count / total * 100) if total > 0 else 0.0
-    portal_edited_count = sum(
-        1
-        for ind in indicators
-        if ind.portal_edited is True or str(ind.portal_edited).strip().lower() in ("true", "yes", "1")
-    )
-    portal_edited_pct = (portal_edited_count / total * 100) if total > 0 else 0.0
-    
-    # Progress statistics
-    on_track_count = sum(
-        1 for ind in indicators
-        if ind.status_year1 == "On Track"
-    )
-    at_risk_count = sum(
-        1 for ind in indicators
-        if ind.status_year1 == "At Risk"
-    )
-    behind_count = sum(
-        1 for ind in indicators
-        if ind.status_year1 == "Behind"
-    )
-    not_started_count = sum(
-        1 for ind in indicators
-        if not ind.status_year1 or ind.status_year1 == "Not Started"
-    )
-    
-    # Average progress for indicators with progress data
-    progress_values = [ind.progress_year1 for ind in indicators if ind.progress_year1 is not None]
-    avg_progress = sum(progress_values) / len(progress_values) if progress_values else 0.0
-
-    indicator_summary = {
-        "total": total,
-        "quantitative": quantitative,
-        "qualitative": qualitative,
-        "naphs_yes": naphs_yes,
-        "submitted_count": submitted_count,
-        "submitted_pct": round(submitted_pct, 1),
-        "portal_edited_count": portal_edited_count,
-        "portal_edited_pct": round(portal_edited_pct, 1),
-        "on_track": on_track_count,
-        "at_risk": at_risk_count,
-        "behind": behind_count,
-        "not_started": not_started_count,
-        "avg_progress": round(avg_progress, 1),
-    }
+    # Current page only: seek on (sort column, Indicator.id), nulls last
+    try:
+        page_query = indicator_base_query(**filters)
+        sort_key = indicator_sort_key(sort_col)
+        sort_dir = order_dir
+        if search_query and not request.args.get("sort"):
+            # Searching without an explicit sort: best matches first
+            page_query, rank = rank_search_results(page_query, search_query, Indicator, Activity)
+            if rank is not None:
+                sort_key, sort_dir = rank, "desc"
+        indicators, pagination = keyset_paginate(
+            page_query,
+            sort_key,
+            Indicator.id,
+            sort_dir,
+            page,
+            per_page,
+            after=after,
+            before=before,
+        )
+    except Exception as e:
+        import traceback
 
-    # Pagination: slice indicators for current page (summary uses full list above)
-    total_count = len(indicators)
-    total_pages = max(1, (total_count + per_page - 1) // per_page)
-    page = max(1, min(page, total_pages))
-    indicators = indicators[(page - 1) * per_page : page * per_page]
-    pagination = {
-        "page": page,
-        "per_page": per_page,
-        "total_count": total_count,
-        "total_pages": total_pages,
-        "has_prev": page > 1,
-        "has_next": page < total_pages,
-    }
+        print(f"Error loading indicators: {e}")
+        print(traceback.format_exc())
+        db.session.rollback()
+        indicators = []
+        pagination = {
+            "page": 1,
+            "per_page": per_page,
+            "total_count": 0,
+            "total_pages": 1,
+            "has_prev": False,
+            "has_next": False,
+        }
     pager_preserve = {
         "q": request.args.get("q") or "",
         "implementing_entity": request.args.getlist("implementing_entity"),
@@ -2244,19 +1367,9 @@ def indicators_list():
         "order": request.args.get("order") or "",
     }
 
-    # Distinct implementing entities for filter dropdown
+    # Distinct implementing entities for filter dropdown (cached until activities change)
     try:
-        entities = [
-            row[0]
-            for row in db.session.query(Activity.implementing_entity)
-            .filter(
-                Activity.implementing_entity.isnot(None),
-                Activity.implementing_entity != "",
-            )
-            .distinct()
-            .order_by(Activity.implementing_entity)
-            .all()
-        ]
+        entities = activity_filter_options()["entities"]
     except Exception:
         entities = []
 
@@ -2392,6 +1505,7 @@ def new_indicator():
         )
         db.session.add(ind)
         try:
+            bump_data_version(INDICATORS)
             db.session.commit()
             flash("Indicator created successfully.", "success")
             return redirect(url_for("activity.indicators_list"))
@@ -2536,6 +1650,7 @@ def edit_indicator(indicator_id):
         ind.portal_edited = portal_bool
         ind.comment_addressed = ca_bool
 
+        bump_data_version(INDICATORS)
         db.session.commit()
         flash("Indicator updated successfully.", "success")
         
@@ -2563,261 +1678,37 @@ def delete_indicator(indicator_id):
         return redirect(url_for("activity.indicators_list"))
 
     db.session.delete(ind)
+    bump_data_version(INDICATORS)
     db.session.commit()
     flash("Indicator deleted.", "info")
     return redirect(url_for("activity.indicators_list"))
 
 
+# Indicator exports include their activity's code, entity and proposed activity
+_INDICATOR_EXPORT_VERSIONS = (ACTIVITIES, INDICATORS)
+
+
 @activity_bp.route("/indicators/download", methods=["GET"])
 @login_required
 def download_indicators():
-    """Download all indicators as CSV in the specified column order."""
-    from flask import Response
-    import csv
-    import io
-
-    indicators = (
-        db.session.query(Indicator)
-        .join(Activity, Indicator.activity_id == Activity.id)
-        .order_by(Activity.code, Indicator.id)
-        .all()
-    )
-
-    def bool_to_yes_no(val):
-        if val in (True, "true", "True", "yes", "Yes", "1"):
-            return "Yes"
-        if val in (False, "false", "False", "no", "No", "0"):
-            return "No"
-        return ""
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    # Column order per spec
-    writer.writerow(
-        [
-            "code",
-            "fundholder_implementing_entity",
-            "key_project_activity",
-            "new_proposed_indicator",
-            "indicator_type",
-            "naphs",
-            "indicator_definition",
-            "data_source",
-            "baseline_proposal_year",
-            "actual_baseline",
-            "target_year_1",
-            "actual_year_1",
-            "progress_year_1",
-            "status_year_1",
-            "qualitative_stage_year_1",
-            "target_year_2",
-            "actual_year_2",
-            "progress_year_2",
-            "status_year_2",
-            "qualitative_stage_year_2",
-            "target_year_3",
-            "actual_year_3",
-            "progress_year_3",
-            "status_year_3",
-            "qualitative_stage_year_3",
-            "last_progress_update",
-            "submitted",
-            "comments",
-            "portal_edited",
-            "comment_addressed",
-        ]
-    )
-
-    for ind in indicators:
-        act = ind.activity
-        code = ind.activity_code or (act.code if act else "")
-        fundholder = act.implementing_entity if act else ""
-        key_proj = act.proposed_activity if act else ""
-        
-        # Format progress percentages
-        def format_progress(val):
-            if val is None:
-                return ""
-            try:
-                return f"{float(val):.2f}"
-            except (ValueError, TypeError):
-                return ""
-        
-        writer.writerow(
-            [
-                code,
-                fundholder,
-                key_proj,
-                ind.new_proposed_indicator or "",
-                ind.indicator_type or "",
-                bool_to_yes_no(ind.naphs),
-                ind.indicator_definition or "",
-                ind.data_source or "",
-                ind.baseline_proposal_year or "",
-                ind.actual_baseline or "",
-                ind.target_year1 or "",
-                ind.actual_year1 or "",
-                format_progress(ind.progress_year1),
-                ind.status_year1 or "",
-                ind.qualitative_stage_year1 or "",
-                ind.target_year2 or "",
-                ind.actual_year2 or "",
-                format_progress(ind.progress_year2),
-                ind.status_year2 or "",
-                ind.qualitative_stage_year2 or "",
-                ind.target_year3 or "",
-                ind.actual_year3 or "",
-                format_progress(ind.progress_year3),
-                ind.status_year3 or "",
-                ind.qualitative_stage_year3 or "",
-                ind.last_progress_update.strftime("%Y-%m-%d %H:%M:%S") if ind.last_progress_update else "",
-                ind.submitted or "",
-                ind.comments or "",
-                bool_to_yes_no(ind.portal_edited),
-                bool_to_yes_no(ind.comment_addressed),
-            ]
+    """Download all indicators as CSV in the specified column order (streamed), or Parquet with ?format=parquet."""
+    if request.args.get("format") == "parquet":
+        return _parquet_download(
+            "indicators.parquet", INDICATOR_PARQUET_COLUMNS, indicator_export_rows(), _INDICATOR_EXPORT_VERSIONS,
+            "activity.indicators_list",
         )
-
-    output.seek(0)
-    return Response(
-        output.read(),
-        mimetype="text/csv",
-        headers={"Content-Disposition": "attachment; filename=indicators.csv"},
+    return cached_stream(
+        "indicators.csv", "text/csv", _INDICATOR_EXPORT_VERSIONS, iter_csv(INDICATOR_CSV_HEADER, indicator_csv_rows())
     )
 
 
 @activity_bp.route("/indicators/download_excel", methods=["GET"])
 @login_required
 def download_indicators_excel():
-    """Download all indicators as an Excel file, with proper typing."""
-    from flask import Response
-    import io
-    from openpyxl import Workbook
-
-    indicators = (
-        db.session.query(Indicator)
-        .join(Activity, Indicator.activity_id == Activity.id)
-        .order_by(Activity.code, Indicator.id)
-        .all()
-    )
-
-    def bool_to_yes_no(val):
-        if val in (True, "true", "True", "yes", "Yes", "1"):
-            return "Yes"
-        if val in (False, "false", "False", "no", "No", "0"):
-            return "No"
-        return ""
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Indicators"
-
-    headers = [
-        "code",
-        "fundholder_implementing_entity",
-        "key_project_activity",
-        "new_proposed_indicator",
-        "indicator_type",
-        "naphs",
-        "indicator_definition",
-        "data_source",
-        "baseline_proposal_year",
-        "actual_baseline",
-        "target_year_1",
-        "actual_year_1",
-        "progress_year_1",
-        "status_year_1",
-        "qualitative_stage_year_1",
-        "target_year_2",
-        "actual_year_2",
-        "progress_year_2",
-        "status_year_2",
-        "qualitative_stage_year_2",
-        "target_year_3",
-        "actual_year_3",
-        "progress_year_3",
-        "status_year_3",
-        "qualitative_stage_year_3",
-        "last_progress_update",
-        "submitted",
-        "comments",
-        "portal_edited",
-        "comment_addressed",
-    ]
-    ws.append(headers)
-
-    for ind in indicators:
-        act = ind.activity
-        code = ind.activity_code or (act.code if act else "")
-        fundholder = act.implementing_entity if act else ""
-        key_proj = act.proposed_activity if act else ""
-
-        # Helper function for numeric conversion
-        def to_num_or_text(val, is_quantitative):
-            if val is None or val == "":
-                return ""
-            if is_quantitative:
-                try:
-                    return float(str(val).strip())
-                except ValueError:
-                    return str(val)
-            return str(val)
-
-        is_quantitative = (ind.indicator_type or "").strip() == "Quantitative"
-        
-        # Format progress percentages
-        def format_progress(val):
-            if val is None:
-                return ""
-            try:
-                return float(val)
-            except (ValueError, TypeError):
-                return ""
-
-        row = [
-            code,
-            fundholder,
-            key_proj,
-            ind.new_proposed_indicator or "",
-            ind.indicator_type or "",
-            bool_to_yes_no(ind.naphs),
-            ind.indicator_definition or "",
-            ind.data_source or "",
-            to_num_or_text(ind.baseline_proposal_year, is_quantitative),
-            to_num_or_text(ind.actual_baseline, is_quantitative),
-            to_num_or_text(ind.target_year1, is_quantitative),
-            to_num_or_text(ind.actual_year1, is_quantitative),
-            format_progress(ind.progress_year1),
-            ind.status_year1 or "",
-            ind.qualitative_stage_year1 or "",
-            to_num_or_text(ind.target_year2, is_quantitative),
-            to_num_or_text(ind.actual_year2, is_quantitative),
-            format_progress(ind.progress_year2),
-            ind.status_year2 or "",
-            ind.qualitative_stage_year2 or "",
-            to_num_or_text(ind.target_year3, is_quantitative),
-            to_num_or_text(ind.actual_year3, is_quantitative),
-            format_progress(ind.progress_year3),
-            ind.status_year3 or "",
-            ind.qualitative_stage_year3 or "",
-            ind.last_progress_update.strftime("%Y-%m-%d %H:%M:%S") if ind.last_progress_update else "",
-            ind.submitted or "",
-            ind.comments or "",
-            bool_to_yes_no(ind.portal_edited),
-            bool_to_yes_no(ind.comment_addressed),
-        ]
-
-        ws.append(row)
-
-    bio = io.BytesIO()
-    wb.save(bio)
-    bio.seek(0)
-
-    return Response(
-        bio.read(),
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=indicators.xlsx"},
+    """Download all indicators as an Excel file, with proper typing (write-only workbook)."""
+    return cached_file(
+        "indicators.xlsx", XLSX_MIMETYPE, _INDICATOR_EXPORT_VERSIONS,
+        lambda out: write_workbook(out, "Indicators", INDICATOR_CSV_HEADER, indicator_excel_rows()),
     )
 
 
@@ -2847,167 +1738,23 @@ def upload_indicators():
         flash("Please upload an Excel file (.xlsx or .xls) for indicators.", "error")
         return redirect(url_for("activity.indicators_list"))
 
-    # Helpers reused from form logic
-    def parse_bool(value):
-        if value is None:
-            return None
-        v = str(value).strip().lower()
-        if v in ("yes", "true", "1"):
-            return True
-        if v in ("no", "false", "0"):
-            return False
-        return None
-
-    def validate_numeric_targets(indicator_type, baseline, t1, t2, t3):
-        errors = []
-        if indicator_type == "Quantitative":
-            for label, val in [
-                ("Baseline", baseline),
-                ("Target Year 1", t1),
-                ("Target Year 2", t2),
-                ("Target Year 3", t3),
-            ]:
-                if val in (None, "", "nan"):
-                    continue
-                try:
-                    int(str(val).strip())
-                except ValueError:
-                    errors.append(f"{label} must be a whole number for quantitative indicators.")
-        return errors
-
-    try:
-        import tempfile
-        import pandas as pd
-
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            file.save(tmp.name)
-            df = pd.read_excel(tmp.name, dtype=str)
-
-        columns = list(df.columns)
-        lower_map = {str(c).strip().lower(): c for c in columns}
-
-        def get_val(row, *names):
-            for n in names:
-                key = str(n).strip().lower()
-                col = lower_map.get(key)
-                if not col:
-                    for c in columns:
-                        if key == str(c).strip().lower():
-                            col = c
-                            break
-                if col and col in row:
-                    val = row[col]
-                    if isinstance(val, str):
-                        val = val.strip()
-                    if val not in (None, "", "nan"):
-                        return str(val)
-            return None
-
-        created = 0
-        updated = 0
-        skipped = 0
-        errors_total = 0
-
-        for _, row in df.iterrows():
-            code = get_val(row, "code")
-            if not code:
-                continue
-
-            activity = Activity.query.filter_by(code=code).first()
-            if not activity:
-                skipped += 1
-                continue
-
-            indicator_type = get_val(row, "indicator_type")
-            if indicator_type not in ("Quantitative", "Qualitative"):
-                errors_total += 1
-                continue
-
-            baseline = get_val(row, "baseline_proposal_year")
-            t1 = get_val(row, "target_year_1", "target_year1")
-            t2 = get_val(row, "target_year_2", "target_year2")
-            t3 = get_val(row, "target_year_3", "target_year3")
-
-            validation_errors = validate_numeric_targets(
-                indicator_type, baseline, t1, t2, t3
-            )
-            if validation_errors:
-                errors_total += len(validation_errors)
-                continue
-
-            naphs_raw = get_val(row, "naphs")
-            portal_raw = get_val(row, "portal_edited")
-            ca_raw = get_val(row, "comment_addressed")
-            new_indicator_text = get_val(row, "new_proposed_indicator")
-
-            # Upsert rule: match by activity_id (one-to-one relationship)
-            existing = Indicator.query.filter_by(activity_id=activity.id).first()
-
-            if existing:
-                # Update existing indicator
-                existing.indicator_type = indicator_type
-                existing.naphs = parse_bool(naphs_raw)
-                existing.indicator_definition = get_val(row, "indicator_definition")
-                existing.data_source = get_val(row, "data_source")
-                existing.baseline_proposal_year = baseline
-                existing.target_year1 = t1
-                existing.target_year2 = t2
-                existing.target_year3 = t3
-                existing.submitted = get_val(row, "submitted") or "Reported"
-                existing.comments = get_val(row, "comments")
-                existing.portal_edited = parse_bool(portal_raw)
-                existing.comment_addressed = parse_bool(ca_raw)
-                updated += 1
-            else:
-                # Create new indicator
-                ind = Indicator(
-                    activity_id=activity.id,
-                    activity_code=activity.code,
-                    new_proposed_indicator=new_indicator_text,
-                    indicator_type=indicator_type,
-                    naphs=parse_bool(naphs_raw),
-                    indicator_definition=get_val(row, "indicator_definition"),
-                    data_source=get_val(row, "data_source"),
-                    baseline_proposal_year=baseline,
-                    target_year1=t1,
-                    target_year2=t2,
-                    target_year3=t3,
-                    submitted=get_val(row, "submitted") or "Reported",
-                    comments=get_val(row, "comments"),
-                    portal_edited=parse_bool(portal_raw),
-                    comment_addressed=parse_bool(ca_raw),
-                )
-                db.session.add(ind)
-                created += 1
-
-        if created or updated:
-            db.session.commit()
-
-        msg_parts = [f"Created {created} indicators.", f"Updated {updated} indicators."]
-        if skipped:
-            msg_parts.append(f"Skipped {skipped} rows with missing/unknown code.")
-        if errors_total:
-            msg_parts.append(
-                f"{errors_total} quantitative baseline/target validation errors (those rows were skipped)."
-            )
-        flash(" ".join(msg_parts), "success" if created else "info")
-    except Exception as exc:
-        import traceback
-
-        print(f"Error reading indicators file: {exc}")
-        print(traceback.format_exc())
-        db.session.rollback()
-        flash(f"Error reading indicators file: {exc}", "error")
-
-    return redirect(url_for("activity.indicators_list"))
+    # Validation and upsert happen in the background (see indicator_import)
+    job = enqueue_import(
+        "indicators", file.filename, file.read(), session.get("user_id"),
+        dry_run=request.form.get("dry_run") == "1",
+    )
+    return _import_started_response(job, "activity.indicators_list")
 
 
 @activity_bp.route("/admin/usage", methods=["GET"])
 @admin_required
 def usage_statistics():
-    """Display user activity and usage statistics (admin only)."""
+    """Display user activity and usage statistics (admin only).
+
+    Totals come from the daily rollups (see usage_rollups), so the window
+    starts at the beginning of its first UTC day.
+    """
     from models import UserActivity, User
-    from sqlalchemy import func
     from datetime import datetime, timedelta
     
     # Get date range filter
@@ -3017,31 +1764,7 @@ def usage_statistics():
         days = 30
     start_date = datetime.utcnow() - timedelta(days=days)
     
-    # Get all activities in the date range
-    activities = UserActivity.query.filter(
-        UserActivity.timestamp >= start_date
-    ).order_by(UserActivity.timestamp.desc()).all()
-    
-    # Statistics by action
-    action_stats = db.session.query(
-        UserActivity.action,
-        func.count(UserActivity.id).label("count")
-    ).filter(
-        UserActivity.timestamp >= start_date
-    ).group_by(UserActivity.action).all()
-    
-    # Statistics by user
-    user_stats = db.session.query(
-        User.username,
-        User.email,
-        func.count(UserActivity.id).label("activity_count")
-    ).join(
-        UserActivity, User.id == UserActivity.user_id
-    ).filter(
-        UserActivity.timestamp >= start_date
-    ).group_by(User.id, User.username, User.email).order_by(
-        func.count(UserActivity.id).desc()
-    ).all()
+    total_activities, action_stats, user_stats, daily_stats = usage_summary(start_date.date())
     
     # Recent activities (last 50)
     recent_activities = UserActivity.query.join(
@@ -3052,44 +1775,14 @@ def usage_statistics():
         UserActivity.timestamp.desc()
     ).limit(50).all()
     
-    # Daily activity count
-    # Use database-specific date extraction for compatibility
-    # Detect database type and use appropriate date function
-    db_url = str(db.engine.url)
-    if 'postgresql' in db_url:
-        # PostgreSQL: use DATE() function and CAST to text for consistent formatting
-        from sqlalchemy import cast, String
-        date_expr = func.to_char(func.date(UserActivity.timestamp), 'YYYY-MM-DD')
-    else:
-        # SQLite: use strftime
-        date_expr = func.strftime('%Y-%m-%d', UserActivity.timestamp)
-    
-    daily_stats_raw = db.session.query(
-        date_expr.label("date"),
-        func.count(UserActivity.id).label("count")
-    ).filter(
-        UserActivity.timestamp >= start_date
-    ).group_by(
-        date_expr
-    ).order_by(
-        date_expr.desc()
-    ).all()
-    
-    # All dates should now be strings
-    daily_stats = [
-        (date_val if date_val else 'N/A', count)
-        for date_val, count in daily_stats_raw
-    ]
-    
     return render_template(
         "usage_statistics.html",
-        activities=activities,
         action_stats=action_stats,
         user_stats=user_stats,
         recent_activities=recent_activities,
         daily_stats=daily_stats,
         days=days,
-        total_activities=len(activities)
+        total_activities=total_activities
     )
 
 
@@ -3130,14 +1823,9 @@ def roadmap():
     if results_area:
         activities_query = activities_query.filter(Activity.results_area == results_area)
     if search:
-        like = f"%{search}%"
-        activities_query = activities_query.filter(
-            db.or_(
-                Activity.code.ilike(like),
-                Activity.proposed_activity.ilike(like),
-                Activity.initial_activity.ilike(like),
-            )
-        )
+        condition = search_condition(search, Activity)
+        if condition is not None:
+            activities_query = activities_query.filter(condition)
 
     activities = (
         activities_query.order_by(Activity.start_date.asc(), Activity.id.asc()).all()
@@ -3250,24 +1938,11 @@ def roadmap():
     for sub in sub_activities:
         sub.time_progress = compute_time_progress(sub)
 
-    # Values for filter dropdowns
-    implementing_entities = sorted(
-        {
-            row[0]
-            for row in db.session.query(Activity.implementing_entity).distinct()
-            if row[0]
-        }
-    )
-    statuses = sorted(
-        {row[0] for row in db.session.query(Activity.status).distinct() if row[0]}
-    )
-    results_areas = sorted(
-        {
-            row[0]
-            for row in db.session.query(Activity.results_area).distinct()
-            if row[0]
-        }
-    )
+    # Values for filter dropdowns (cached until activities change)
+    options = activity_filter_options()
+    implementing_entities = options["entities"]
+    statuses = options["statuses"]
+    results_areas = options["results_areas"]
 
     filters = {
         "implementing_entity": implementing_entity or "",
@@ -3312,16 +1987,10 @@ def reports_list():
     results_list = request.args.getlist("results_area")
     search = (request.args.get("q") or "").strip() or None
 
-    query = (
-        db.session.query(Activity)
-        .join(ActivityReport, Activity.id == ActivityReport.activity_id)
-        # Sort by activity completion date (most recent first), nulls last,
-        # then by report update time for a stable secondary order.
-        .order_by(
-            Activity.end_date.desc().nulls_last(),
-            ActivityReport.updated_at.desc(),
-        )
-    )
+    query = db.session.query(Activity).join(ActivityReport, Activity.id == ActivityReport.activity_id)
+    # Sort by activity completion date (most recent first), nulls last,
+    # then by report update time for a stable secondary order.
+    order_by = [Activity.end_date.desc().nulls_last(), ActivityReport.updated_at.desc()]
     if status_list:
         query = query.filter(Activity.status.in_(status_list))
     if entity_list:
@@ -3331,28 +2000,20 @@ def reports_list():
     if results_list:
         query = query.filter(Activity.results_area.in_(results_list))
     if search:
-        term = f"%{search}%"
-        query = query.filter(
-            db.or_(
-                Activity.code.ilike(term),
-                Activity.proposed_activity.ilike(term),
-                Activity.initial_activity.ilike(term),
-                ActivityReport.content_html.ilike(term),
-                ActivityReport.title.ilike(term),
-            )
-        )
-
-    activities_with_reports = query.options(db.joinedload(Activity.report)).all()
-
-    entities = sorted(
-        {row[0] for row in db.session.query(Activity.implementing_entity).distinct() if row[0]}
-    )
-    results_areas = sorted(
-        {row[0] for row in db.session.query(Activity.results_area).distinct() if row[0]}
-    )
-    categories = sorted(
-        {row[0] for row in db.session.query(Activity.category).distinct() if row[0]}
-    )
+        # Match the activity or its report text; best matches first
+        condition = search_condition(search, Activity, ActivityReport)
+        if condition is not None:
+            query = query.filter(condition)
+        query, rank = rank_search_results(query, search, Activity, ActivityReport)
+        if rank is not None:
+            order_by = [rank.desc()] + order_by
+
+    activities_with_reports = query.options(db.joinedload(Activity.report)).order_by(*order_by).all()
+
+    options = activity_filter_options()
+    entities = options["entities"]
+    results_areas = options["results_areas"]
+    categories = options["categories"]
     status_filter = ",".join(status_list) if status_list else ""
     entity_filter = ",".join(entity_list) if entity_list else ""
     category_filter = ",".join(category_list) if category_list else ""
@@ -0,0 +1,44 @@
+"""Small in-process caches keyed by data version.
+
+Each gunicorn worker keeps its own copy; entries are trusted only while the
+data version they were built from is still current (see data_versions).
+"""
+import threading
+from collections import OrderedDict
+
+
+class VersionedCache:
+    """Thread-safe LRU mapping of ``key -> (version, value)``."""
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        """Return the cached value for ``key`` if it was built at ``version``, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, version, value):
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_set(self, key, version, factory):
+        """Return the cached value or build it with ``factory()`` and store it."""
+        value = self.get(key, version)
+        if value is None:
+            value = factory()
+            self.set(key, version, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,205 @@
+"""Challenges Excel import.
+
+Rows are matched to existing challenges by (challenge, action) through the
+indexed ``Challenge.content_hash`` column: each chunk of the upload is
+resolved with one IN (...) query on the pair digests, split into inserts and
+updates in memory and written with ``bulk_insert_mappings`` /
+``bulk_update_mappings``, so the import stays linear in the number of rows.
+Unknown statuses become "pending"; rows identical to the current challenge
+are not written, and rows matching the import ledger are counted as
+unchanged without a lookup (see import_ledger). ``import_challenges()``
+needs only an app context (it is run by import_jobs).
+
+Only the first (lowest id) challenge with a given pair holds its hash;
+duplicates entered through the form keep NULL, and the hash is handed on
+when its holder is deleted or renamed (see claim_content_hash() and
+pass_on_content_hash(), used by the challenge routes).
+"""
+import hashlib
+import time
+from types import SimpleNamespace
+
+from flask import current_app
+
+from data_versions import CHALLENGES, bump_data_version
+from import_ledger import LOOKUP_CHUNK
+from import_mapping import CHALLENGE_FIELDS, frame_rows, iter_field_frames
+from models import Challenge, db
+
+
+CHALLENGE_STATUSES = ("pending", "completed", "canceled")
+
+# Values written from a parsed row, compared to detect no-op updates
+_COMPARED_FIELDS = ("responsible", "timeline", "status")
+
+
+def challenge_content_hash(challenge, action):
+    """Digest of a (challenge, action) pair, the key the import matches on."""
+    return hashlib.sha1(f"{challenge}\x1f{action}".encode("utf-8")).hexdigest()
+
+
+def claim_content_hash(challenge):
+    """Give ``challenge`` its pair's hash unless another challenge already holds it."""
+    digest = challenge_content_hash(challenge.challenge, challenge.action)
+    if challenge.content_hash == digest:
+        return
+    holder = (
+        db.session.query(Challenge.id)
+        .filter(Challenge.content_hash == digest, Challenge.id != challenge.id)
+        .first()
+    )
+    challenge.content_hash = None if holder else digest
+
+
+def pass_on_content_hash(challenge_text, action_text):
+    """Hand a released pair hash to the oldest remaining duplicate of that pair, if any.
+
+    Call after the former holder's delete or rename has been flushed.
+    """
+    duplicate = (
+        Challenge.query.filter_by(challenge=challenge_text, action=action_text, content_hash=None)
+        .order_by(Challenge.id)
+        .first()
+    )
+    if duplicate is not None:
+        duplicate.content_hash = challenge_content_hash(challenge_text, action_text)
+
+
+class ChallengeUpserter:
+    """Insert-or-update parsed challenge rows by content hash, one chunk at a time.
+
+    A pair that already exists updates the challenge holding its hash, and a
+    pair repeated in the file updates the row created for it. With a
+    ``ledger`` (import_ledger.RowLedger), rows whose content hash matches it
+    are counted as unchanged up front.
+    """
+
+    def __init__(self, ledger=None):
+        self.ledger = ledger
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self._known = {}  # content hash -> snapshot (None: no such challenge)
+
+    def _prefetch(self, digests):
+        """Load snapshots for hashes not seen yet, in one query per LOOKUP_CHUNK hashes."""
+        digests = [d for d in digests if d not in self._known]
+        for start in range(0, len(digests), LOOKUP_CHUNK):
+            chunk = digests[start:start + LOOKUP_CHUNK]
+            rows = (
+                db.session.query(
+                    Challenge.id,
+                    Challenge.content_hash,
+                    Challenge.responsible,
+                    Challenge.timeline,
+                    Challenge.status,
+                )
+                .filter(Challenge.content_hash.in_(chunk))
+                .all()
+            )
+            self._known.update(dict.fromkeys(chunk))
+            for row in rows:
+                self._known[row.content_hash] = SimpleNamespace(**row._asdict())
+
+    def add_rows(self, rows):
+        """Write one chunk of ``((challenge, action), (responsible, timeline, status))`` rows."""
+        started = time.perf_counter()
+        if self.ledger is not None:
+            self.ledger.prefetch(key for key, _ in rows)
+            fresh = []
+            for key, values in rows:
+                if self.ledger.unchanged(key, values):
+                    self.unchanged += 1
+                else:
+                    fresh.append((key, values))
+            rows = fresh
+        rows = [(challenge_content_hash(*key), key, values) for key, values in rows]
+        self._prefetch({digest for digest, _, _ in rows})
+
+        inserts = {}
+        updates = {}
+        for digest, key, values in rows:
+            if self.ledger is not None:
+                self.ledger.record(key, values)
+            new = dict(zip(_COMPARED_FIELDS, values))
+            if digest in inserts:
+                # Pair repeated within this chunk: last row wins
+                if all(inserts[digest][f] == new[f] for f in _COMPARED_FIELDS):
+                    self.unchanged += 1
+                    continue
+                inserts[digest].update(new)
+                self.updated += 1
+            elif self._known.get(digest) is not None:
+                existing = self._known[digest]
+                if all(getattr(existing, f) == new[f] for f in _COMPARED_FIELDS):
+                    self.unchanged += 1
+                    continue
+                updates[existing.id] = dict(new, id=existing.id)
+                self._known[digest] = SimpleNamespace(**new, id=existing.id, content_hash=digest)
+                self.updated += 1
+            else:
+                challenge_text, action_text = key
+                inserts[digest] = dict(
+                    new, challenge=challenge_text, action=action_text, content_hash=digest
+                )
+                self.created += 1
+
+        if inserts:
+            db.session.bulk_insert_mappings(Challenge, list(inserts.values()))
+            # Later chunks may repeat these pairs; reload them with their ids
+            for digest in inserts:
+                self._known.pop(digest, None)
+        if updates:
+            db.session.bulk_update_mappings(Challenge, list(updates.values()))
+        current_app.logger.debug(
+            "Challenge import chunk: %d rows, %d inserted, %d updated in %.3fs",
+            len(rows), len(inserts), len(updates), time.perf_counter() - started,
+        )
+
+
+def import_challenges(stream, filename, progress=None, ledger=None):
+    """Insert or update the challenges in an uploaded sheet and commit.
+
+    ``progress(rows_read)`` is called after each chunk; ``ledger`` is an
+    import_ledger.RowLedger, saved with the import. Returns a dict with the
+    counts and the user-facing ``message`` / ``category``.
+    """
+    upserter = ChallengeUpserter(ledger=ledger)
+    for frame in iter_field_frames(stream, filename, CHALLENGE_FIELDS, progress=progress):
+        rows = []
+        for challenge_text, action_text, responsible, timeline, status in frame_rows(frame):
+            status = (status or "pending").strip().lower()
+
+            if not challenge_text or not action_text:
+                continue
+
+            if status not in CHALLENGE_STATUSES:
+                status = "pending"
+
+            rows.append(((challenge_text, action_text), (responsible or None, timeline or None, status)))
+        upserter.add_rows(rows)
+
+    created, updated, unchanged = upserter.created, upserter.updated, upserter.unchanged
+    if created or updated:
+        bump_data_version(CHALLENGES)
+    if ledger is not None:
+        ledger.save()
+    db.session.commit()
+    if created or updated:
+        message = f"Challenges import complete. Created {created}, updated {updated}."
+        if unchanged:
+            message += f" {unchanged} unchanged rows were skipped."
+        category = "success"
+    elif unchanged:
+        message = f"No changes: all {unchanged} rows match the current challenges."
+        category = "info"
+    else:
+        message = "No valid challenge rows found in the uploaded file."
+        category = "info"
+    return {
+        "created": created,
+        "updated": updated,
+        "unchanged": unchanged,
+        "message": message,
+        "category": category,
+    }
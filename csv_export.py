@@ -0,0 +1,287 @@
+"""Streaming CSV exports for the download endpoints.
+
+Each export projects only the columns it writes (no ORM objects) and reads
+them with ``yield_per`` (a server-side cursor on PostgreSQL); the same row
+sources feed the Excel exports (see excel_export). CSV rows are
+formatted EXPORT_BATCH_SIZE at a time by a generator that export_cache
+streams to the client (and to its disk cache), so the header goes out
+before the query runs and memory stays flat however many rows are exported.
+"""
+import csv
+import io
+
+from sqlalchemy import func
+
+from models import Activity, Challenge, Indicator, db
+
+
+EXPORT_BATCH_SIZE = 1000
+
+ACTIVITY_CSV_HEADER = (
+    "code",
+    "initial_activity",
+    "proposed_activity",
+    "implementing_entity",
+    "delivery_partner",
+    "results_area",
+    "category",
+    "budget_year1",
+    "budget_year2",
+    "budget_year3",
+    "budget_total",
+    "budget_used",  # Keep for backward compatibility (stores Year 1 only)
+    "budget_used_year1",
+    "budget_used_year2",
+    "budget_used_year3",
+    "total_budget_used",  # Sum of all years (matches dashboard display)
+    "status",
+    "progress",
+    "notes",
+)
+
+# Column order per spec
+INDICATOR_CSV_HEADER = (
+    "code",
+    "fundholder_implementing_entity",
+    "key_project_activity",
+    "new_proposed_indicator",
+    "indicator_type",
+    "naphs",
+    "indicator_definition",
+    "data_source",
+    "baseline_proposal_year",
+    "actual_baseline",
+    "target_year_1",
+    "actual_year_1",
+    "progress_year_1",
+    "status_year_1",
+    "qualitative_stage_year_1",
+    "target_year_2",
+    "actual_year_2",
+    "progress_year_2",
+    "status_year_2",
+    "qualitative_stage_year_2",
+    "target_year_3",
+    "actual_year_3",
+    "progress_year_3",
+    "status_year_3",
+    "qualitative_stage_year_3",
+    "last_progress_update",
+    "submitted",
+    "comments",
+    "portal_edited",
+    "comment_addressed",
+)
+
+CHALLENGE_CSV_HEADER = ("challenge", "action", "responsible", "timeline", "status")
+
+_ACTIVITY_COLUMNS = (
+    Activity.code,
+    Activity.initial_activity,
+    Activity.proposed_activity,
+    Activity.implementing_entity,
+    Activity.delivery_partner,
+    Activity.results_area,
+    Activity.category,
+    Activity.budget_year1,
+    Activity.budget_year2,
+    Activity.budget_year3,
+    Activity.budget_total,
+    Activity.budget_used_year1,
+    Activity.budget_used_year2,
+    Activity.budget_used_year3,
+    Activity.status,
+    Activity.notes,
+)
+
+_INDICATOR_COLUMNS = (
+    func.coalesce(func.nullif(Indicator.activity_code, ""), Activity.code).label("code"),
+    Activity.implementing_entity,
+    Activity.proposed_activity,
+    Indicator.new_proposed_indicator,
+    Indicator.indicator_type,
+    Indicator.naphs,
+    Indicator.indicator_definition,
+    Indicator.data_source,
+    Indicator.baseline_proposal_year,
+    Indicator.actual_baseline,
+    Indicator.target_year1,
+    Indicator.actual_year1,
+    Indicator.progress_year1,
+    Indicator.status_year1,
+    Indicator.qualitative_stage_year1,
+    Indicator.target_year2,
+    Indicator.actual_year2,
+    Indicator.progress_year2,
+    Indicator.status_year2,
+    Indicator.qualitative_stage_year2,
+    Indicator.target_year3,
+    Indicator.actual_year3,
+    Indicator.progress_year3,
+    Indicator.status_year3,
+    Indicator.qualitative_stage_year3,
+    Indicator.last_progress_update,
+    Indicator.submitted,
+    Indicator.comments,
+    Indicator.portal_edited,
+    Indicator.comment_addressed,
+)
+
+
+def bool_to_yes_no(val):
+    if val in (True, "true", "True", "yes", "Yes", "1"):
+        return "Yes"
+    if val in (False, "false", "False", "no", "No", "0"):
+        return "No"
+    return ""
+
+
+def _format_progress(val):
+    if val is None:
+        return ""
+    try:
+        return f"{float(val):.2f}"
+    except (ValueError, TypeError):
+        return ""
+
+
+def activity_export_rows(query):
+    """Projected rows of a (filtered) ``Activity.query``, ordered by code, read in batches.
+
+    The query is rebound to the current session: a streamed export runs it
+    after the view's session has been removed, and a query left on that
+    session would hold its connection open.
+    """
+    return query.with_session(db.session()).with_entities(*_ACTIVITY_COLUMNS).order_by(Activity.code).yield_per(EXPORT_BATCH_SIZE)
+
+
+def indicator_export_rows():
+    """Projected rows of every indicator with an activity, ordered by activity code, read in batches.
+
+    ``code`` is the indicator's activity code, falling back to its activity's.
+    """
+    return (
+        db.session.query(*_INDICATOR_COLUMNS)
+        .join(Activity, Indicator.activity_id == Activity.id)
+        .order_by(Activity.code, Indicator.id)
+        .yield_per(EXPORT_BATCH_SIZE)
+    )
+
+
+def budget_used_and_progress(a):
+    """Total budget used over all years and the progress % derived from it, as on the dashboard."""
+    budget_total = a.budget_total or 0
+    total_budget_used = (a.budget_used_year1 or 0) + (a.budget_used_year2 or 0) + (a.budget_used_year3 or 0)
+    # Match dashboard calculation: round() returns float, but we'll use int for CSV
+    calculated_progress = round((total_budget_used / budget_total) * 100) if budget_total > 0 else 0
+    return total_budget_used, calculated_progress
+
+
+def activity_csv_rows(query):
+    """CSV rows for a (filtered) ``Activity.query``, ordered by code."""
+    for a in activity_export_rows(query):
+        budget_total = a.budget_total or 0
+        budget_used_year1 = a.budget_used_year1 or 0
+        budget_used_year2 = a.budget_used_year2 or 0
+        budget_used_year3 = a.budget_used_year3 or 0
+        total_budget_used, calculated_progress = budget_used_and_progress(a)
+        yield (
+            a.code or "",
+            a.initial_activity or "",
+            a.proposed_activity or "",
+            a.implementing_entity or "",
+            a.delivery_partner or "",
+            a.results_area or "",
+            a.category or "",
+            a.budget_year1 or 0,
+            a.budget_year2 or 0,
+            a.budget_year3 or 0,
+            budget_total,
+            budget_used_year1,  # Year 1 value for the backward compatibility column
+            budget_used_year1,
+            budget_used_year2,
+            budget_used_year3,
+            total_budget_used,
+            a.status or "",
+            calculated_progress,
+            (a.notes or "").replace("\n", " ").replace("\r", " "),
+        )
+
+
+def indicator_csv_rows():
+    """CSV rows for every indicator with an activity, ordered by activity code."""
+    for ind in indicator_export_rows():
+        yield (
+            ind.code,
+            ind.implementing_entity,
+            ind.proposed_activity,
+            ind.new_proposed_indicator or "",
+            ind.indicator_type or "",
+            bool_to_yes_no(ind.naphs),
+            ind.indicator_definition or "",
+            ind.data_source or "",
+            ind.baseline_proposal_year or "",
+            ind.actual_baseline or "",
+            ind.target_year1 or "",
+            ind.actual_year1 or "",
+            _format_progress(ind.progress_year1),
+            ind.status_year1 or "",
+            ind.qualitative_stage_year1 or "",
+            ind.target_year2 or "",
+            ind.actual_year2 or "",
+            _format_progress(ind.progress_year2),
+            ind.status_year2 or "",
+            ind.qualitative_stage_year2 or "",
+            ind.target_year3 or "",
+            ind.actual_year3 or "",
+            _format_progress(ind.progress_year3),
+            ind.status_year3 or "",
+            ind.qualitative_stage_year3 or "",
+            ind.last_progress_update.strftime("%Y-%m-%d %H:%M:%S") if ind.last_progress_update else "",
+            ind.submitted or "",
+            ind.comments or "",
+            bool_to_yes_no(ind.portal_edited),
+            bool_to_yes_no(ind.comment_addressed),
+        )
+
+
+def challenge_csv_rows():
+    """CSV rows for every challenge, in id order."""
+    rows = (
+        db.session.query(
+            Challenge.challenge,
+            Challenge.action,
+            Challenge.responsible,
+            Challenge.timeline,
+            Challenge.status,
+        )
+        .order_by(Challenge.id)
+        .yield_per(EXPORT_BATCH_SIZE)
+    )
+    for c in rows:
+        yield tuple(value or "" for value in c)
+
+
+def iter_csv(header, rows, batch_size=EXPORT_BATCH_SIZE):
+    """Yield the CSV text for ``header`` and then ``rows``, ``batch_size`` rows per chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def drain():
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    writer.writerow(header)
+    yield drain()
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= batch_size:
+            yield drain()
+            pending = 0
+    if pending:
+        yield drain()
+
@@ -0,0 +1,128 @@
+"""SQL-side aggregates for the activity dashboard cards.
+
+The summary cards, the status breakdown and the budget-execution-by-year table
+are all derived from a single ``GROUP BY`` over the filter dimensions, so a
+dashboard request never hydrates Activity objects just to add numbers up.
+Requests without a free-text search are served from the pre-summed
+``portfolio_rollups`` table instead of scanning activities.
+"""
+from sqlalchemy import func
+
+from activity_queries import apply_activity_filters, exec_pct_expr, num, total_budget_used_expr
+from models import Activity, db
+from portfolio_rollups import rollup_groups
+
+
+YEARS = ("year1", "year2", "year3")
+
+
+def activity_groups(**filters):
+    """Run one GROUP BY (status, entity, category, results area) over the filtered activities.
+
+    Returns a list of dicts with the group keys and the pre-summed measures
+    (NULL/NaN values are coalesced to 0 in SQL).
+    """
+    query = db.session.query(
+        Activity.status.label("status"),
+        Activity.implementing_entity.label("implementing_entity"),
+        Activity.category.label("category"),
+        Activity.results_area.label("results_area"),
+        func.count(Activity.id).label("activity_count"),
+        func.sum(num(Activity.budget_total)).label("budget_total"),
+        func.sum(num(Activity.budget_year1)).label("budget_year1"),
+        func.sum(num(Activity.budget_year2)).label("budget_year2"),
+        func.sum(num(Activity.budget_year3)).label("budget_year3"),
+        func.sum(num(Activity.budget_used_year1)).label("used_year1"),
+        func.sum(num(Activity.budget_used_year2)).label("used_year2"),
+        func.sum(num(Activity.budget_used_year3)).label("used_year3"),
+        func.sum(total_budget_used_expr()).label("used_total"),
+        func.sum(exec_pct_expr()).label("exec_pct_sum"),
+    )
+    query = apply_activity_filters(query, **filters).group_by(
+        Activity.status,
+        Activity.implementing_entity,
+        Activity.category,
+        Activity.results_area,
+    )
+    return [dict(row._mapping) for row in query.all()]
+
+
+def _pct(part, whole):
+    return (part / whole * 100) if whole > 0 else 0.0
+
+
+def summarize_groups(groups):
+    """Fold grouped measures into the dicts the dashboard template expects.
+
+    Returns a dict with ``summary``, ``status_rows``, ``budget_execution_by_year``
+    and ``budget_execution_total``.
+    """
+    total_activities = 0
+    total_budget = 0.0
+    total_used = 0.0
+    exec_pct_sum = 0.0
+    by_status = {}
+    allocated = {year: 0.0 for year in YEARS}
+    used = {year: 0.0 for year in YEARS}
+
+    for g in groups:
+        count = g["activity_count"] or 0
+        total_activities += count
+        total_budget += g["budget_total"] or 0.0
+        total_used += g["used_total"] or 0.0
+        exec_pct_sum += g["exec_pct_sum"] or 0.0
+        status = by_status.setdefault(g["status"] or "Unknown", {"count": 0, "budget": 0.0})
+        status["count"] += count
+        status["budget"] += g["budget_total"] or 0.0
+        for year in YEARS:
+            allocated[year] += g[f"budget_{year}"] or 0.0
+            used[year] += g[f"used_{year}"] or 0.0
+
+    budget_execution_by_year = []
+    for i, year in enumerate(YEARS, start=1):
+        year_allocated = max(0.0, allocated[year])
+        year_used = max(0.0, used[year])
+        budget_execution_by_year.append({
+            "year": f"Year {i}",
+            "allocated": year_allocated,
+            "used": year_used,
+            "execution_pct": _pct(year_used, year_allocated),
+        })
+    all_allocated = sum(row["allocated"] for row in budget_execution_by_year)
+    all_used = sum(row["used"] for row in budget_execution_by_year)
+
+    return {
+        "summary": {
+            "total_activities": total_activities,
+            "total_budget": total_budget,
+            "total_used": total_used,
+            # Average progress reflects average budget execution percentage
+            "avg_progress": exec_pct_sum / total_activities if total_activities > 0 else 0,
+        },
+        "status_rows": [
+            {"status": k, "count": v["count"], "budget": v["budget"]}
+            for k, v in sorted(by_status.items())
+        ],
+        "budget_execution_by_year": budget_execution_by_year,
+        "budget_execution_total": {
+            "allocated": all_allocated,
+            "used": all_used,
+            "execution_pct": _pct(all_used, all_allocated),
+        },
+    }
+
+
+def dashboard_summary(search_query=None, **filters):
+    """Aggregate the dashboard cards for the given filters with a single query.
+
+    Dimension-only filters read ``portfolio_rollups``; a search term needs the
+    activity rows, so it falls back to the GROUP BY over ``activities``.
+    """
+    if not search_query:
+        try:
+            return summarize_groups(rollup_groups(**filters))
+        except Exception as e:
+            # Rollup table missing (migration not applied yet): aggregate activities instead
+            print(f"Error reading portfolio rollups, falling back to activities: {e}")
+            db.session.rollback()
+    return summarize_groups(activity_groups(search_query=search_query, **filters))
@@ -0,0 +1,47 @@
+"""Per-table data version counters used to invalidate in-process caches.
+
+Writers call ``bump_data_version("activities")`` before committing; readers
+call ``get_data_version("activities")`` and use the number as part of their
+cache key. The counter lives in the database so that every gunicorn worker
+sees the same value without a shared cache service.
+"""
+from flask import g, has_app_context
+from sqlalchemy import insert
+
+from models import DataVersion, db
+
+
+ACTIVITIES = "activities"
+INDICATORS = "indicators"
+CHALLENGES = "challenges"
+
+
+def bump_data_version(name):
+    """Increment the version for ``name`` in the current transaction (no commit)."""
+    table = DataVersion.__table__
+    result = db.session.execute(
+        table.update()
+        .where(table.c.name == name)
+        .values(version=table.c.version + 1, updated_at=db.func.current_timestamp())
+    )
+    if result.rowcount == 0:
+        db.session.execute(insert(table).values(name=name, version=1))
+    if has_app_context():
+        g.pop("_data_versions", None)
+
+
+def get_data_version(name):
+    """Return the current version for ``name`` (0 if never bumped).
+
+    Looked up at most once per request; a missing table reads as version 0.
+    """
+    versions = g.setdefault("_data_versions", {}) if has_app_context() else {}
+    if name not in versions:
+        try:
+            row = db.session.get(DataVersion, name)
+            versions[name] = row.version if row else 0
+        except Exception as e:
+            print(f"Error reading data version {name}: {e}")
+            db.session.rollback()
+            versions[name] = 0
+    return versions[name]
@@ -0,0 +1,83 @@
+"""Write-only Excel exports for the download endpoints.
+
+Workbooks are built with openpyxl ``write_only=True``: rows are serialized
+as they are appended instead of being kept as cell objects, and they come
+from the same column-projected ``yield_per`` sources as the CSV exports
+(see csv_export). The finished file is written straight into the export
+cache (see export_cache) and sent from there.
+"""
+from openpyxl import Workbook
+
+from csv_export import bool_to_yes_no, indicator_export_rows
+
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def to_num_or_text(val, is_quantitative):
+    """Numeric cell for quantitative indicators where the text parses; text otherwise."""
+    if val is None or val == "":
+        return ""
+    if is_quantitative:
+        try:
+            return float(str(val).strip())
+        except ValueError:
+            return str(val)
+    return str(val)
+
+
+def _progress_number(val):
+    if val is None:
+        return ""
+    try:
+        return float(val)
+    except (ValueError, TypeError):
+        return ""
+
+
+def indicator_excel_rows():
+    """Indicator rows typed for Excel, in INDICATOR_CSV_HEADER order."""
+    for ind in indicator_export_rows():
+        is_quantitative = (ind.indicator_type or "").strip() == "Quantitative"
+        yield (
+            ind.code,
+            ind.implementing_entity,
+            ind.proposed_activity,
+            ind.new_proposed_indicator or "",
+            ind.indicator_type or "",
+            bool_to_yes_no(ind.naphs),
+            ind.indicator_definition or "",
+            ind.data_source or "",
+            to_num_or_text(ind.baseline_proposal_year, is_quantitative),
+            to_num_or_text(ind.actual_baseline, is_quantitative),
+            to_num_or_text(ind.target_year1, is_quantitative),
+            to_num_or_text(ind.actual_year1, is_quantitative),
+            _progress_number(ind.progress_year1),
+            ind.status_year1 or "",
+            ind.qualitative_stage_year1 or "",
+            to_num_or_text(ind.target_year2, is_quantitative),
+            to_num_or_text(ind.actual_year2, is_quantitative),
+            _progress_number(ind.progress_year2),
+            ind.status_year2 or "",
+            ind.qualitative_stage_year2 or "",
+            to_num_or_text(ind.target_year3, is_quantitative),
+            to_num_or_text(ind.actual_year3, is_quantitative),
+            _progress_number(ind.progress_year3),
+            ind.status_year3 or "",
+            ind.qualitative_stage_year3 or "",
+            ind.last_progress_update.strftime("%Y-%m-%d %H:%M:%S") if ind.last_progress_update else "",
+            ind.submitted or "",
+            ind.comments or "",
+            bool_to_yes_no(ind.portal_edited),
+            bool_to_yes_no(ind.comment_addressed),
+        )
+
+
+def write_workbook(out, sheet_title, header, rows):
+    """Write ``header`` and ``rows`` to ``out`` as a one-sheet write-only workbook."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_title)
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(out)
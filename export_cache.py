@@ -0,0 +1,288 @@
+"""Disk cache and conditional GET for the export downloads.
+
+A download is identified by its endpoint, its normalized query args (filters,
+format) and the current versions of the data sets it reads (see
+data_versions). The SHA-256 of that key is the cache file name and the
+response's ETag; the newest ``data_versions.updated_at`` of those data sets
+is its Last-Modified. So:
+
+- a browser or proxy revalidating with If-None-Match / If-Modified-Since
+  gets a 304 before any export query runs;
+- otherwise the finished file is served from EXPORT_CACHE_DIR when another
+  request (in any gunicorn worker) already built it at these versions;
+- otherwise it is built once more: CSV is streamed to the client and written
+  to the cache at the same time, workbooks and Parquet files are written
+  into the cache and sent from there.
+
+Text exports are stored gzip-compressed and sent as-is to clients that
+accept gzip. Files are replaced atomically, and the directory is trimmed to
+EXPORT_CACHE_MAX_BYTES, least recently used first (mtime is touched on every
+hit). EXPORT_CACHE_MAX_BYTES=0 disables the disk cache; ETags and 304s still
+work. Responses are ``private, no-cache``: exports are only for logged-in
+users, and clients must revalidate before reusing one.
+"""
+import gzip
+import hashlib
+import os
+import tempfile
+import time
+from datetime import timezone
+
+from flask import Response, request, send_file, stream_with_context
+from sqlalchemy import func
+from werkzeug.http import is_resource_modified
+
+from data_versions import get_data_version
+from models import DataVersion, db
+
+
+EXPORT_CACHE_DIR = os.environ.get("EXPORT_CACHE_DIR") or os.path.join(
+    tempfile.gettempdir(), "pfund-export-cache"
+)
+EXPORT_CACHE_MAX_BYTES = int(os.environ.get("EXPORT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Bump when an export's columns or formatting change, so cached files and ETags stop matching
+EXPORT_FORMAT_VERSION = 1
+
+# Uncached builds (cache disabled or unwritable) larger than this spill to a temporary file
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+READ_CHUNK = 64 * 1024
+
+# Temporary files of builds older than this are assumed abandoned
+STALE_TMP_SECONDS = 3600
+
+
+def export_key(versions):
+    """Cache key / ETag for the current request's export at the current ``versions``."""
+    args = sorted(
+        (name, tuple(sorted(v for v in request.args.getlist(name) if v)))
+        for name in set(request.args.keys())
+    )
+    stamp = tuple((name, get_data_version(name)) for name in versions)
+    raw = repr((EXPORT_FORMAT_VERSION, request.endpoint, [a for a in args if a[1]], stamp))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _last_modified(versions):
+    """When any of ``versions`` was last bumped (UTC), or None if never."""
+    try:
+        value = (
+            db.session.query(func.max(DataVersion.updated_at))
+            .filter(DataVersion.name.in_(versions))
+            .scalar()
+        )
+    except Exception as e:
+        print(f"Error reading data version timestamps: {e}")
+        db.session.rollback()
+        return None
+    return value.replace(tzinfo=timezone.utc) if value else None
+
+
+class _PendingEntry:
+    """A cache file being written; becomes visible only on commit()."""
+
+    def __init__(self, cache, key, compressed):
+        self.cache = cache
+        self.key = key
+        self.compressed = compressed
+        fd, self.tmp_path = tempfile.mkstemp(dir=cache.directory, suffix=".tmp")
+        self.raw = os.fdopen(fd, "w+b")
+        self.file = gzip.GzipFile(fileobj=self.raw, mode="wb") if compressed else self.raw
+
+    def commit(self):
+        """Publish the file and return it opened for reading (None if that failed)."""
+        try:
+            if self.compressed:
+                self.file.close()
+            self.raw.flush()
+            self.raw.seek(0)
+            os.replace(self.tmp_path, self.cache.path(self.key, self.compressed))
+        except OSError as e:
+            print(f"Error storing export {self.key}: {e}")
+            self.discard()
+            return None
+        self.cache.trim()
+        return self.raw
+
+    def discard(self):
+        try:
+            self.file.close()
+            self.raw.close()
+            os.unlink(self.tmp_path)
+        except OSError:
+            pass
+
+
+class ExportCache:
+    """Finished export files in ``directory``, at most ``max_bytes`` in total."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, key, compressed):
+        return os.path.join(self.directory, key + (".gz" if compressed else ".bin"))
+
+    def open(self, key, compressed):
+        """The cached file for ``key`` opened for reading, or None."""
+        if not self.max_bytes:
+            return None
+        path = self.path(key, compressed)
+        try:
+            f = open(path, "rb")
+        except OSError:
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return f
+
+    def create(self, key, compressed):
+        """A _PendingEntry for ``key``, or None when the cache is disabled or unwritable."""
+        if not self.max_bytes:
+            return None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            return _PendingEntry(self, key, compressed)
+        except OSError as e:
+            print(f"Export cache unavailable ({self.directory}): {e}")
+            return None
+
+    def trim(self):
+        """Delete the least recently used files until the total fits in ``max_bytes``.
+
+        Also removes temporary files left behind by builds that died (older than STALE_TMP_SECONDS).
+        """
+        try:
+            entries = []
+            for e in os.scandir(self.directory):
+                if not e.is_file():
+                    continue
+                if e.name.endswith((".gz", ".bin")):
+                    entries.append(e)
+                elif e.name.endswith(".tmp") and time.time() - e.stat().st_mtime > STALE_TMP_SECONDS:
+                    os.unlink(e.path)
+            entries.sort(key=lambda e: e.stat().st_mtime)
+            total = sum(e.stat().st_size for e in entries)
+            for entry in entries:
+                if total <= self.max_bytes:
+                    break
+                os.unlink(entry.path)
+                total -= entry.stat().st_size
+        except OSError as e:
+            print(f"Error trimming export cache: {e}")
+
+
+export_cache = ExportCache(EXPORT_CACHE_DIR, EXPORT_CACHE_MAX_BYTES)
+
+
+def _finish(response, key, last_modified, filename):
+    response.set_etag(key)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}"
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def _not_modified(key, last_modified):
+    """A 304 response if the client's copy is current, else None."""
+    if is_resource_modified(request.environ, etag=key, last_modified=last_modified):
+        return None
+    response = Response(status=304)
+    response.set_etag(key)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def _send(f, mimetype):
+    response = send_file(f, mimetype=mimetype, etag=False, conditional=False)
+    response.content_length = os.fstat(f.fileno()).st_size
+    return response
+
+
+def _gunzip_chunks(f):
+    try:
+        with gzip.GzipFile(fileobj=f, mode="rb") as data:
+            for chunk in iter(lambda: data.read(READ_CHUNK), b""):
+                yield chunk
+    finally:
+        f.close()
+
+
+def _tee(chunks, entry):
+    """Yield ``chunks`` (text) as UTF-8 while writing them to ``entry``; publish it at the end."""
+    try:
+        for text in chunks:
+            data = text.encode("utf-8")
+            if entry is not None:
+                entry.file.write(data)
+            yield data
+    except BaseException:
+        # Includes GeneratorExit when the client goes away mid-download
+        if entry is not None:
+            entry.discard()
+        raise
+    if entry is not None:
+        f = entry.commit()
+        if f is not None:
+            f.close()
+
+
+def cached_stream(filename, mimetype, versions, chunks):
+    """Text export response for ``chunks`` (a lazy iterable of str), cached gzip-compressed.
+
+    ``versions`` names the data sets the export reads.
+    """
+    key = export_key(versions)
+    last_modified = _last_modified(versions)
+    not_modified = _not_modified(key, last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    f = export_cache.open(key, compressed=True)
+    if f is None:
+        entry = export_cache.create(key, compressed=True)
+        response = Response(stream_with_context(_tee(chunks, entry)), mimetype=mimetype)
+    elif "gzip" in request.accept_encodings:
+        response = _send(f, mimetype)
+        response.content_encoding = "gzip"
+    else:
+        response = Response(_gunzip_chunks(f), mimetype=mimetype)
+    response.vary.add("Accept-Encoding")
+    return _finish(response, key, last_modified, filename)
+
+
+def cached_file(filename, mimetype, versions, write):
+    """Binary export response; ``write(out)`` builds the file into a binary stream.
+
+    ``versions`` names the data sets the export reads.
+    """
+    key = export_key(versions)
+    last_modified = _last_modified(versions)
+    not_modified = _not_modified(key, last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    f = export_cache.open(key, compressed=False)
+    if f is None:
+        entry = export_cache.create(key, compressed=False)
+        if entry is not None:
+            try:
+                write(entry.file)
+            except BaseException:
+                entry.discard()
+                raise
+            f = entry.commit()
+        if f is None:
+            f = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+            write(f)
+            f.seek(0)
+            return _finish(send_file(f, mimetype=mimetype, etag=False), key, last_modified, filename)
+    return _finish(_send(f, mimetype), key, last_modified, filename)
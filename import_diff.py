@@ -0,0 +1,83 @@
+"""Row-level outcome of an Excel import.
+
+Every parsed row ends up inserted, updated, unchanged or skipped. The
+importers compare each row with the current database row (prefetched per
+batch) and record the outcome here. A dry run records the same diff without
+writing anything, and unchanged rows are never written.
+"""
+import math
+
+
+INSERTED = "inserted"
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+SKIPPED = "skipped"
+
+ACTIONS = (INSERTED, UPDATED, UNCHANGED, SKIPPED)
+
+# Rows listed individually; later rows are only counted
+DIFF_DETAIL_LIMIT = 500
+
+
+def _json_value(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def changed_fields(current, new_values, fields, normalize=None):
+    """``{field: [current, new]}`` for the fields whose value would change.
+
+    ``current`` is an object with the field attributes; ``new_values`` a dict.
+    ``normalize(field, value)`` maps both sides to comparable values.
+    """
+    changes = {}
+    for field in fields:
+        old = getattr(current, field)
+        new = new_values[field]
+        if normalize:
+            same = normalize(field, old) == normalize(field, new)
+        else:
+            same = old == new
+        if not same:
+            changes[field] = [_json_value(old), _json_value(new)]
+    return changes
+
+
+class ImportDiff:
+    """Counts per action plus the first DIFF_DETAIL_LIMIT changed or skipped rows.
+
+    Unchanged rows are only counted.
+    """
+
+    def __init__(self, detail_limit=DIFF_DETAIL_LIMIT):
+        self.detail_limit = detail_limit
+        self.counts = dict.fromkeys(ACTIONS, 0)
+        self.rows = []
+
+    def record(self, action, key, changes=None, reason=None):
+        self.counts[action] += 1
+        if action == UNCHANGED or len(self.rows) >= self.detail_limit:
+            return
+        entry = {"action": action, "key": key}
+        if changes:
+            entry["changes"] = changes
+        if reason:
+            entry["reason"] = reason
+        self.rows.append(entry)
+
+    def summary(self, noun):
+        """One-line dry-run message, e.g. "Dry run: 3 activities would be inserted, ..."."""
+        return (
+            f"Dry run: {self.counts[INSERTED]} {noun} would be inserted, "
+            f"{self.counts[UPDATED]} updated, {self.counts[UNCHANGED]} unchanged, "
+            f"{self.counts[SKIPPED]} skipped. Nothing was saved."
+        )
+
+    def as_dict(self):
+        listed = sum(n for action, n in self.counts.items() if action != UNCHANGED)
+        return {
+            "counts": dict(self.counts),
+            "rows": self.rows,
+            "truncated": listed > len(self.rows),
+        }
@@ -0,0 +1,330 @@
+"""Background Excel imports.
+
+Upload routes read the file into memory, record an ``ImportJob`` and hand it
+to a small in-process thread pool, then return straight away with the job id.
+The worker runs the importer in its own app context (and so its own database
+session); ``/imports/<id>`` reports the job's status and progress as JSON.
+Activity and indicator imports can run as a dry run, which stores the row
+diff on the job without writing anything. Re-uploads of a file that was
+already imported, with nothing written since, finish at once without a worker
+(see import_ledger).
+
+No broker is involved: each gunicorn worker runs its own pool
+(``IMPORT_WORKERS`` threads, default 1). Only one job of each kind runs at a
+time across all processes, so imports never compete for the same rows: a
+worker takes a per-kind lock in the database before marking its job running,
+and a job whose kind already has a running job fails instead of starting.
+
+While a job runs, its worker refreshes ``heartbeat_at`` every
+IMPORT_HEARTBEAT_SECONDS. A running job without a heartbeat for
+IMPORT_STALE_SECONDS (its process exited mid-import) is marked failed when
+it is polled or when another job of its kind starts. SQLite allows no
+heartbeat writes while an import holds its write lock, so there only the
+process running the job knows it is alive. The same goes for a job still
+queued IMPORT_STALE_SECONDS after its upload that no process of this kind
+holds: its file's bytes were lost with the process that received them.
+"""
+import io
+import json
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, func, or_, text
+
+from activity_import import import_activities
+from challenge_import import import_challenges
+from import_ledger import RowLedger, file_digest, find_identical_import
+from indicator_import import import_indicators
+from models import ImportJob, db
+
+
+IMPORTERS = {
+    "activities": import_activities,
+    "indicators": import_indicators,
+    "challenges": import_challenges,
+}
+
+# Importers that accept dry_run=True
+DRY_RUN_KINDS = ("activities", "indicators")
+
+IMPORT_WORKERS = int(os.environ.get("IMPORT_WORKERS", "1"))
+IMPORT_HEARTBEAT_SECONDS = int(os.environ.get("IMPORT_HEARTBEAT_SECONDS", "30"))
+IMPORT_STALE_SECONDS = int(os.environ.get("IMPORT_STALE_SECONDS", "300"))
+
+_executor = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix="import")
+
+# job id -> rows read so far, for jobs running in this process
+_progress = {}
+# ids of jobs submitted to this process's pool and not started yet
+_pending = set()
+_progress_lock = threading.Lock()
+
+
+def enqueue_import(kind, filename, data, user_id=None, dry_run=False):
+    """Record a queued ImportJob for ``data`` (the uploaded file's bytes) and start it."""
+    dry_run = bool(dry_run) and kind in DRY_RUN_KINDS
+    file_hash = file_digest(data)
+    job = ImportJob(
+        kind=kind, filename=filename, status="queued", dry_run=dry_run,
+        file_hash=file_hash, created_by=user_id,
+    )
+    previous = find_identical_import(kind, file_hash)
+    if previous is not None:
+        _finish_as_duplicate(job, previous)
+        db.session.add(job)
+        db.session.commit()
+        return job
+    fail_stale_jobs(kind)
+    running = _running_job(kind)
+    if running is not None:
+        _fail_as_concurrent(job, running)
+        db.session.add(job)
+        db.session.commit()
+        return job
+    db.session.add(job)
+    db.session.commit()
+    with _progress_lock:
+        _pending.add(job.id)
+    _executor.submit(_run_job, current_app._get_current_object(), job.id, kind, filename, data, dry_run)
+    return job
+
+
+def _finish_as_duplicate(job, previous):
+    """Complete ``job`` without parsing: its file is byte-identical to ``previous``'s."""
+    rows = previous.created_count + previous.updated_count + previous.unchanged_count
+    job.status = "succeeded"
+    job.started_at = job.finished_at = datetime.utcnow()
+    job.rows_processed = previous.rows_processed
+    job.unchanged_count = rows
+    if job.dry_run:
+        job.message = (
+            f"Dry run: this file is identical to the one imported by job #{previous.id} "
+            "and nothing has changed since, so nothing would change."
+        )
+    else:
+        job.message = (
+            f"This file is identical to the one imported by job #{previous.id} "
+            "and nothing has changed since; nothing to import."
+        )
+
+
+def _running_job(kind, exclude_id=None):
+    """The running job of ``kind`` (other than ``exclude_id``), if any."""
+    query = ImportJob.query.filter(ImportJob.kind == kind, ImportJob.status == "running")
+    if exclude_id is not None:
+        query = query.filter(ImportJob.id != exclude_id)
+    return query.order_by(ImportJob.id).first()
+
+
+def _fail_as_concurrent(job, running):
+    job.status = "failed"
+    job.finished_at = datetime.utcnow()
+    job.message = (
+        f"Another {job.kind} import (job #{running.id}) is still running; "
+        "upload the file again once it has finished."
+    )
+
+
+def fail_stale_jobs(kind=None):
+    """Mark jobs (of ``kind``) whose process is gone as failed (no commit).
+
+    That is running jobs without a recent heartbeat, and jobs queued longer
+    than IMPORT_STALE_SECONDS ago that never started. Jobs running or waiting
+    in this process are left alone. Returns the jobs marked.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=IMPORT_STALE_SECONDS)
+    with _progress_lock:
+        running_here, pending_here = list(_progress), list(_pending)
+    last_seen = func.coalesce(ImportJob.heartbeat_at, ImportJob.started_at, ImportJob.created_at)
+    query = ImportJob.query.filter(or_(
+        and_(ImportJob.status == "running", last_seen < cutoff, ImportJob.id.not_in(running_here)),
+        and_(ImportJob.status == "queued", ImportJob.created_at < cutoff, ImportJob.id.not_in(pending_here)),
+    ))
+    if kind is not None:
+        query = query.filter(ImportJob.kind == kind)
+    stale = query.all()
+    for job in stale:
+        if job.status == "queued":
+            job.message = f"The {job.kind} import never started (its worker exited); upload the file again."
+        else:
+            job.message = f"The {job.kind} import stopped before finishing (its worker exited); upload the file again."
+        job.status = "failed"
+        job.finished_at = datetime.utcnow()
+    return stale
+
+
+def _lock_kind(job):
+    """Serialize job starts of ``job.kind`` across processes until the transaction ends."""
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": f"import_jobs:{job.kind}"})
+        return
+    # SQLite has a single writer: the first write of the transaction takes its lock
+    db.session.execute(
+        ImportJob.__table__.update()
+        .where(ImportJob.__table__.c.id == job.id)
+        .values(status=ImportJob.__table__.c.status)
+    )
+
+
+def _start_job(job_id):
+    """Mark the job running, or failed if its kind already has a running job; commits.
+
+    Returns whether the job may run (not when it was already failed as stale).
+    """
+    job = db.session.get(ImportJob, job_id)
+    if job.status != "queued":
+        db.session.rollback()
+        return False
+    _lock_kind(job)
+    fail_stale_jobs(job.kind)
+    running = _running_job(job.kind, exclude_id=job.id)
+    if running is not None:
+        _fail_as_concurrent(job, running)
+    else:
+        job.status = "running"
+        job.started_at = job.heartbeat_at = datetime.utcnow()
+        with _progress_lock:
+            _progress[job.id] = 0
+    db.session.commit()
+    return running is None
+
+
+def _fail_unstarted(job_id, message):
+    """Mark a job that could not be started failed (left to fail_stale_jobs if that fails too)."""
+    with _progress_lock:
+        _progress.pop(job_id, None)
+    try:
+        db.session.rollback()
+        job = db.session.get(ImportJob, job_id)
+        job.status = "failed"
+        job.message = message
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+    except Exception as e:
+        print(f"Error saving failure of import job {job_id}: {e}")
+        db.session.rollback()
+
+
+def _heartbeat(app, job_id, stop):
+    """Refresh the job's heartbeat_at until ``stop`` is set."""
+    with app.app_context():
+        while not stop.wait(IMPORT_HEARTBEAT_SECONDS):
+            try:
+                # Separate connection, like _set_progress
+                with db.engine.begin() as connection:
+                    connection.execute(
+                        ImportJob.__table__.update()
+                        .where(ImportJob.__table__.c.id == job_id)
+                        .values(heartbeat_at=datetime.utcnow())
+                    )
+            except Exception as e:
+                print(f"Error saving heartbeat for import job {job_id}: {e}")
+
+
+def _set_progress(job_id, rows_read):
+    with _progress_lock:
+        _progress[job_id] = rows_read
+    if db.engine.dialect.name == "sqlite":
+        # The import transaction holds SQLite's write lock; pollers in this
+        # process read the in-memory value instead
+        return
+    try:
+        # Separate connection so the count is visible before the import commits
+        with db.engine.begin() as connection:
+            connection.execute(
+                ImportJob.__table__.update()
+                .where(ImportJob.__table__.c.id == job_id)
+                .values(rows_processed=rows_read)
+            )
+    except Exception as e:
+        print(f"Error saving progress for import job {job_id}: {e}")
+
+
+def _run_job(app, job_id, kind, filename, data, dry_run=False):
+    with _progress_lock:
+        _pending.discard(job_id)
+    with app.app_context():
+        try:
+            started = _start_job(job_id)
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"Error starting {kind} import job {job_id}: {exc}")
+            print(traceback.format_exc())
+            _fail_unstarted(job_id, f"Error starting {kind} import: {exc}")
+            return
+        if not started:
+            return
+        stop_heartbeat = threading.Event()
+        if db.engine.dialect.name != "sqlite":
+            threading.Thread(
+                target=_heartbeat, args=(app, job_id, stop_heartbeat), name=f"import-{job_id}-heartbeat", daemon=True,
+            ).start()
+
+        try:
+            options = {"dry_run": True} if dry_run else {}
+            ledger = RowLedger(kind)
+            result = IMPORTERS[kind](
+                io.BytesIO(data),
+                filename,
+                progress=lambda rows_read: _set_progress(job_id, rows_read),
+                ledger=ledger,
+                **options,
+            )
+            job = db.session.get(ImportJob, job_id)
+            job.status = "succeeded"
+            job.created_count = result.get("created", 0)
+            job.updated_count = result.get("updated", 0)
+            job.unchanged_count = result.get("unchanged", 0)
+            job.skipped_count = result.get("skipped", 0)
+            job.error_count = result.get("errors", 0)
+            job.message = result["message"]
+            job.data_version = ledger.version
+            if "diff" in result:
+                job.diff = json.dumps(result["diff"])
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"Error running {kind} import job {job_id}: {exc}")
+            print(traceback.format_exc())
+            db.session.rollback()
+            job = db.session.get(ImportJob, job_id)
+            job.status = "failed"
+            job.message = f"Error reading {kind} file: {exc}"
+        finally:
+            stop_heartbeat.set()
+
+        with _progress_lock:
+            job.rows_processed = _progress.pop(job_id, job.rows_processed or 0)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+
+def job_status(job):
+    """JSON-ready status of ``job`` (live row count while it runs in this process)."""
+    with _progress_lock:
+        rows_processed = _progress.get(job.id, job.rows_processed or 0)
+    finished = job.status in ("succeeded", "failed")
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "filename": job.filename,
+        "status": job.status,
+        "dry_run": bool(job.dry_run),
+        "finished": finished,
+        "rows_processed": rows_processed,
+        "created": job.created_count,
+        "updated": job.updated_count,
+        "unchanged": job.unchanged_count,
+        "skipped": job.skipped_count,
+        "errors": job.error_count,
+        "message": job.message,
+        "category": (
+            "error" if job.status == "failed"
+            else "success" if (job.created_count or job.updated_count) and not job.dry_run else "info"
+        ),
+        "diff": json.loads(job.diff) if job.diff else None,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
@@ -0,0 +1,165 @@
+"""Content-hash ledger for the Excel imports.
+
+File level: every import job stores the SHA-256 of the uploaded bytes and the
+data versions right after it committed. Uploading a byte-identical file again
+while those versions are still current (nothing was written since) is
+answered without parsing it.
+
+Row level: ``import_row_hashes`` keeps a digest of the last imported values
+per key (activity code, indicator code or (challenge, action)). While the
+ledger is current, a row whose digest matches is counted as unchanged before
+any activity, indicator or challenge row is loaded. When anything else wrote
+to the data since the last import, the ledger for that kind is not trusted:
+every row is compared as usual and the ledger is rebuilt from this upload.
+
+Imports of one kind are expected to run one at a time (the default single
+import worker, see import_jobs).
+"""
+import hashlib
+
+from sqlalchemy import bindparam, insert
+
+from data_versions import ACTIVITIES, CHALLENGES, INDICATORS
+from models import DataVersion, ImportJob, ImportRowHash, db
+
+
+# Data sets whose writes can change the outcome of an import of each kind
+LEDGER_VERSIONS = {
+    "activities": (ACTIVITIES,),
+    "indicators": (ACTIVITIES, INDICATORS),  # codes resolve to activities
+    "challenges": (CHALLENGES,),
+}
+
+# Keys looked up per IN (...) query
+LOOKUP_CHUNK = 500
+
+
+def file_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _digest(value):
+    return hashlib.sha1(repr(value).encode("utf-8")).hexdigest()
+
+
+def key_digest(key):
+    return _digest(key)
+
+
+def row_digest(values):
+    """Digest of one parsed row (str/None/float values, in field order)."""
+    return _digest(tuple(values))
+
+
+def version_stamp(kind):
+    """Current data versions relevant to ``kind``, e.g. "activities=12,indicators=7"."""
+    names = LEDGER_VERSIONS[kind]
+    versions = dict(
+        db.session.query(DataVersion.name, DataVersion.version)
+        .filter(DataVersion.name.in_(names))
+        .all()
+    )
+    return ",".join(f"{name}={versions.get(name, 0)}" for name in names)
+
+
+def _last_import(kind, file_hash=None):
+    query = ImportJob.query.filter(
+        ImportJob.kind == kind,
+        ImportJob.status == "succeeded",
+        ImportJob.dry_run.is_(False),
+        ImportJob.data_version.isnot(None),
+    )
+    if file_hash is not None:
+        query = query.filter(ImportJob.file_hash == file_hash)
+    return query.order_by(ImportJob.finished_at.desc(), ImportJob.id.desc()).first()
+
+
+def find_identical_import(kind, file_hash):
+    """The earlier import of these exact bytes, if nothing was written since; else None."""
+    previous = _last_import(kind, file_hash)
+    if previous is not None and previous.data_version == version_stamp(kind):
+        return previous
+    return None
+
+
+class RowLedger:
+    """Row digests for one import kind.
+
+    Usage (per batch of parsed rows):
+        ledger.prefetch(keys)
+        if ledger.unchanged(key, values): ...  # skip the row
+        ledger.record(key, values)             # after writing or comparing it
+        ledger.save()                          # before commit (not on dry runs)
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        last = _last_import(kind)
+        self.trusted = last is not None and last.data_version == version_stamp(kind)
+        self.version = None  # data versions after save()
+        self._stored = {}  # key digest -> row digest (None: not in the ledger)
+        self._seen = set()
+        self._pending = {}
+
+    def prefetch(self, keys):
+        """Load the stored digests for ``keys`` in one query per LOOKUP_CHUNK keys."""
+        if self.trusted:
+            self._load({key_digest(k) for k in keys})
+
+    def _load(self, digests):
+        digests = [d for d in digests if d not in self._stored]
+        for start in range(0, len(digests), LOOKUP_CHUNK):
+            chunk = digests[start:start + LOOKUP_CHUNK]
+            rows = (
+                db.session.query(ImportRowHash.key_hash, ImportRowHash.row_hash)
+                .filter(ImportRowHash.kind == self.kind, ImportRowHash.key_hash.in_(chunk))
+                .all()
+            )
+            self._stored.update(dict.fromkeys(chunk))
+            self._stored.update(rows)
+
+    def unchanged(self, key, values):
+        """True if ``values`` are what was last imported for ``key``.
+
+        Only the first row of a key in the file can match: once a key has
+        been processed, its stored digest no longer describes the data.
+        """
+        digest = key_digest(key)
+        first = digest not in self._seen
+        self._seen.add(digest)
+        return self.trusted and first and self._stored.get(digest) == row_digest(values)
+
+    def record(self, key, values):
+        """Remember that ``key`` now holds ``values`` (written by save())."""
+        self._pending[key_digest(key)] = row_digest(values)
+
+    def save(self):
+        """Write the recorded digests in the import's transaction and stamp the versions.
+
+        Call after the import's bump_data_version() and before its commit.
+        """
+        table = ImportRowHash.__table__
+        if self.trusted:
+            self._load(self._pending)
+        else:
+            # Stale entries may describe rows that were edited since; start over
+            db.session.execute(table.delete().where(table.c.kind == self.kind))
+        inserts = []
+        updates = []
+        for key_hash, row_hash in self._pending.items():
+            stored = self._stored.get(key_hash) if self.trusted else None
+            if stored is None:
+                inserts.append({"kind": self.kind, "key_hash": key_hash, "row_hash": row_hash})
+            elif stored != row_hash:
+                updates.append({"b_key_hash": key_hash, "b_row_hash": row_hash})
+        if inserts:
+            db.session.execute(insert(table), inserts)
+        if updates:
+            db.session.execute(
+                table.update()
+                .where(table.c.kind == self.kind, table.c.key_hash == bindparam("b_key_hash"))
+                .values(row_hash=bindparam("b_row_hash"), updated_at=db.func.current_timestamp()),
+                updates,
+            )
+        self._pending = {}
+        self.version = version_stamp(self.kind)
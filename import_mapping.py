@@ -0,0 +1,247 @@
+"""Header mapping, streaming sheet reading and column-wise value extraction for the Excel importers.
+
+Each importer describes its sheet as a tuple of ImportField (target name,
+candidate headers in priority order, text or number). The headers are
+resolved against the file's columns once, and every field is cleaned over
+whole pandas columns (strip, blank/NaN -> None, numeric coercion) before the
+rows are handed out as plain tuples, so no per-row, per-field header lookups
+or ``iterrows()`` Series are involved.
+
+.xlsx uploads are read straight from the upload stream with openpyxl in
+read-only mode and processed in chunks of CHUNK_SIZE rows, so memory stays
+flat for large workbooks and nothing is written to disk.
+"""
+import io
+from collections import namedtuple
+
+import pandas as pd
+from openpyxl import load_workbook
+
+
+TEXT = "text"
+NUMBER = "number"
+
+CHUNK_SIZE = 1000
+
+# ``partial``: also accept a header that merely contains the name (text fields only)
+ImportField = namedtuple("ImportField", ["name", "headers", "kind", "partial"])
+
+
+def text_field(name, *headers, partial=False):
+    return ImportField(name, headers, TEXT, partial)
+
+
+def number_field(name, *headers):
+    return ImportField(name, headers, NUMBER, False)
+
+
+# --- Sheet layouts ----------------------------------------------------------
+
+ACTIVITY_FIELDS = (
+    text_field("code", "code", "code_new_improved_noch", partial=True),
+    text_field("initial_activity", "Initial activities", "Initial Activity", partial=True),
+    text_field("proposed_activity", "New Proposed Project Activity", "Proposed Activity", partial=True),
+    text_field("implementing_entity", "IE in charge of impl", "Implementing Entity", partial=True),
+    text_field("delivery_partner", "Delivery partner", partial=True),
+    text_field("results_area", "results_area", "Results Area", partial=True),
+    text_field("category", "sr_category", "Category", partial=True),
+    text_field("notes", "Notes", "Note", "Comments", partial=True),
+    number_field("budget_year1", "Sum of adjusted_bdg_year1", "Budget Y1", "budget_year1"),
+    number_field("budget_year2", "Sum of adjusted_bdg_year2", "Budget Y2", "budget_year2"),
+    number_field("budget_year3", "Sum of adjusted_bdg_year3", "Budget Y3", "budget_year3"),
+    number_field("budget_total", "Sum of TOTAL", "Total Budget", "budget_total"),
+    number_field("budget_used_year1", "Budget Used Year 1", "budget_used_year1", "Budget used Year 1"),
+    number_field("budget_used_year2", "Budget Used Year 2", "budget_used_year2", "Budget used Year 2"),
+    number_field("budget_used_year3", "Budget Used Year 3", "budget_used_year3", "Budget used Year 3"),
+    number_field("budget_used", "Budget used", "Budget Used", "budget_used"),
+)
+
+INDICATOR_FIELDS = (
+    text_field("code", "code"),
+    text_field("indicator_type", "indicator_type"),
+    text_field("baseline_proposal_year", "baseline_proposal_year"),
+    text_field("target_year1", "target_year_1", "target_year1"),
+    text_field("target_year2", "target_year_2", "target_year2"),
+    text_field("target_year3", "target_year_3", "target_year3"),
+    text_field("naphs", "naphs"),
+    text_field("portal_edited", "portal_edited"),
+    text_field("comment_addressed", "comment_addressed"),
+    text_field("new_proposed_indicator", "new_proposed_indicator"),
+    text_field("indicator_definition", "indicator_definition"),
+    text_field("data_source", "data_source"),
+    text_field("submitted", "submitted"),
+    text_field("comments", "comments"),
+)
+
+CHALLENGE_FIELDS = (
+    text_field("challenge", "challenge", partial=True),
+    text_field("action", "action", "agreed action", partial=True),
+    text_field("responsible", "responsible", partial=True),
+    text_field("timeline", "timeline", partial=True),
+    text_field("status", "status", partial=True),
+)
+
+
+# --- Resolution and extraction ---------------------------------------------
+
+def resolve_headers(columns, headers, partial=False):
+    """Return the file columns matching ``headers`` (case-insensitive), in priority order.
+
+    With ``partial``, a header with no exact match falls back to the first
+    column whose name contains it.
+    """
+    lower_map = {str(c).strip().lower(): c for c in columns}
+    resolved = []
+    for header in headers:
+        key = str(header).strip().lower()
+        col = lower_map.get(key)
+        if col is None and partial:
+            col = next((c for c in columns if key in str(c).strip().lower()), None)
+        if col is not None and col not in resolved:
+            resolved.append(col)
+    return resolved
+
+
+def clean_text(series):
+    """Strip strings; blanks, NaN and the literal "nan" become None."""
+    series = series.astype(object)
+    present = series.notna()
+    text = pd.Series(None, index=series.index, dtype=object)
+    text[present] = series[present].astype(str).str.strip()
+    return text.mask(text.isna() | text.isin(["", "nan"]))
+
+
+def clean_number(series):
+    """Coerce to float; blanks and unparseable values become NaN."""
+    return pd.to_numeric(clean_text(series), errors="coerce")
+
+
+def _first_present(frames):
+    """Coalesce columns left to right (first non-missing value per row)."""
+    result = frames[0]
+    for other in frames[1:]:
+        result = result.where(result.notna(), other)
+    return result
+
+
+class SheetMapping:
+    """Header resolution for one file, computed once and applied to every chunk."""
+
+    def __init__(self, columns, fields):
+        self.fields = fields
+        self.sources = [resolve_headers(columns, f.headers, partial=f.partial) for f in fields]
+
+    def frame(self, df):
+        """DataFrame with one cleaned column per field name."""
+        return pd.DataFrame(
+            {f.name: _field_series(df, f, cols) for f, cols in zip(self.fields, self.sources)},
+            index=df.index,
+        )
+
+
+def _field_series(df, field, cols):
+    """One cleaned column for ``field`` (text: object/None, number: float with 0.0 default)."""
+    clean = clean_number if field.kind == NUMBER else clean_text
+    if not cols:
+        if field.kind == NUMBER:
+            return pd.Series(0.0, index=df.index)
+        return pd.Series([None] * len(df.index), index=df.index, dtype=object)
+    values = _first_present([clean(df[c]) for c in cols])
+    if field.kind == NUMBER:
+        return values.fillna(0.0).astype(float)
+    return values.astype(object).where(values.notna(), None)
+
+
+def extract_frame(df, fields):
+    """DataFrame with one cleaned column per field name."""
+    return SheetMapping(list(df.columns), fields).frame(df)
+
+
+def frame_rows(frame):
+    """Plain Python tuples (str/None/float values) in the frame's column order."""
+    return zip(*(frame[c].tolist() for c in frame.columns))
+
+
+# --- Reading ------------------------------------------------------------------
+
+def _cell_text(value):
+    """A cell value as ``pd.read_excel(dtype=str)`` would give it."""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _header_names(header):
+    """Column names like pandas: blank headers become "Unnamed: N", repeats get ".1", ".2"."""
+    names = []
+    seen = {}
+    for i, value in enumerate(header):
+        name = f"Unnamed: {i}" if value is None or value == "" else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def iter_sheet_chunks(stream, filename, chunk_size=CHUNK_SIZE):
+    """Yield the first worksheet as DataFrames of at most ``chunk_size`` text rows.
+
+    .xlsx is streamed with openpyxl ``read_only`` / ``iter_rows(values_only=True)``
+    directly from ``stream``; legacy .xls is parsed by pandas from memory.
+    Entirely blank rows are skipped.
+    """
+    if filename.lower().endswith(".xls"):
+        df = pd.read_excel(io.BytesIO(stream.read()), dtype=str)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+        return
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _header_names(header)
+        width = len(columns)
+        chunk = []
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            values = [_cell_text(v) for v in row[:width]]
+            values += [None] * (width - len(values))
+            chunk.append(values)
+            if len(chunk) >= chunk_size:
+                yield pd.DataFrame(chunk, columns=columns, dtype=object)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=columns, dtype=object)
+    finally:
+        workbook.close()
+
+
+def iter_field_frames(stream, filename, fields, chunk_size=CHUNK_SIZE, progress=None):
+    """Yield one cleaned field frame per chunk; headers are resolved on the first chunk.
+
+    ``progress(rows_read)`` is called once the consumer has finished each chunk.
+    """
+    mapping = None
+    rows_read = 0
+    for chunk in iter_sheet_chunks(stream, filename, chunk_size):
+        if mapping is None:
+            mapping = SheetMapping(list(chunk.columns), fields)
+        yield mapping.frame(chunk)
+        rows_read += len(chunk)
+        if progress:
+            progress(rows_read)
+
+
+def iter_field_rows(stream, filename, fields, chunk_size=CHUNK_SIZE, progress=None):
+    """Stream an uploaded sheet as plain tuples ordered like ``fields``."""
+    for frame in iter_field_frames(stream, filename, fields, chunk_size, progress=progress):
+        yield from frame_rows(frame)
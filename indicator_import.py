@@ -0,0 +1,357 @@
+"""Indicators Excel import.
+
+Rules:
+- code must match an existing Activity.code
+- implementing entity in file is ignored; always taken from Activity
+- indicator_type must be Quantitative or Qualitative
+- Quantitative: baseline/targets must be whole numbers
+- Qualitative: baseline/targets can be free text
+
+Each chunk of the sheet is handled set-based: codes resolve to activities and
+existing indicators in two queries, baseline/targets are validated over whole
+columns, and rows are written with ``bulk_insert_mappings`` /
+``bulk_update_mappings``. ``progress_yearN`` / ``status_yearN`` are
+recomputed for every uploaded indicator from its new targets and stored
+actuals. A row that would not change its indicator is counted as unchanged
+and not written (rows matching the import ledger are not even looked up, see
+import_ledger), and a dry run only records the diff (see import_diff).
+``import_indicators()`` needs only an app context (it is run by import_jobs).
+"""
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+from flask import current_app
+
+from data_versions import INDICATORS, bump_data_version
+from import_diff import INSERTED, SKIPPED, UNCHANGED, UPDATED, ImportDiff, changed_fields
+from import_mapping import INDICATOR_FIELDS, frame_rows, iter_field_frames
+from indicator_progress import indicator_progress_fields
+from models import Activity, Indicator, db
+
+
+# Columns an upload sets on an existing indicator (compared to detect no-op updates)
+INDICATOR_UPDATE_FIELDS = (
+    "indicator_type",
+    "naphs",
+    "indicator_definition",
+    "data_source",
+    "baseline_proposal_year",
+    "target_year1",
+    "target_year2",
+    "target_year3",
+    "submitted",
+    "comments",
+    "portal_edited",
+    "comment_addressed",
+)
+
+# Recomputed from the uploaded targets and the stored actuals / qualitative stages
+PROGRESS_FIELDS = (
+    "progress_year1",
+    "progress_year2",
+    "progress_year3",
+    "status_year1",
+    "status_year2",
+    "status_year3",
+)
+_PROGRESS_INPUTS = (
+    "actual_year1",
+    "actual_year2",
+    "actual_year3",
+    "qualitative_stage_year1",
+    "qualitative_stage_year2",
+    "qualitative_stage_year3",
+)
+
+_COMPARED_FIELDS = INDICATOR_UPDATE_FIELDS + PROGRESS_FIELDS
+
+# Existing indicator columns loaded per chunk
+_SNAPSHOT_COLUMNS = (Indicator.id, Indicator.activity_id) + tuple(
+    getattr(Indicator, f) for f in _COMPARED_FIELDS + _PROGRESS_INPUTS
+)
+
+# Stored as text but written from parse_bool(): "True", "true" and "1" are all True
+_BOOLEAN_FIELDS = ("naphs", "portal_edited", "comment_addressed")
+
+# Baseline/targets that must be whole numbers for quantitative indicators
+_WHOLE_NUMBER_FIELDS = (
+    ("baseline_proposal_year", "Baseline"),
+    ("target_year1", "Target Year 1"),
+    ("target_year2", "Target Year 2"),
+    ("target_year3", "Target Year 3"),
+)
+# What int() accepts (values are already stripped)
+_WHOLE_NUMBER = r"[+-]?\d+(?:_\d+)*"
+
+
+def parse_bool(value):
+    if value is None:
+        return None
+    v = str(value).strip().lower()
+    if v in ("yes", "true", "1"):
+        return True
+    if v in ("no", "false", "0"):
+        return False
+    return None
+
+
+def target_errors(frame):
+    """Column-wise check of quantitative baseline/targets (one boolean column per label).
+
+    A flag is set where a quantitative row has a value that is not a whole
+    number; blank values are allowed.
+    """
+    quantitative = frame["indicator_type"] == "Quantitative"
+    flags = {}
+    for field, label in _WHOLE_NUMBER_FIELDS:
+        values = frame[field]
+        present = values.notna()
+        whole = values.where(present, "").astype(str).str.fullmatch(_WHOLE_NUMBER)
+        flags[label] = quantitative & present & ~whole
+    return pd.DataFrame(flags, index=frame.index)
+
+
+def _comparable(field, value):
+    if field in _BOOLEAN_FIELDS:
+        parsed = parse_bool(value)
+        return value if parsed is None else parsed
+    return value
+
+
+class IndicatorUpserter:
+    """Insert-or-update parsed indicator chunks, matched to activities by code.
+
+    Usage:
+        upserter = IndicatorUpserter()
+        for frame in iter_field_frames(stream, filename, INDICATOR_FIELDS):
+            upserter.add_frame(frame)
+        db.session.commit()
+
+    Matches the old row-by-row behaviour: a code resolves to the first
+    activity with that code, an activity's indicator is updated if it has
+    one, and a code repeated in the file updates the indicator created for
+    it. With ``dry_run`` nothing is written; ``diff`` still says what would
+    have been. With a ``ledger`` (import_ledger.RowLedger), rows whose content
+    hash matches it are counted as unchanged up front.
+    """
+
+    def __init__(self, dry_run=False, diff=None, ledger=None):
+        self.dry_run = dry_run
+        self.diff = diff if diff is not None else ImportDiff()
+        self.ledger = ledger
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.skipped = 0  # missing/unknown code
+        self.errors = 0  # type and baseline/target validation errors
+        self.batch_timings = []  # (rows, inserted, updated, seconds) per chunk
+        self._activity_ids = {}  # code -> activity id (None: unknown code)
+        self._indicators = {}  # activity id -> snapshot of its indicator (None: has none)
+
+    def _prefetch(self, codes):
+        """Resolve ``codes`` to activity ids and load their indicators (two queries)."""
+        missing = [c for c in codes if c not in self._activity_ids]
+        if missing:
+            rows = (
+                db.session.query(Activity.id, Activity.code)
+                .filter(Activity.code.in_(missing))
+                .order_by(Activity.id)
+                .all()
+            )
+            for activity_id, code in rows:
+                # First activity wins, like Activity.query.filter_by(code=...).first()
+                self._activity_ids.setdefault(code, activity_id)
+            for code in missing:
+                self._activity_ids.setdefault(code, None)
+
+        ids = {self._activity_ids[c] for c in codes} - {None}
+        ids = [i for i in ids if i not in self._indicators]
+        if ids:
+            self._indicators.update(dict.fromkeys(ids))
+            rows = db.session.query(*_SNAPSHOT_COLUMNS).filter(Indicator.activity_id.in_(ids)).all()
+            for row in rows:
+                self._indicators[row.activity_id] = SimpleNamespace(**row._asdict())
+
+    def add_frame(self, frame):
+        """Validate, diff and write one cleaned chunk (columns named like INDICATOR_FIELDS)."""
+        started = time.perf_counter()
+        field_count = len(frame.columns)
+        rows = list(frame_rows(pd.concat([frame, target_errors(frame)], axis=1)))
+        rows_in_chunk = len(rows)
+        labels = [label for _, label in _WHOLE_NUMBER_FIELDS]
+
+        if self.ledger is not None:
+            self.ledger.prefetch({row[0] for row in rows if row[0]})
+            fresh = []
+            for row in rows:
+                if row[0] and self.ledger.unchanged(row[0], row[:field_count]):
+                    self.unchanged += 1
+                    self.diff.record(UNCHANGED, row[0])
+                else:
+                    fresh.append(row)
+            rows = fresh
+        self._prefetch({row[0] for row in rows if row[0]})
+
+        inserts = {}  # activity id -> mapping
+        updates = {}  # indicator id -> mapping
+        for row in rows:
+            (
+                code,
+                indicator_type,
+                baseline,
+                t1,
+                t2,
+                t3,
+                naphs_raw,
+                portal_raw,
+                ca_raw,
+                new_indicator_text,
+                indicator_definition,
+                data_source,
+                submitted,
+                comments,
+            ) = row[:field_count]
+            if not code:
+                self.diff.record(SKIPPED, None, reason="Missing code")
+                continue
+
+            activity_id = self._activity_ids[code]
+            if activity_id is None:
+                self.skipped += 1
+                self.diff.record(SKIPPED, code, reason="Unknown activity code")
+                continue
+
+            if indicator_type not in ("Quantitative", "Qualitative"):
+                self.errors += 1
+                self.diff.record(SKIPPED, code, reason="indicator_type must be Quantitative or Qualitative")
+                continue
+
+            bad_targets = [label for label, bad in zip(labels, row[field_count:]) if bad]
+            if bad_targets:
+                self.errors += len(bad_targets)
+                reason = " ".join(
+                    f"{label} must be a whole number for quantitative indicators." for label in bad_targets
+                )
+                self.diff.record(SKIPPED, code, reason=reason)
+                continue
+
+            if self.ledger is not None:
+                self.ledger.record(code, row[:field_count])
+
+            # Upsert rule: match by activity_id (one-to-one relationship)
+            pending = inserts.get(activity_id)
+            existing = SimpleNamespace(**pending) if pending else self._indicators.get(activity_id)
+            values = {
+                "indicator_type": indicator_type,
+                "naphs": parse_bool(naphs_raw),
+                "indicator_definition": indicator_definition,
+                "data_source": data_source,
+                "baseline_proposal_year": baseline,
+                "target_year1": t1,
+                "target_year2": t2,
+                "target_year3": t3,
+                "submitted": submitted or "Reported",
+                "comments": comments,
+                "portal_edited": parse_bool(portal_raw),
+                "comment_addressed": parse_bool(ca_raw),
+            }
+            values.update(indicator_progress_fields(
+                indicator_type,
+                (t1, t2, t3),
+                tuple(getattr(existing, f"actual_year{y}", None) for y in (1, 2, 3)),
+                tuple(getattr(existing, f"qualitative_stage_year{y}", None) for y in (1, 2, 3)),
+                baseline,
+            ))
+
+            if existing is None:
+                # Create new indicator
+                inserts[activity_id] = dict(
+                    values,
+                    activity_id=activity_id,
+                    activity_code=code,
+                    new_proposed_indicator=new_indicator_text,
+                )
+                self.diff.record(INSERTED, code)
+                self.created += 1
+                continue
+
+            changes = changed_fields(existing, values, _COMPARED_FIELDS, _comparable)
+            if not changes:
+                self.unchanged += 1
+                self.diff.record(UNCHANGED, code)
+                continue
+            # Update existing indicator (or the one created earlier in this chunk)
+            if pending:
+                pending.update(values)
+            else:
+                updates[existing.id] = dict(values, id=existing.id)
+                self._indicators[activity_id] = SimpleNamespace(**dict(vars(existing), **values))
+            self.diff.record(UPDATED, code, changes)
+            self.updated += 1
+
+        if self.dry_run:
+            # Nothing is written; later chunks see the pending indicators
+            for activity_id, mapping in inserts.items():
+                self._indicators[activity_id] = SimpleNamespace(**mapping, id=None)
+        else:
+            if inserts:
+                db.session.bulk_insert_mappings(Indicator, list(inserts.values()))
+                for activity_id in inserts:
+                    # Reloaded (with its id) if a later chunk repeats the code
+                    self._indicators.pop(activity_id, None)
+            if updates:
+                db.session.bulk_update_mappings(Indicator, list(updates.values()))
+
+        seconds = time.perf_counter() - started
+        self.batch_timings.append((rows_in_chunk, len(inserts), len(updates), seconds))
+        current_app.logger.debug(
+            "Indicator import chunk %d%s: %d rows, %d inserted, %d updated in %.3fs",
+            len(self.batch_timings), " (dry run)" if self.dry_run else "",
+            rows_in_chunk, len(inserts), len(updates), seconds,
+        )
+
+
+def import_indicators(stream, filename, progress=None, dry_run=False, ledger=None):
+    """Upsert the indicators in an uploaded sheet (matched by activity) and commit.
+
+    With ``dry_run`` nothing is written. ``progress(rows_read)`` is called
+    after each chunk; ``ledger`` is an import_ledger.RowLedger, saved with the
+    import. Returns a dict with the counts, the row-level ``diff`` and the
+    user-facing ``message`` / ``category``.
+    """
+    diff = ImportDiff()
+    upserter = IndicatorUpserter(dry_run=dry_run, diff=diff, ledger=ledger)
+    for frame in iter_field_frames(stream, filename, INDICATOR_FIELDS, progress=progress):
+        upserter.add_frame(frame)
+    created, updated, unchanged = upserter.created, upserter.updated, upserter.unchanged
+    skipped, errors_total = upserter.skipped, upserter.errors
+
+    result = {
+        "created": created,
+        "updated": updated,
+        "unchanged": unchanged,
+        "skipped": skipped,
+        "errors": errors_total,
+        "diff": diff.as_dict(),
+    }
+    if dry_run:
+        db.session.rollback()
+        return dict(result, message=diff.summary("indicators"), category="info")
+
+    if created or updated:
+        bump_data_version(INDICATORS)
+    if ledger is not None:
+        ledger.save()
+    db.session.commit()
+
+    msg_parts = [f"Created {created} indicators.", f"Updated {updated} indicators."]
+    if unchanged:
+        msg_parts.append(f"{unchanged} unchanged rows were skipped.")
+    if skipped:
+        msg_parts.append(f"Skipped {skipped} rows with missing/unknown code.")
+    if errors_total:
+        msg_parts.append(
+            f"{errors_total} quantitative baseline/target validation errors (those rows were skipped)."
+        )
+    return dict(result, message=" ".join(msg_parts), category="success" if created else "info")
@@ -0,0 +1,101 @@
+"""Progress percentage and status rules for indicators.
+
+Shared by the indicator forms and the Excel import so both store the same
+``progress_yearN`` / ``status_yearN`` for the same targets and actuals.
+"""
+
+
+def calculate_indicator_progress(indicator_type, actual, target, baseline):
+    """Calculate progress percentage for an indicator.
+    
+    For quantitative indicators: progress = (actual / target) * 100
+    For qualitative indicators: returns None (manual status selection)
+    
+    Returns:
+        float: Progress percentage (0-100) or None if cannot calculate
+    """
+    if not actual or not target:
+        return None
+    
+    if indicator_type != "Quantitative":
+        return None  # Qualitative indicators use manual status
+    
+    try:
+        actual_num = float(str(actual).strip())
+        target_num = float(str(target).strip())
+        
+        if target_num == 0:
+            # If target is 0, return 100 if actual is also 0, otherwise None
+            return 100.0 if actual_num == 0 else None
+        
+        progress = (actual_num / target_num) * 100
+        return min(100.0, max(0.0, progress))  # Clamp between 0-100
+    except (ValueError, TypeError):
+        return None
+
+
+def status_for_qualitative(stage):
+    """Map qualitative stage to dashboard status.
+    
+    Args:
+        stage: Qualitative stage string (e.g., "Not Started", "In Progress", "Completed", "Delayed")
+    
+    Returns:
+        str: "Not Started", "On Track", "At Risk", or "Behind"
+    """
+    if not stage:
+        return "Not Started"
+    
+    s = str(stage).strip().lower()
+    
+    if s in ("not started", "pending", "not started"):
+        return "Not Started"
+    if s in ("in progress", "ongoing", "started"):
+        return "At Risk"  # Default to At Risk for in-progress items
+    if s in ("completed", "done", "achieved", "finished"):
+        return "On Track"
+    if s in ("delayed", "blocked", "stalled", "behind"):
+        return "Behind"
+    
+    # Default fallback
+    return "Not Started"
+
+
+def get_progress_status(progress_pct, indicator_type, qualitative_stage=None):
+    """Determine status based on progress percentage or qualitative stage.
+    
+    Args:
+        progress_pct: Progress percentage (0-100) for quantitative indicators
+        indicator_type: "Quantitative" or "Qualitative"
+        qualitative_stage: Stage string for qualitative indicators (optional)
+    
+    Returns:
+        str: "On Track" (>=80%), "At Risk" (50-79%), "Behind" (<50%), or "Not Started" (None)
+    """
+    # For qualitative indicators, use the stage mapping
+    if indicator_type == "Qualitative":
+        return status_for_qualitative(qualitative_stage)
+    
+    # For quantitative indicators, use progress percentage
+    if progress_pct is None:
+        return "Not Started"
+    
+    if progress_pct >= 80:
+        return "On Track"
+    elif progress_pct >= 50:
+        return "At Risk"
+    else:
+        return "Behind"
+
+
+def indicator_progress_fields(indicator_type, targets, actuals, stages, baseline=None):
+    """``progress_yearN`` / ``status_yearN`` values for one indicator.
+
+    ``targets``, ``actuals`` and ``stages`` hold the Year 1-3 values.
+    """
+    fields = {}
+    for year, (target, actual, stage) in enumerate(zip(targets, actuals, stages), start=1):
+        progress = calculate_indicator_progress(indicator_type, actual, target, baseline)
+        fields[f"progress_year{year}"] = progress
+        fields[f"status_year{year}"] = get_progress_status(progress, indicator_type, stage)
+    return fields
@@ -0,0 +1,149 @@
+"""Query builders and SQL aggregates for the indicator pages.
+
+The per-year status histogram (On Track / At Risk / Behind / Not Started),
+the average progress and the with-progress counts are computed with one
+conditional-aggregation query instead of a dozen Python passes over every
+Indicator row.
+"""
+from sqlalchemy import case, func
+
+from models import Activity, Indicator, db
+from search_index import search_condition
+
+
+PROGRESS_STATUSES = ("On Track", "At Risk", "Behind", "Not Started")
+INDICATOR_TYPES = ("Quantitative", "Qualitative")
+YEARS = (1, 2, 3)
+
+# Histogram for an empty result set (used when the aggregate query fails)
+EMPTY_HISTOGRAM = {"total": 0}
+for _year in YEARS:
+    for _key in ("on_track", "at_risk", "behind", "not_started", "with_progress"):
+        EMPTY_HISTOGRAM[f"{_key}_y{_year}"] = 0
+    EMPTY_HISTOGRAM[f"avg_progress_y{_year}"] = 0.0
+
+
+def apply_indicator_filters(query, entity_list=None, type_filter=None, status_filter=None,
+                            search_query=None):
+    """Apply the indicator page filters to a query that already joins Activity."""
+    if entity_list:
+        query = query.filter(Activity.implementing_entity.in_(entity_list))
+    if type_filter in INDICATOR_TYPES:
+        query = query.filter(Indicator.indicator_type == type_filter)
+    if status_filter in PROGRESS_STATUSES:
+        query = query.filter(Indicator.status_year1 == status_filter)
+    if search_query:
+        # Matches on the indicator text or on its activity's text
+        condition = search_condition(search_query, Indicator, Activity)
+        if condition is not None:
+            query = query.filter(condition)
+    return query
+
+
+def indicator_base_query(*entities, **filters):
+    """``db.session.query(*entities)`` over Indicator JOIN Activity with the page filters applied."""
+    query = db.session.query(*(entities or (Indicator,))).select_from(Indicator).join(
+        Activity, Indicator.activity_id == Activity.id
+    )
+    return apply_indicator_filters(query, **filters)
+
+
+# Sort keys accepted by the indicators list ?sort= parameter
+INDICATOR_SORT_KEYS = {
+    "activity": lambda: Activity.code,
+    "indicator": lambda: Indicator.new_proposed_indicator,
+    "definition": lambda: Indicator.indicator_definition,
+    "comments": lambda: Indicator.comments,
+    "addressed": lambda: Indicator.comment_addressed,
+}
+
+
+def indicator_sort_key(sort_col):
+    """Column the indicators list is ordered (and keyset-paginated) by; defaults to activity code."""
+    return INDICATOR_SORT_KEYS.get(sort_col, INDICATOR_SORT_KEYS["activity"])()
+
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def _status_counts(year):
+    status = getattr(Indicator, f"status_year{year}")
+    return [
+        _count_if(status == "On Track").label(f"on_track_y{year}"),
+        _count_if(status == "At Risk").label(f"at_risk_y{year}"),
+        _count_if(status == "Behind").label(f"behind_y{year}"),
+        _count_if(db.or_(status.is_(None), status == "", status == "Not Started")).label(f"not_started_y{year}"),
+    ]
+
+
+def _progress_stats(year):
+    progress = getattr(Indicator, f"progress_year{year}")
+    return [
+        func.avg(progress).label(f"avg_progress_y{year}"),
+        func.count(progress).label(f"with_progress_y{year}"),
+    ]
+
+
+def indicator_status_histogram(**filters):
+    """Return per-year status counts, average progress and with-progress counts.
+
+    One query; keys match the ``progress_summary`` dict used by
+    indicator_progress.html (``on_track_y1`` ... ``with_progress_y3``) plus ``total``.
+    """
+    columns = [func.count(Indicator.id).label("total")]
+    for year in YEARS:
+        columns += _status_counts(year) + _progress_stats(year)
+    row = indicator_base_query(*columns, **filters).one()
+    stats = dict(row._mapping)
+    for year in YEARS:
+        stats[f"avg_progress_y{year}"] = round(stats[f"avg_progress_y{year}"] or 0.0, 1)
+    return stats
+
+
+def _is_truthy(column):
+    return func.lower(func.trim(func.coalesce(column, ""))).in_(("true", "yes", "1"))
+
+
+def indicator_list_summary(**filters):
+    """Header-card counts for the indicators list, aggregated in one query."""
+    row = indicator_base_query(
+        func.count(Indicator.id).label("total"),
+        _count_if(func.trim(Indicator.indicator_type) == "Quantitative").label("quantitative"),
+        _count_if(func.trim(Indicator.indicator_type) == "Qualitative").label("qualitative"),
+        _count_if(_is_truthy(Indicator.naphs)).label("naphs_yes"),
+        _count_if(func.trim(Indicator.submitted) == "Reported").label("submitted_count"),
+        _count_if(_is_truthy(Indicator.portal_edited)).label("portal_edited_count"),
+        *_status_counts(1),
+        func.avg(Indicator.progress_year1).label("avg_progress"),
+        **filters,
+    ).one()
+    stats = row._mapping
+    total = stats["total"]
+    return {
+        "total": total,
+        "quantitative": stats["quantitative"],
+        "qualitative": stats["qualitative"],
+        "naphs_yes": stats["naphs_yes"],
+        "submitted_count": stats["submitted_count"],
+        "submitted_pct": round(stats["submitted_count"] / total * 100, 1) if total > 0 else 0.0,
+        "portal_edited_count": stats["portal_edited_count"],
+        "portal_edited_pct": round(stats["portal_edited_count"] / total * 100, 1) if total > 0 else 0.0,
+        "on_track": stats["on_track_y1"],
+        "at_risk": stats["at_risk_y1"],
+        "behind": stats["behind_y1"],
+        "not_started": stats["not_started_y1"],
+        "avg_progress": round(stats["avg_progress"] or 0.0, 1),
+    }
+
+
+def progress_summary_from_histogram(stats):
+    """Shape histogram stats into the progress page summary (Year 1 doubles as overall)."""
+    summary = dict(stats)
+    summary.update({
+        "on_track": stats["on_track_y1"],
+        "at_risk": stats["at_risk_y1"],
+        "behind": stats["behind_y1"],
+        "not_started": stats["not_started_y1"],
+    })
+    return summary
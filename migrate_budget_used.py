@@ -1,6 +1,10 @@
 """
 One-time migration script to copy budget_used to budget_used_year1 for all existing activities.
-Run this script to migrate existing data.
+
+The same set-based UPDATE runs automatically as Alembic revision a3f1c9d2e7b4
+(`flask db upgrade`); this script is kept for databases managed outside Alembic.
+It is idempotent and safe to run more than once. The dashboard rollups are
+rebuilt in the same transaction, since they sum budget_used_year1.
 """
 import os
 import sys
@@ -8,32 +12,38 @@ import sys
 # Add the project directory to the path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from sqlalchemy import text
+
 from app import app
-from models import Activity, db
+from data_versions import ACTIVITIES, bump_data_version
+from models import db
+from portfolio_rollups import rebuild_rollups
+
+BACKFILL_SQL = """
+    UPDATE activities
+    SET budget_used_year1 = budget_used
+    WHERE (budget_used_year1 IS NULL OR budget_used_year1 = 0)
+      AND budget_used > 0
+"""
+
 
 def migrate_budget_used():
     """Copy budget_used to budget_used_year1 for all activities where budget_used_year1 is 0 or None."""
     with app.app_context():
         try:
-            activities = Activity.query.all()
-            updated_count = 0
-            
-            for activity in activities:
-                budget_used = getattr(activity, 'budget_used', None) or 0
-                budget_used_year1 = getattr(activity, 'budget_used_year1', None) or 0
-                
-                # Only update if budget_used_year1 is 0 or None, and budget_used has a value
-                if (budget_used_year1 == 0 or budget_used_year1 is None) and budget_used > 0:
-                    activity.budget_used_year1 = budget_used
-                    updated_count += 1
-                    print(f"Updated activity {activity.id} (code: {activity.code}): budget_used_year1 = {budget_used}")
-            
+            result = db.session.execute(text(BACKFILL_SQL))
+            updated_count = result.rowcount or 0
+            if updated_count > 0:
+                # The version bump only invalidates caches (and the activities
+                # import ledger); the rollup table has to be recomputed
+                rebuild_rollups()
+                bump_data_version(ACTIVITIES)
+            db.session.commit()
             if updated_count > 0:
-                db.session.commit()
                 print(f"\nMigration complete! Updated {updated_count} activities.")
             else:
                 print("\nNo activities needed updating.")
-                
+
         except Exception as e:
             db.session.rollback()
             print(f"Error during migration: {e}")
@@ -47,4 +57,3 @@ if __name__ == "__main__":
     print("Starting budget_used to budget_used_year1 migration...")
     migrate_budget_used()
     print("Migration finished.")
-
@@ -0,0 +1,37 @@
+"""backfill budget_used_year1 from legacy budget_used
+
+Revision ID: a3f1c9d2e7b4
+Revises: 310e8806477a
+Create Date: 2026-10-17 09:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f1c9d2e7b4'
+down_revision = '310e8806477a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # One-shot, idempotent copy of the legacy Year 1 spend into budget_used_year1.
+    # Previously done row by row on every dashboard GET; only rows that were
+    # never migrated match the WHERE clause, so re-running is a no-op.
+    # Must stay ordered before b7e2d4f1a9c3, which builds portfolio_rollups
+    # from the backfilled values; databases past that revision are migrated
+    # with migrate_budget_used.py, which rebuilds the rollups itself.
+    op.execute("""
+        UPDATE activities
+        SET budget_used_year1 = budget_used
+        WHERE (budget_used_year1 IS NULL OR budget_used_year1 = 0)
+          AND budget_used > 0
+    """)
+
+
+def downgrade():
+    # Data-only migration: the legacy budget_used column is left untouched,
+    # so there is nothing to undo.
+    pass
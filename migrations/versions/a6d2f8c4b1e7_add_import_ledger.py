@@ -0,0 +1,42 @@
+"""add import ledger (file hash on import_jobs, import_row_hashes table)
+
+Revision ID: a6d2f8c4b1e7
+Revises: f5a1d3c7e9b2
+Create Date: 2026-10-17 14:36:52.118304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d2f8c4b1e7'
+down_revision = 'f5a1d3c7e9b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('import_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('file_hash', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('data_version', sa.String(length=100), nullable=True))
+        batch_op.create_index(batch_op.f('ix_import_jobs_file_hash'), ['file_hash'], unique=False)
+
+    op.create_table('import_row_hashes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('key_hash', sa.String(length=40), nullable=False),
+        sa.Column('row_hash', sa.String(length=40), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('kind', 'key_hash', name='uq_import_row_hashes_kind_key')
+    )
+
+
+def downgrade():
+    op.drop_table('import_row_hashes')
+
+    with op.batch_alter_table('import_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_import_jobs_file_hash'))
+        batch_op.drop_column('data_version')
+        batch_op.drop_column('file_hash')
@@ -0,0 +1,53 @@
+"""add content_hash to challenges
+
+Revision ID: b3e9c5a7d2f4
+Revises: a6d2f8c4b1e7
+Create Date: 2026-10-17 15:52:27.604113
+
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e9c5a7d2f4'
+down_revision = 'a6d2f8c4b1e7'
+branch_labels = None
+depends_on = None
+
+
+def _content_hash(challenge, action):
+    # Same digest as challenge_import.challenge_content_hash()
+    return hashlib.sha1(f"{challenge}\x1f{action}".encode("utf-8")).hexdigest()
+
+
+def upgrade():
+    with op.batch_alter_table('challenges', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=40), nullable=True))
+
+    # Backfill: the first row of each (challenge, action) pair holds the hash
+    connection = op.get_bind()
+    rows = connection.execute(sa.text("SELECT id, challenge, action FROM challenges ORDER BY id"))
+    seen = set()
+    updates = []
+    for row_id, challenge, action in rows:
+        digest = _content_hash(challenge, action)
+        if digest not in seen:
+            seen.add(digest)
+            updates.append({"row_id": row_id, "digest": digest})
+    if updates:
+        connection.execute(
+            sa.text("UPDATE challenges SET content_hash = :digest WHERE id = :row_id"),
+            updates,
+        )
+
+    with op.batch_alter_table('challenges', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_challenges_content_hash'), ['content_hash'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('challenges', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_challenges_content_hash'))
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,77 @@
+"""add portfolio_rollups table
+
+Revision ID: b7e2d4f1a9c3
+Revises: a3f1c9d2e7b4
+Create Date: 2026-10-17 10:03:48.551902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2d4f1a9c3'
+down_revision = 'a3f1c9d2e7b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('portfolio_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('implementing_entity', sa.String(), nullable=False, server_default=''),
+        sa.Column('category', sa.String(), nullable=False, server_default=''),
+        sa.Column('results_area', sa.String(), nullable=False, server_default=''),
+        sa.Column('status', sa.String(), nullable=False, server_default=''),
+        sa.Column('activity_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('budget_total', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('budget_year1', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('budget_year2', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('budget_year3', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('used_year1', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('used_year2', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('used_year3', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('used_total', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('exec_pct_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('implementing_entity', 'category', 'results_area', 'status', name='uq_portfolio_rollups_key')
+    )
+
+    # Backfill from the existing activities. NULLIF(x, 'NaN') turns Postgres NaN
+    # into NULL (a no-op on SQLite, which already stores NaN as NULL). ROUND of a
+    # NUMERIC rounds halves away from zero on both, as exec_pct_expr() does.
+    op.execute("""
+        INSERT INTO portfolio_rollups (
+            implementing_entity, category, results_area, status, activity_count,
+            budget_total, budget_year1, budget_year2, budget_year3,
+            used_year1, used_year2, used_year3, used_total, exec_pct_sum
+        )
+        SELECT
+            implementing_entity, category, results_area, status, COUNT(*),
+            SUM(budget_total), SUM(budget_year1), SUM(budget_year2), SUM(budget_year3),
+            SUM(used_year1), SUM(used_year2), SUM(used_year3),
+            SUM(used_year1 + used_year2 + used_year3),
+            SUM(CASE WHEN budget_total > 0
+                     THEN ROUND(CAST((used_year1 + used_year2 + used_year3) * 100.0 / budget_total AS NUMERIC))
+                     ELSE 0 END)
+        FROM (
+            SELECT
+                COALESCE(implementing_entity, '') AS implementing_entity,
+                COALESCE(category, '') AS category,
+                COALESCE(results_area, '') AS results_area,
+                COALESCE(status, '') AS status,
+                COALESCE(NULLIF(budget_total, 'NaN'), 0) AS budget_total,
+                COALESCE(NULLIF(budget_year1, 'NaN'), 0) AS budget_year1,
+                COALESCE(NULLIF(budget_year2, 'NaN'), 0) AS budget_year2,
+                COALESCE(NULLIF(budget_year3, 'NaN'), 0) AS budget_year3,
+                COALESCE(NULLIF(budget_used_year1, 'NaN'), 0) AS used_year1,
+                COALESCE(NULLIF(budget_used_year2, 'NaN'), 0) AS used_year2,
+                COALESCE(NULLIF(budget_used_year3, 'NaN'), 0) AS used_year3
+            FROM activities
+        ) AS a
+        GROUP BY implementing_entity, category, results_area, status
+    """)
+
+
+def downgrade():
+    op.drop_table('portfolio_rollups')
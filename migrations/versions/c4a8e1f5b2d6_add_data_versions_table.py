@@ -0,0 +1,29 @@
+"""add data_versions table
+
+Revision ID: c4a8e1f5b2d6
+Revises: b7e2d4f1a9c3
+Create Date: 2026-10-17 11:26:09.183544
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a8e1f5b2d6'
+down_revision = 'b7e2d4f1a9c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('data_versions',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('data_versions')
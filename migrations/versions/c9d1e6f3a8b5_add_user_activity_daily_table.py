@@ -0,0 +1,46 @@
+"""add user_activity_daily table
+
+Revision ID: c9d1e6f3a8b5
+Revises: b3e9c5a7d2f4
+Create Date: 2026-10-17 17:24:09.318640
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9d1e6f3a8b5'
+down_revision = 'b3e9c5a7d2f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_activity_daily',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('action', sa.String(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('day', 'user_id', 'action', name='uq_user_activity_daily_key')
+    )
+    with op.batch_alter_table('user_activity_daily', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_user_activity_daily_user_id'), ['user_id'], unique=False)
+
+    # Backfill from the events recorded so far
+    op.execute("""
+        INSERT INTO user_activity_daily (day, user_id, action, count)
+        SELECT DATE(timestamp), user_id, action, COUNT(*)
+        FROM user_activities
+        GROUP BY DATE(timestamp), user_id, action
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('user_activity_daily', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_activity_daily_user_id'))
+
+    op.drop_table('user_activity_daily')
@@ -0,0 +1,89 @@
+"""add user_agents lookup table
+
+Revision ID: d2f7a9c3e6b1
+Revises: c9d1e6f3a8b5
+Create Date: 2026-10-17 18:06:51.207433
+
+User-Agent strings move to user_agents; events keep a user_agent_id.
+Partitioning user_activities by month on PostgreSQL rewrites the whole table,
+so it is not done here but with an explicit maintenance command, run when
+the app is quiet:
+
+    python usage_retention.py partition
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f7a9c3e6b1'
+down_revision = 'c9d1e6f3a8b5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    op.create_table('user_agents',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('digest', sa.String(length=40), nullable=False),
+        sa.Column('user_agent', sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('user_agents', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_user_agents_digest'), ['digest'], unique=True)
+
+    agents = bind.execute(sa.text(
+        "SELECT DISTINCT user_agent FROM user_activities WHERE user_agent IS NOT NULL AND user_agent <> ''"
+    )).scalars().all()
+    if agents:
+        user_agents = sa.table('user_agents', sa.column('digest'), sa.column('user_agent'))
+        op.bulk_insert(user_agents, [
+            {"digest": hashlib.sha1(agent.encode("utf-8")).hexdigest(), "user_agent": agent}
+            for agent in agents
+        ])
+
+    with op.batch_alter_table('user_activities', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('user_agent_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_user_activities_user_agent_id', 'user_agents', ['user_agent_id'], ['id'])
+
+    # Temporary index so the backfill is one lookup per event
+    op.create_index('tmp_user_agents_user_agent', 'user_agents', ['user_agent'], unique=False)
+    if bind.dialect.name == 'postgresql':
+        op.execute("""
+            UPDATE user_activities
+            SET user_agent_id = user_agents.id
+            FROM user_agents
+            WHERE user_agents.user_agent = user_activities.user_agent
+        """)
+    else:
+        op.execute("""
+            UPDATE user_activities
+            SET user_agent_id = (SELECT id FROM user_agents WHERE user_agents.user_agent = user_activities.user_agent)
+            WHERE user_agent IS NOT NULL AND user_agent <> ''
+        """)
+    op.drop_index('tmp_user_agents_user_agent', table_name='user_agents')
+
+    with op.batch_alter_table('user_activities', schema=None) as batch_op:
+        batch_op.drop_column('user_agent')
+
+
+def downgrade():
+    # Also works once user_activities is partitioned (see usage_retention.partition_user_activities)
+    with op.batch_alter_table('user_activities', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('user_agent', sa.String(), nullable=True))
+    op.execute("""
+        UPDATE user_activities
+        SET user_agent = (SELECT user_agent FROM user_agents WHERE user_agents.id = user_activities.user_agent_id)
+        WHERE user_agent_id IS NOT NULL
+    """)
+    with op.batch_alter_table('user_activities', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_user_activities_user_agent_id', type_='foreignkey')
+        batch_op.drop_column('user_agent_id')
+
+    with op.batch_alter_table('user_agents', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_agents_digest'))
+
+    op.drop_table('user_agents')
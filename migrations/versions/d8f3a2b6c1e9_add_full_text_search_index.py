@@ -0,0 +1,110 @@
+"""add full-text search index
+
+Revision ID: d8f3a2b6c1e9
+Revises: c4a8e1f5b2d6
+Create Date: 2026-10-17 11:24:05.318274
+
+Postgres: generated, weighted ``search_vector`` tsvector columns with GIN
+indexes on activities, indicators and activity_reports. SQLite: FTS5 tables
+kept in sync by triggers. The DDL is written out here as it was when this
+revision was added; search_index.py builds the same objects for rebuilds.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8f3a2b6c1e9'
+down_revision = 'c4a8e1f5b2d6'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ('activities', 'indicators', 'activity_reports')
+
+
+def _upgrade_postgresql():
+    op.execute("""
+        ALTER TABLE activities ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(code, '')), 'A')
+            || setweight(to_tsvector('simple', coalesce(proposed_activity, '')), 'A')
+            || setweight(to_tsvector('simple', coalesce(initial_activity, '')), 'B')
+            || setweight(to_tsvector('simple', coalesce(implementing_entity, '')), 'C')
+            || setweight(to_tsvector('simple', coalesce(results_area, '')), 'C')
+            || setweight(to_tsvector('simple', coalesce(category, '')), 'C')
+        ) STORED
+    """)
+    op.execute("""
+        ALTER TABLE indicators ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(activity_code, '')), 'A')
+            || setweight(to_tsvector('simple', coalesce(new_proposed_indicator, '')), 'A')
+            || setweight(to_tsvector('simple', coalesce(indicator_definition, '')), 'B')
+            || setweight(to_tsvector('simple', coalesce(data_source, '')), 'C')
+            || setweight(to_tsvector('simple', coalesce(comments, '')), 'C')
+        ) STORED
+    """)
+    # Report text is indexed without its markup
+    op.execute("""
+        ALTER TABLE activity_reports ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A')
+            || setweight(to_tsvector('simple', regexp_replace(coalesce(content_html, ''), '<[^>]*>', ' ', 'g')), 'B')
+        ) STORED
+    """)
+    for table_name in TABLES:
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS ix_{table_name}_search_vector ON {table_name} USING GIN (search_vector)"
+        )
+
+
+def _upgrade_sqlite():
+    fts_columns = {
+        'activities': 'code, proposed_activity, initial_activity, implementing_entity, results_area, category',
+        'indicators': 'activity_code, new_proposed_indicator, indicator_definition, data_source, comments',
+        'activity_reports': 'title, content_html',
+    }
+    for table_name, columns in fts_columns.items():
+        fts = f"{table_name}_fts"
+        new_values = ", ".join(f"new.{name.strip()}" for name in columns.split(","))
+        op.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        op.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table_name} BEGIN
+                INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values});
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table_name} BEGIN
+                DELETE FROM {fts} WHERE rowid = old.id;
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table_name} BEGIN
+                DELETE FROM {fts} WHERE rowid = old.id;
+                INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values});
+            END
+        """)
+        op.execute(f"DELETE FROM {fts}")
+        op.execute(f"INSERT INTO {fts}(rowid, {columns}) SELECT id, {columns} FROM {table_name}")
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        _upgrade_postgresql()
+    elif dialect == 'sqlite':
+        _upgrade_sqlite()
+    # Other databases: searches fall back to ILIKE
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table_name in TABLES:
+        if dialect == 'postgresql':
+            op.execute(f"DROP INDEX IF EXISTS ix_{table_name}_search_vector")
+            op.execute(f"ALTER TABLE {table_name} DROP COLUMN IF EXISTS search_vector")
+        elif dialect == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f"DROP TRIGGER IF EXISTS {table_name}_fts_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {table_name}_fts")
@@ -0,0 +1,48 @@
+"""add import_jobs table
+
+Revision ID: e2c7b9d4a6f1
+Revises: d8f3a2b6c1e9
+Create Date: 2026-10-17 12:02:41.906215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2c7b9d4a6f1'
+down_revision = 'd8f3a2b6c1e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('import_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='queued'),
+        sa.Column('rows_processed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('skipped_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('error_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('message', sa.Text(), nullable=True),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('import_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_import_jobs_created_by'), ['created_by'], unique=False)
+        batch_op.create_index(batch_op.f('ix_import_jobs_status'), ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('import_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_import_jobs_status'))
+        batch_op.drop_index(batch_op.f('ix_import_jobs_created_by'))
+
+    op.drop_table('import_jobs')
@@ -0,0 +1,26 @@
+"""add heartbeat column to import_jobs
+
+Revision ID: e8a4c1f7b3d6
+Revises: d2f7a9c3e6b1
+Create Date: 2026-10-17 19:42:13.518604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a4c1f7b3d6'
+down_revision = 'd2f7a9c3e6b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('import_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('import_jobs', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
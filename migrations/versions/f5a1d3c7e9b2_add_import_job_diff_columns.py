@@ -0,0 +1,30 @@
+"""add dry-run and diff columns to import_jobs
+
+Revision ID: f5a1d3c7e9b2
+Revises: e2c7b9d4a6f1
+Create Date: 2026-10-17 13:18:05.442917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5a1d3c7e9b2'
+down_revision = 'e2c7b9d4a6f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('import_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('dry_run', sa.Boolean(), nullable=False, server_default=sa.false()))
+        batch_op.add_column(sa.Column('unchanged_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('diff', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('import_jobs', schema=None) as batch_op:
+        batch_op.drop_column('diff')
+        batch_op.drop_column('unchanged_count')
+        batch_op.drop_column('dry_run')
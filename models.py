@@ -60,6 +60,50 @@ class Activity(db.Model):
     )
 
 
+class PortfolioRollup(db.Model):
+    """Pre-summed dashboard measures per (entity, category, results area, status).
+
+    Maintained incrementally by portfolio_rollups on every Activity write. NULL
+    dimension values are stored as "" so the composite key stays unique.
+    """
+    __tablename__ = "portfolio_rollups"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "implementing_entity", "category", "results_area", "status",
+            name="uq_portfolio_rollups_key",
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    implementing_entity = db.Column(db.String, nullable=False, default="")
+    category = db.Column(db.String, nullable=False, default="")
+    results_area = db.Column(db.String, nullable=False, default="")
+    status = db.Column(db.String, nullable=False, default="")
+    activity_count = db.Column(db.Integer, nullable=False, default=0)
+    budget_total = db.Column(db.Float, nullable=False, default=0)
+    budget_year1 = db.Column(db.Float, nullable=False, default=0)
+    budget_year2 = db.Column(db.Float, nullable=False, default=0)
+    budget_year3 = db.Column(db.Float, nullable=False, default=0)
+    used_year1 = db.Column(db.Float, nullable=False, default=0)
+    used_year2 = db.Column(db.Float, nullable=False, default=0)
+    used_year3 = db.Column(db.Float, nullable=False, default=0)
+    used_total = db.Column(db.Float, nullable=False, default=0)
+    exec_pct_sum = db.Column(db.Float, nullable=False, default=0)  # Sum of per-activity execution %
+
+
+class DataVersion(db.Model):
+    """Monotonic change counter per data set (e.g. "activities").
+
+    Bumped in the same transaction as the write it describes, so every gunicorn
+    worker can validate its in-process caches with one primary-key lookup.
+    """
+    __tablename__ = "data_versions"
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+
 class ActivityReport(db.Model):
     """Rich-text report for an activity (one-to-one)."""
     __tablename__ = "activity_reports"
@@ -91,6 +135,8 @@ class Challenge(db.Model):
     responsible = db.Column(db.String, nullable=True)
     timeline = db.Column(db.String, nullable=True)
     status = db.Column(db.String, nullable=False, default="pending")
+    # Digest of (challenge, action), held by the first row with that pair; duplicates keep NULL
+    content_hash = db.Column(db.String(40), nullable=True, unique=True, index=True)
 
 
 class SubActivity(db.Model):
@@ -158,8 +204,22 @@ class User(db.Model):
         return user
 
 
+class UserAgent(db.Model):
+    """Distinct User-Agent strings, stored once and referenced by user_activities."""
+    __tablename__ = "user_agents"
+
+    id = db.Column(db.Integer, primary_key=True)
+    digest = db.Column(db.String(40), nullable=False, unique=True, index=True)  # SHA-1 of user_agent
+    user_agent = db.Column(db.Text, nullable=False)
+
+
 class UserActivity(db.Model):
-    """Track user actions and usage in the system."""
+    """Track user actions and usage in the system.
+
+    On PostgreSQL the table can be partitioned by month of ``timestamp``
+    (primary key (id, timestamp)) with ``python usage_retention.py partition``;
+    old months are archived and dropped by usage_retention.
+    """
     __tablename__ = "user_activities"
 
     id = db.Column(db.Integer, primary_key=True)
@@ -169,16 +229,82 @@ class UserActivity(db.Model):
     resource_id = db.Column(db.Integer, nullable=True)  # ID of the resource if applicable
     details = db.Column(db.Text, nullable=True)  # Additional details about the action
     ip_address = db.Column(db.String, nullable=True)  # User's IP address
-    user_agent = db.Column(db.String, nullable=True)  # Browser/client info
+    user_agent_id = db.Column(db.Integer, db.ForeignKey("user_agents.id"), nullable=True)  # Browser/client info
     timestamp = db.Column(db.DateTime, nullable=False, default=db.func.current_timestamp(), index=True)
 
     # Relationship to User
     user = db.relationship("User", backref="activities")
+    agent = db.relationship("UserAgent")
 
     def __repr__(self):
         return f"<UserActivity {self.id}: {self.user_id} - {self.action}>"
 
 
+class UserActivityDaily(db.Model):
+    """Number of user_activities per (UTC day, user, action), for the usage page.
+
+    Maintained by the usage tracking writer in the same transaction as the
+    events it inserts (see usage_rollups).
+    """
+    __tablename__ = "user_activity_daily"
+    __table_args__ = (
+        db.UniqueConstraint("day", "user_id", "action", name="uq_user_activity_daily_key"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    action = db.Column(db.String, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ImportJob(db.Model):
+    """An Excel upload processed in the background (activities, indicators or challenges)."""
+    __tablename__ = "import_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # "activities", "indicators", "challenges"
+    filename = db.Column(db.String(255), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default="queued", index=True)  # queued, running, succeeded, failed
+    dry_run = db.Column(db.Boolean, nullable=False, default=False)  # Diff only, nothing written
+    file_hash = db.Column(db.String(64), nullable=True, index=True)  # SHA-256 of the uploaded bytes
+    data_version = db.Column(db.String(100), nullable=True)  # Data versions right after this import (see import_ledger)
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    created_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_count = db.Column(db.Integer, nullable=False, default=0)
+    unchanged_count = db.Column(db.Integer, nullable=False, default=0)
+    skipped_count = db.Column(db.Integer, nullable=False, default=0)
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+    message = db.Column(db.Text, nullable=True)  # Summary shown to the user when the job ends
+    diff = db.Column(db.Text, nullable=True)  # JSON row-level diff (see import_diff)
+    created_by = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=db.func.current_timestamp())
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # Refreshed by the worker while the job runs
+
+    def __repr__(self):
+        return f"<ImportJob {self.id} {self.kind} {self.status}>"
+
+
+class ImportRowHash(db.Model):
+    """Content hash of the row last imported for one key (see import_ledger).
+
+    Keys are activity codes, indicator codes and (challenge, action) pairs,
+    stored as digests so long challenge texts fit a fixed-size index.
+    """
+    __tablename__ = "import_row_hashes"
+    __table_args__ = (
+        db.UniqueConstraint("kind", "key_hash", name="uq_import_row_hashes_kind_key"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # "activities", "indicators", "challenges"
+    key_hash = db.Column(db.String(40), nullable=False)
+    row_hash = db.Column(db.String(40), nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+
 class Indicator(db.Model):
     """Indicators linked to activities (by activity and code)."""
     __tablename__ = "indicators"
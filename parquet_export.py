@@ -0,0 +1,169 @@
+"""Parquet exports of activities and indicators for analysts.
+
+``/download?format=parquet`` and ``/indicators/download?format=parquet``
+return the CSV exports' data with real column types instead of text:
+budgets and progress as float64, dates as timestamps, yes/no flags as
+booleans, and low-cardinality text (implementing entity, status, indicator
+type, ...) dictionary-encoded so pandas reads it as ``category``. Indicator
+baselines, targets and actuals are stored as text and also parsed into a
+float64 column (quantitative indicators only).
+
+Arrow record batches are built straight from the column-projected
+``yield_per`` result sets (see csv_export), EXPORT_BATCH_SIZE rows at a
+time, and written with a ParquetWriter into the export cache (see
+export_cache).
+
+pyarrow is optional: without it HAS_PYARROW is False and the routes refuse
+the format.
+"""
+from csv_export import EXPORT_BATCH_SIZE, budget_used_and_progress
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+PARQUET_MIMETYPE = "application/vnd.apache.parquet"
+
+# Column kinds, mapped to Arrow types by _arrow_type()
+TEXT = "text"
+CATEGORY = "category"  # dictionary-encoded text
+FLOAT = "float"
+INT = "int"
+BOOL = "bool"
+TIMESTAMP = "timestamp"
+
+
+def _arrow_type(kind):
+    return {
+        TEXT: pa.string(),
+        CATEGORY: pa.dictionary(pa.int32(), pa.string()),
+        FLOAT: pa.float64(),
+        INT: pa.int64(),
+        BOOL: pa.bool_(),
+        TIMESTAMP: pa.timestamp("s"),
+    }[kind]
+
+
+def _text(val):
+    """Blank text becomes null."""
+    return val if val not in (None, "") else None
+
+
+def _float(val):
+    return float(val) if val is not None else None
+
+
+def _flag(val):
+    """True / False for the yes/no spellings the CSV export recognizes, else null."""
+    if val in (True, "true", "True", "yes", "Yes", "1"):
+        return True
+    if val in (False, "false", "False", "no", "No", "0"):
+        return False
+    return None
+
+
+def _quantity(val, is_quantitative):
+    """Numeric value of a quantitative indicator's target/actual text, else null."""
+    if not is_quantitative or val is None:
+        return None
+    try:
+        return float(str(val).strip())
+    except ValueError:
+        return None
+
+
+def _is_quantitative(ind):
+    return (ind.indicator_type or "").strip() == "Quantitative"
+
+
+# (column, kind, value from a projected row)
+ACTIVITY_PARQUET_COLUMNS = (
+    ("code", TEXT, lambda a: _text(a.code)),
+    ("initial_activity", TEXT, lambda a: _text(a.initial_activity)),
+    ("proposed_activity", TEXT, lambda a: _text(a.proposed_activity)),
+    ("implementing_entity", CATEGORY, lambda a: _text(a.implementing_entity)),
+    ("delivery_partner", CATEGORY, lambda a: _text(a.delivery_partner)),
+    ("results_area", CATEGORY, lambda a: _text(a.results_area)),
+    ("category", CATEGORY, lambda a: _text(a.category)),
+    ("budget_year1", FLOAT, lambda a: _float(a.budget_year1)),
+    ("budget_year2", FLOAT, lambda a: _float(a.budget_year2)),
+    ("budget_year3", FLOAT, lambda a: _float(a.budget_year3)),
+    ("budget_total", FLOAT, lambda a: _float(a.budget_total)),
+    ("budget_used_year1", FLOAT, lambda a: _float(a.budget_used_year1)),
+    ("budget_used_year2", FLOAT, lambda a: _float(a.budget_used_year2)),
+    ("budget_used_year3", FLOAT, lambda a: _float(a.budget_used_year3)),
+    ("total_budget_used", FLOAT, lambda a: float(budget_used_and_progress(a)[0])),
+    ("status", CATEGORY, lambda a: _text(a.status)),
+    ("progress", INT, lambda a: int(budget_used_and_progress(a)[1])),
+    ("notes", TEXT, lambda a: _text(a.notes)),
+)
+
+
+def _indicator_measure(name, field):
+    """Numeric and raw-text columns for one baseline/target/actual field."""
+    return (
+        (name, FLOAT, lambda ind: _quantity(getattr(ind, field), _is_quantitative(ind))),
+        (f"{name}_text", TEXT, lambda ind: _text(getattr(ind, field))),
+    )
+
+
+INDICATOR_PARQUET_COLUMNS = (
+    ("code", TEXT, lambda ind: _text(ind.code)),
+    ("fundholder_implementing_entity", CATEGORY, lambda ind: _text(ind.implementing_entity)),
+    ("key_project_activity", TEXT, lambda ind: _text(ind.proposed_activity)),
+    ("new_proposed_indicator", TEXT, lambda ind: _text(ind.new_proposed_indicator)),
+    ("indicator_type", CATEGORY, lambda ind: _text(ind.indicator_type)),
+    ("naphs", BOOL, lambda ind: _flag(ind.naphs)),
+    ("indicator_definition", TEXT, lambda ind: _text(ind.indicator_definition)),
+    ("data_source", TEXT, lambda ind: _text(ind.data_source)),
+    *_indicator_measure("baseline_proposal_year", "baseline_proposal_year"),
+    *_indicator_measure("actual_baseline", "actual_baseline"),
+)
+for _year in (1, 2, 3):
+    INDICATOR_PARQUET_COLUMNS += (
+        *_indicator_measure(f"target_year_{_year}", f"target_year{_year}"),
+        *_indicator_measure(f"actual_year_{_year}", f"actual_year{_year}"),
+        (f"progress_year_{_year}", FLOAT, lambda ind, y=_year: _float(getattr(ind, f"progress_year{y}"))),
+        (f"status_year_{_year}", CATEGORY, lambda ind, y=_year: _text(getattr(ind, f"status_year{y}"))),
+        (
+            f"qualitative_stage_year_{_year}",
+            CATEGORY,
+            lambda ind, y=_year: _text(getattr(ind, f"qualitative_stage_year{y}")),
+        ),
+    )
+INDICATOR_PARQUET_COLUMNS += (
+    ("last_progress_update", TIMESTAMP, lambda ind: ind.last_progress_update),
+    ("submitted", CATEGORY, lambda ind: _text(ind.submitted)),
+    ("comments", TEXT, lambda ind: _text(ind.comments)),
+    ("portal_edited", BOOL, lambda ind: _flag(ind.portal_edited)),
+    ("comment_addressed", BOOL, lambda ind: _flag(ind.comment_addressed)),
+)
+
+
+def write_parquet(out, columns, rows, batch_size=EXPORT_BATCH_SIZE):
+    """Write ``rows`` to ``out`` as Parquet, one record batch per ``batch_size`` rows."""
+    schema = pa.schema([(name, _arrow_type(kind)) for name, kind, _ in columns])
+    writer = pq.ParquetWriter(out, schema)
+
+    def write(batch):
+        arrays = [
+            pa.array([value(row) for row in batch], type=field.type)
+            for (_, _, value), field in zip(columns, schema)
+        ]
+        writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+
+    try:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                write(batch)
+                batch = []
+        if batch:
+            write(batch)
+    finally:
+        writer.close()
@@ -0,0 +1,177 @@
+"""Materialized dashboard rollups maintained incrementally on Activity writes.
+
+``portfolio_rollups`` holds one pre-summed row per (implementing_entity,
+category, results_area, status). Write paths snapshot an activity's
+contribution before changing it and record the new contribution afterwards;
+the net change is applied with in-place ``UPDATE ... SET x = x + :delta``
+statements in the caller's transaction, so the rollups commit (or roll back)
+together with the activity rows.
+
+Run this module directly to rebuild the table from scratch:
+
+    python portfolio_rollups.py
+"""
+import math
+from decimal import ROUND_HALF_UP, Decimal
+
+from sqlalchemy import func, insert
+
+from activity_queries import exec_pct_expr, num, total_budget_used_expr
+from models import Activity, PortfolioRollup, db
+
+
+DIMENSIONS = ("implementing_entity", "category", "results_area", "status")
+MEASURES = (
+    "activity_count",
+    "budget_total",
+    "budget_year1",
+    "budget_year2",
+    "budget_year3",
+    "used_year1",
+    "used_year2",
+    "used_year3",
+    "used_total",
+    "exec_pct_sum",
+)
+
+
+def _num(value):
+    """Python twin of activity_queries.num(): None/NaN/inf/invalid -> 0.0."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return value if math.isfinite(value) else 0.0
+
+
+def round_half_up(value):
+    """Python twin of the rounding in activity_queries.exec_pct_expr(): 2.5 -> 3."""
+    return int(Decimal(value).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def contribution(activity):
+    """Return ``(key, measures)`` for one activity's share of the rollups."""
+    key = tuple(getattr(activity, d, None) or "" for d in DIMENSIONS)
+    used = [
+        _num(activity.budget_used_year1),
+        _num(activity.budget_used_year2),
+        _num(activity.budget_used_year3),
+    ]
+    budget_total = _num(activity.budget_total)
+    used_total = sum(used)
+    measures = {
+        "activity_count": 1,
+        "budget_total": budget_total,
+        "budget_year1": _num(activity.budget_year1),
+        "budget_year2": _num(activity.budget_year2),
+        "budget_year3": _num(activity.budget_year3),
+        "used_year1": used[0],
+        "used_year2": used[1],
+        "used_year3": used[2],
+        "used_total": used_total,
+        # Same operations in the same order as exec_pct_expr(), so rebuilds match
+        "exec_pct_sum": round_half_up(used_total * 100.0 / budget_total) if budget_total > 0 else 0,
+    }
+    return key, measures
+
+
+class RollupDelta:
+    """Accumulates activity contributions to add/remove, then applies them in one pass.
+
+    Usage:
+        delta = RollupDelta()
+        delta.remove(activity)   # before changing or deleting it
+        ...modify activity...
+        delta.add(activity)      # after inserting or changing it
+        delta.apply()            # before db.session.commit()
+    """
+
+    def __init__(self):
+        self._changes = {}
+
+    def _accumulate(self, activity, sign):
+        key, measures = contribution(activity)
+        change = self._changes.setdefault(key, dict.fromkeys(MEASURES, 0))
+        for m in MEASURES:
+            change[m] += sign * measures[m]
+
+    def add(self, activity):
+        self._accumulate(activity, 1)
+
+    def remove(self, activity):
+        self._accumulate(activity, -1)
+
+    def apply(self):
+        """Write the accumulated deltas to portfolio_rollups (no commit)."""
+        table = PortfolioRollup.__table__
+        for key, change in self._changes.items():
+            if not any(change.values()):
+                continue
+            where = [table.c[d] == v for d, v in zip(DIMENSIONS, key)]
+            result = db.session.execute(
+                table.update()
+                .where(*where)
+                .values({m: table.c[m] + change[m] for m in MEASURES})
+            )
+            if result.rowcount == 0:
+                db.session.execute(insert(table).values(**dict(zip(DIMENSIONS, key)), **change))
+        # Groups that no longer contain any activity are dropped
+        db.session.execute(table.delete().where(table.c.activity_count <= 0))
+        self._changes = {}
+
+
+def clear_rollups():
+    """Empty the rollups (no commit); used when every activity is deleted."""
+    db.session.execute(PortfolioRollup.__table__.delete())
+
+
+def rebuild_rollups():
+    """Recompute every rollup row from activities with one INSERT ... SELECT (no commit)."""
+    dims = [func.coalesce(getattr(Activity, d), "") for d in DIMENSIONS]
+    select = db.select(
+        *dims,
+        func.count(Activity.id),
+        func.sum(num(Activity.budget_total)),
+        func.sum(num(Activity.budget_year1)),
+        func.sum(num(Activity.budget_year2)),
+        func.sum(num(Activity.budget_year3)),
+        func.sum(num(Activity.budget_used_year1)),
+        func.sum(num(Activity.budget_used_year2)),
+        func.sum(num(Activity.budget_used_year3)),
+        func.sum(total_budget_used_expr()),
+        func.sum(exec_pct_expr()),
+    ).group_by(*dims)
+    clear_rollups()
+    db.session.execute(
+        insert(PortfolioRollup.__table__).from_select(list(DIMENSIONS) + list(MEASURES), select)
+    )
+
+
+def rollup_groups(status_list=None, entity_list=None, category_list=None, results_list=None):
+    """Read pre-summed groups for dimension-only filters.
+
+    Returns rows shaped like dashboard_stats.activity_groups() so they can be
+    folded by summarize_groups().
+    """
+    query = PortfolioRollup.query
+    if status_list:
+        query = query.filter(PortfolioRollup.status.in_(status_list))
+    if entity_list:
+        query = query.filter(PortfolioRollup.implementing_entity.in_(entity_list))
+    if category_list:
+        query = query.filter(PortfolioRollup.category.in_(category_list))
+    if results_list:
+        query = query.filter(PortfolioRollup.results_area.in_(results_list))
+    return [
+        {c: getattr(row, c) for c in DIMENSIONS + MEASURES}
+        for row in query.all()
+    ]
+
+
+if __name__ == "__main__":
+    from app import app
+
+    with app.app_context():
+        rebuild_rollups()
+        db.session.commit()
+        print(f"Rebuilt {PortfolioRollup.query.count()} portfolio rollup rows.")
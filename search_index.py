@@ -0,0 +1,246 @@
+"""Full-text search over activities, indicators and activity reports.
+
+Postgres: each table gets a generated ``search_vector tsvector`` column
+(weighted, ``simple`` configuration) with a GIN index. SQLite: an FTS5 table
+per document (``<table>_fts``, rowid = document id) kept in sync by
+INSERT/UPDATE/DELETE triggers. Either way the index follows every write
+without application code; the d8f3a2b6c1e9 migration creates it,
+``create_search_index()`` rebuilds it, and searches fall back to ``ILIKE``
+when it is missing.
+
+Search terms are whitespace-separated words matched as prefixes and ANDed
+together; ``search_hits()`` returns the matching ids with a relevance rank.
+
+Run this module directly to (re)build the index for the configured database:
+
+    python search_index.py
+"""
+import threading
+
+from sqlalchemy import column, func, inspect, literal, literal_column, select, table, text
+
+from models import db
+
+
+# Searchable text per document: (column, Postgres weight A-D)
+DOCUMENTS = {
+    "activities": (
+        ("code", "A"),
+        ("proposed_activity", "A"),
+        ("initial_activity", "B"),
+        ("implementing_entity", "C"),
+        ("results_area", "C"),
+        ("category", "C"),
+    ),
+    "indicators": (
+        ("activity_code", "A"),
+        ("new_proposed_indicator", "A"),
+        ("indicator_definition", "B"),
+        ("data_source", "C"),
+        ("comments", "C"),
+    ),
+    "activity_reports": (
+        ("title", "A"),
+        ("content_html", "B"),
+    ),
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# DDL
+# ---------------------------------------------------------------------------
+
+def _pg_document(column_name):
+    if column_name == "content_html":
+        # Index the report text, not its markup
+        return f"regexp_replace(coalesce({column_name}, ''), '<[^>]*>', ' ', 'g')"
+    return f"coalesce({column_name}, '')"
+
+
+def _postgres_ddl(table_name, columns):
+    vector = " || ".join(
+        f"setweight(to_tsvector('simple', {_pg_document(name)}), '{weight}')"
+        for name, weight in columns
+    )
+    return [
+        f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({vector}) STORED",
+        f"CREATE INDEX IF NOT EXISTS ix_{table_name}_search_vector ON {table_name} USING GIN (search_vector)",
+    ]
+
+
+def _sqlite_ddl(table_name, columns):
+    names = [name for name, _ in columns]
+    fts = f"{table_name}_fts"
+    new_values = ", ".join(f"new.{name}" for name in names)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({', '.join(names)}, "
+        f"tokenize = 'unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table_name} BEGIN "
+        f"INSERT INTO {fts}(rowid, {', '.join(names)}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table_name} BEGIN "
+        f"DELETE FROM {fts} WHERE rowid = old.id; END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table_name} BEGIN "
+        f"DELETE FROM {fts} WHERE rowid = old.id; "
+        f"INSERT INTO {fts}(rowid, {', '.join(names)}) VALUES (new.id, {new_values}); END",
+        # (Re)load existing rows
+        f"DELETE FROM {fts}",
+        f"INSERT INTO {fts}(rowid, {', '.join(names)}) SELECT id, {', '.join(names)} FROM {table_name}",
+    ]
+
+
+def create_search_index(connection):
+    """Create (or refresh) the full-text index on ``connection``; safe to re-run."""
+    dialect = connection.dialect.name
+    for table_name, columns in DOCUMENTS.items():
+        if dialect == "postgresql":
+            statements = _postgres_ddl(table_name, columns)
+        elif dialect == "sqlite":
+            statements = _sqlite_ddl(table_name, columns)
+        else:
+            print(f"Full-text search index not supported on {dialect}; searches use ILIKE.")
+            return
+        for statement in statements:
+            connection.execute(text(statement))
+    reset_search_backend()
+
+
+def drop_search_index(connection):
+    """Remove the full-text index objects created by create_search_index()."""
+    dialect = connection.dialect.name
+    for table_name in DOCUMENTS:
+        if dialect == "postgresql":
+            connection.execute(text(f"DROP INDEX IF EXISTS ix_{table_name}_search_vector"))
+            connection.execute(text(f"ALTER TABLE {table_name} DROP COLUMN IF EXISTS search_vector"))
+        elif dialect == "sqlite":
+            for suffix in ("ai", "ad", "au"):
+                connection.execute(text(f"DROP TRIGGER IF EXISTS {table_name}_fts_{suffix}"))
+            connection.execute(text(f"DROP TABLE IF EXISTS {table_name}_fts"))
+    reset_search_backend()
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+def reset_search_backend():
+    """Forget the detected backend (next search re-inspects the database)."""
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+def search_backend():
+    """Return ``"postgresql"``, ``"fts5"`` or ``"ilike"`` (index missing) for this process."""
+    global _backend
+    if _backend is not None:
+        return _backend
+    with _backend_lock:
+        if _backend is None:
+            backend = "ilike"
+            try:
+                inspector = inspect(db.engine)
+                dialect = db.engine.dialect.name
+                if dialect == "postgresql":
+                    columns = {c["name"] for c in inspector.get_columns("activities")}
+                    if "search_vector" in columns:
+                        backend = "postgresql"
+                elif dialect == "sqlite" and inspector.has_table("activities_fts"):
+                    backend = "fts5"
+            except Exception as e:
+                print(f"Error detecting full-text search index, using ILIKE: {e}")
+            _backend = backend
+    return _backend
+
+
+def search_terms(search_query):
+    """Split a search string into words; words without letters or digits are dropped."""
+    return [w for w in (search_query or "").split() if any(ch.isalnum() for ch in w)]
+
+
+def _tsquery(terms):
+    # Each word is a quoted lexeme with prefix matching: 'lab':* & 'mo''s':*
+    quoted = ("'" + w.replace("\\", "\\\\").replace("'", "''") + "':*" for w in terms)
+    return func.to_tsquery("simple", " & ".join(quoted))
+
+
+def _fts5_query(terms):
+    # Each word is a quoted FTS5 phrase with prefix matching: "lab"* "mo""s"*
+    return " ".join('"' + w.replace('"', '""') + '"*' for w in terms)
+
+
+def search_hits(model, search_query):
+    """Subquery ``(id, rank)`` of ``model`` rows matching every search word, or None.
+
+    ``rank`` is higher for better matches (0 when falling back to ILIKE).
+    """
+    terms = search_terms(search_query)
+    if not terms:
+        return None
+    table_name = model.__tablename__
+    backend = search_backend()
+
+    if backend == "postgresql":
+        vector = literal_column(f"{table_name}.search_vector")
+        query = _tsquery(terms)
+        return (
+            select(model.id.label("id"), func.ts_rank(vector, query).label("rank"))
+            .where(vector.op("@@")(query))
+            .subquery()
+        )
+
+    if backend == "fts5":
+        fts_name = f"{table_name}_fts"
+        fts = table(fts_name, column("rowid"), column("rank"))
+        return (
+            select(fts.c.rowid.label("id"), (-fts.c.rank).label("rank"))
+            .where(literal_column(fts_name).op("MATCH")(_fts5_query(terms)))
+            .subquery()
+        )
+
+    # No index: every word must appear somewhere in the document's text columns
+    columns = [getattr(model, name) for name, _ in DOCUMENTS[table_name]]
+    conditions = [db.or_(*(c.ilike(f"%{w}%") for c in columns)) for w in terms]
+    return select(model.id.label("id"), literal(0.0).label("rank")).where(*conditions).subquery()
+
+
+def search_condition(search_query, *models):
+    """WHERE clause: the row's document in any of ``models`` matches, or None for no search."""
+    clauses = []
+    for model in models:
+        hits = search_hits(model, search_query)
+        if hits is not None:
+            clauses.append(model.id.in_(select(hits.c.id)))
+    return db.or_(*clauses) if clauses else None
+
+
+def rank_search_results(query, search_query, *models):
+    """Outer-join the search ranks of ``models`` onto ``query``.
+
+    Returns ``(query, rank)`` where ``rank`` is the summed relevance (None when
+    there is no search). Filtering is left to search_condition().
+    """
+    ranks = []
+    for model in models:
+        hits = search_hits(model, search_query)
+        if hits is not None:
+            query = query.outerjoin(hits, hits.c.id == model.id)
+            ranks.append(func.coalesce(hits.c.rank, 0.0))
+    if not ranks:
+        return query, None
+    rank = ranks[0]
+    for extra in ranks[1:]:
+        rank = rank + extra
+    return query, rank
+
+
+if __name__ == "__main__":
+    from app import app
+
+    with app.app_context():
+        with db.engine.begin() as connection:
+            create_search_index(connection)
+        print(f"Full-text search index ready ({search_backend()}).")
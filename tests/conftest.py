@@ -0,0 +1,29 @@
+"""Shared fixtures: the Flask app on a throwaway SQLite database.
+
+The app reads DATABASE_URL when it is imported, so it is pointed at a
+temporary file here, before anything imports ``app``.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="pfund-tests-"), "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_PATH}"
+
+from app import app as flask_app  # noqa: E402
+from models import db  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    """App context with freshly created tables, dropped afterwards."""
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
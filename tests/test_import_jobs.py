@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import import_jobs
+from import_jobs import IMPORT_STALE_SECONDS, _pending, _progress, _start_job, enqueue_import, fail_stale_jobs
+from models import ImportJob, db
+
+
+@pytest.fixture(autouse=True)
+def _forget_local_jobs():
+    """_start_job() records the job as running in this process; no worker runs it here."""
+    yield
+    _progress.clear()
+    _pending.clear()
+
+
+def _job(status, kind="activities", heartbeat_at=None, created_at=None):
+    job = ImportJob(
+        kind=kind, filename=f"{kind}.xlsx", status=status, heartbeat_at=heartbeat_at, created_at=created_at,
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def test_upload_is_rejected_while_same_kind_runs(app):
+    running = _job("running")
+
+    job = enqueue_import("activities", "again.xlsx", b"not read")
+
+    assert job.status == "failed"
+    assert f"job #{running.id}" in job.message
+    assert job.finished_at is not None
+
+
+def test_only_one_job_per_kind_starts(app):
+    first, second, other_kind = _job("queued"), _job("queued"), _job("queued", kind="indicators")
+
+    assert _start_job(first.id)
+    assert not _start_job(second.id)
+    assert _start_job(other_kind.id)
+
+    assert [db.session.get(ImportJob, job.id).status for job in (first, second, other_kind)] == [
+        "running", "failed", "running",
+    ]
+
+
+def test_running_job_without_heartbeat_fails(app):
+    now = datetime.utcnow()
+    dead = _job("running", heartbeat_at=now - timedelta(seconds=IMPORT_STALE_SECONDS + 60))
+    alive = _job("running", kind="indicators", heartbeat_at=now)
+
+    assert fail_stale_jobs() == [dead]
+    db.session.commit()
+
+    assert dead.status == "failed"
+    assert "stopped before finishing" in dead.message
+    assert alive.status == "running"
+
+
+def test_queued_job_lost_with_its_process_fails(app):
+    long_ago = datetime.utcnow() - timedelta(seconds=IMPORT_STALE_SECONDS + 60)
+    lost = _job("queued", created_at=long_ago)
+    waiting_here = _job("queued", created_at=long_ago)
+    _pending.add(waiting_here.id)
+    just_queued = _job("queued")
+
+    assert fail_stale_jobs("activities") == [lost]
+    db.session.commit()
+
+    assert lost.status == "failed"
+    assert "never started" in lost.message
+    assert waiting_here.status == just_queued.status == "queued"
+    # Its bytes turning up late does not revive it
+    assert not _start_job(lost.id)
+    assert db.session.get(ImportJob, lost.id).status == "failed"
+
+
+def test_stale_job_does_not_block_its_kind(app):
+    _job("running", heartbeat_at=datetime.utcnow() - timedelta(seconds=IMPORT_STALE_SECONDS + 60))
+    queued = _job("queued")
+
+    assert _start_job(queued.id)
+
+
+def test_job_that_cannot_start_fails(app, monkeypatch):
+    queued = _job("queued")
+
+    def lock_unavailable(job):
+        raise RuntimeError("lock timeout")
+
+    monkeypatch.setattr(import_jobs, "_lock_kind", lock_unavailable)
+    import_jobs._run_job(app, queued.id, "activities", "activities.xlsx", b"not read")
+
+    db.session.expire_all()
+    job = db.session.get(ImportJob, queued.id)
+    assert job.status == "failed"
+    assert job.message == "Error starting activities import: lock timeout"
+    assert job.finished_at is not None
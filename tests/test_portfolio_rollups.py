@@ -0,0 +1,50 @@
+from models import Activity, PortfolioRollup, db
+from portfolio_rollups import DIMENSIONS, MEASURES, RollupDelta, rebuild_rollups, round_half_up
+
+
+def _rollups():
+    return sorted(
+        tuple(getattr(row, c) for c in DIMENSIONS + MEASURES) for row in PortfolioRollup.query
+    )
+
+
+def _add(*activities):
+    delta = RollupDelta()
+    for activity in activities:
+        db.session.add(activity)
+    db.session.flush()
+    for activity in activities:
+        delta.add(activity)
+    delta.apply()
+    db.session.commit()
+
+
+def test_round_half_up():
+    assert [round_half_up(x) for x in (0.5, 1.5, 2.5, 2.4999, 11.25)] == [1, 2, 3, 2, 11]
+
+
+def test_incremental_rollups_match_rebuild_on_half_percent(app):
+    half = Activity(code="A1", implementing_entity="MOH", status="Planned", budget_total=40, budget_used_year1=1)
+    _add(
+        half,  # 2.5 %
+        Activity(code="A2", implementing_entity="MOH", status="Planned", budget_total=200, budget_used_year2=1),  # 0.5 %
+        Activity(code="A3", implementing_entity="RBC", budget_total=8, budget_used_year1=0.5, budget_used_year3=0.4),
+    )
+    incremental = _rollups()
+    rebuild_rollups()
+    db.session.commit()
+    assert _rollups() == incremental
+    moh = PortfolioRollup.query.filter_by(implementing_entity="MOH").one()
+    assert moh.exec_pct_sum == 3 + 1
+
+    # Removing the .5 activity subtracts exactly what the rebuild added
+    delta = RollupDelta()
+    delta.remove(half)
+    db.session.delete(half)
+    delta.apply()
+    db.session.commit()
+    incremental = _rollups()
+    rebuild_rollups()
+    db.session.commit()
+    assert _rollups() == incremental
+    assert PortfolioRollup.query.filter_by(implementing_entity="MOH").one().exec_pct_sum == 1
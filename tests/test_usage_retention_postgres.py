@@ -0,0 +1,95 @@
+"""usage_retention against a real PostgreSQL: partitioning, new partitions, archive and drop.
+
+Skipped unless TEST_POSTGRES_URL points at a throwaway database (its tables
+are dropped), e.g. ``postgresql://postgres@localhost/pfund_test``.
+"""
+import gzip
+import os
+from datetime import date, datetime
+
+import pytest
+from flask import Flask
+from sqlalchemy import text
+
+from models import User, UserActivity, UserAgent, db
+from usage_retention import (
+    archive_old_events,
+    ensure_partitions,
+    is_partitioned,
+    partition_name,
+    partition_user_activities,
+)
+
+
+TEST_POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+
+
+@pytest.fixture
+def pg_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = TEST_POSTGRES_URL
+    db.init_app(app)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _partition_counts():
+    with db.engine.connect() as conn:
+        return dict(conn.execute(text(
+            "SELECT tableoid::regclass::text, COUNT(*) FROM user_activities GROUP BY 1"
+        )).all())
+
+
+def test_partition_archive_and_drop(pg_app, tmp_path):
+    user = User(username="u", email="u@example.org", password_hash="x", role="admin")
+    agent = UserAgent(digest="0" * 40, user_agent="Mozilla/5.0")
+    db.session.add_all([user, agent])
+    db.session.flush()
+    for month in (1, 2, 3, 9):
+        for day in (1, 15):
+            db.session.add(UserActivity(
+                user_id=user.id, action="login", user_agent_id=agent.id, timestamp=datetime(2025, month, day),
+            ))
+    db.session.commit()
+
+    with db.engine.begin() as conn:
+        assert partition_user_activities(conn, date(2025, 10, 17))
+    with db.engine.begin() as conn:
+        assert is_partitioned(conn)
+        assert not partition_user_activities(conn, date(2025, 10, 17))
+    counts = _partition_counts()
+    assert counts == {partition_name(date(2025, m, 1)): 2 for m in (1, 2, 3, 9)}
+
+    # Ids continue from the old sequence; a month past the partitions lands in the default one
+    late = UserActivity(user_id=user.id, action="login", timestamp=datetime(2026, 3, 5))
+    db.session.add(late)
+    db.session.flush()
+    assert late.id == 9
+    db.session.commit()
+    assert _partition_counts()["user_activities_default"] == 1
+
+    with db.engine.begin() as conn:
+        created = ensure_partitions(conn, date(2026, 2, 10))
+    assert created == [partition_name(date(2026, m, 1)) for m in (2, 3, 4, 5)]
+    counts = _partition_counts()
+    assert counts[partition_name(date(2026, 3, 1))] == 1
+    assert "user_activities_default" not in counts
+
+    archived = archive_old_events(now=datetime(2026, 2, 10), retention_days=330, directory=str(tmp_path))
+    assert [(month, rows) for month, _, rows in archived] == [(date(2025, m, 1), 2) for m in (1, 2)]
+    with gzip.open(archived[0][1], "rt") as f:
+        lines = f.read().splitlines()
+    assert lines[1].endswith(",login,,,,,Mozilla/5.0")
+    with db.engine.connect() as conn:
+        partitions = set(conn.execute(text(
+            "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'user_activities'::regclass"
+        )).scalars())
+    assert partition_name(date(2025, 1, 1)) not in partitions
+    assert partition_name(date(2025, 3, 1)) in partitions
+    assert UserActivity.query.count() == 5
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import usage_tracking
+from models import UserActivity, UserActivityDaily
+from usage_tracking import UsageWriter
+
+
+def _writer(app):
+    writer = UsageWriter()
+    writer._app = app
+    return writer
+
+
+def _event(user_id=1, action="login"):
+    return {
+        "user_id": user_id, "action": action, "resource_type": None, "resource_id": None,
+        "details": None, "ip_address": None, "user_agent": "Mozilla/5.0", "timestamp": datetime(2026, 10, 17, 9),
+    }
+
+
+def _daily():
+    return sorted((row.action, row.count) for row in UserActivityDaily.query)
+
+
+def test_failed_batch_and_counts_are_written_with_the_next_batch(app, monkeypatch):
+    writer = _writer(app)
+    writer._counts[(datetime(2026, 10, 17).date(), 1, "view_activities")] = 2
+    record = usage_tracking.record_daily_counts
+    calls = []
+
+    def fail_once(conn, counts):
+        calls.append(counts)
+        if len(calls) == 1:
+            raise RuntimeError("database unavailable")
+        record(conn, counts)
+
+    monkeypatch.setattr(usage_tracking, "record_daily_counts", fail_once)
+
+    writer._write([(_event(), False)])
+    assert UserActivity.query.count() == 0
+    assert writer._retry and sum(writer._counts.values()) == 2
+
+    writer._write([(_event(action="logout"), False)])
+    assert sorted(event.action for event in UserActivity.query) == ["login", "logout"]
+    assert _daily() == [("login", 1), ("logout", 1), ("view_activities", 2)]
+    assert not writer._retry and not writer._counts
+
+
+def test_batch_failing_twice_is_dropped(app):
+    writer = _writer(app)
+    bad = (_event(user_id=None), False)  # user_id is NOT NULL
+
+    writer._write([bad])
+    assert writer._retry == [bad]
+
+    writer._write([])
+    assert writer._retry == []
+
+    writer._write([(_event(), False)])
+    assert UserActivity.query.count() == 1
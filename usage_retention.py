@@ -0,0 +1,297 @@
+"""Retention and archival for the user_activities event table.
+
+Events older than USAGE_RETENTION_DAYS are archived one calendar month at a
+time: the month's events, with their User-Agent strings, are written to
+``user_activities-YYYY-MM.csv.gz`` in USAGE_ARCHIVE_DIR, and only once that
+file is complete are they removed from the database, in one transaction.
+Where user_activities is partitioned by month (PostgreSQL, see below) that
+drops the month's partition; elsewhere the rows are deleted. The daily
+rollups behind /admin/usage are kept (see usage_rollups), so its totals
+still cover archived months.
+
+On PostgreSQL the table is converted once, with an explicit maintenance
+command that copies every event into a new table partitioned by month (a
+partition per month from the oldest event to a few months ahead, plus a
+default partition). It holds an exclusive lock on user_activities while it
+runs, so run it when the app is quiet:
+
+    python usage_retention.py partition
+
+Once the table is partitioned, each run also creates the partitions of the
+current and the next PARTITION_MONTHS_AHEAD months, moving in any of their
+events that landed in the default partition.
+
+USAGE_ARCHIVE_DIR must be on persistent storage (not a dyno's filesystem).
+Run this module daily, e.g. from a scheduler:
+
+    python usage_retention.py
+"""
+import csv
+import gzip
+import os
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, select, text
+
+from config import BASE_DIR
+from models import UserActivity, UserAgent, db
+
+
+USAGE_RETENTION_DAYS = int(os.environ.get("USAGE_RETENTION_DAYS", "365"))  # 0 keeps every event
+USAGE_ARCHIVE_DIR = os.environ.get("USAGE_ARCHIVE_DIR") or os.path.join(BASE_DIR, "usage_archive")
+
+PARTITION_MONTHS_AHEAD = 3
+
+ARCHIVE_BATCH_SIZE = 1000
+
+ARCHIVE_HEADER = (
+    "id",
+    "timestamp",
+    "user_id",
+    "action",
+    "resource_type",
+    "resource_id",
+    "details",
+    "ip_address",
+    "user_agent",
+)
+
+
+def _next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"user_activities_p{month:%Y%m}"
+
+
+def _partitions(conn):
+    """Names of the partitions of user_activities."""
+    return set(conn.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        WHERE parent.relname = 'user_activities'
+    """)).scalars())
+
+
+def is_partitioned(conn):
+    """Whether user_activities is a partitioned table (PostgreSQL only)."""
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(conn.execute(text("""
+        SELECT 1
+        FROM pg_partitioned_table
+        JOIN pg_class ON pg_class.oid = pg_partitioned_table.partrelid
+        WHERE pg_class.relname = 'user_activities'
+    """)).scalar())
+
+
+def partition_user_activities(conn, today):
+    """Rebuild user_activities as a table partitioned by month of timestamp (PostgreSQL).
+
+    Copies every event into the new table, with a partition per month from
+    the oldest event to PARTITION_MONTHS_AHEAD months past ``today`` plus a
+    default partition, keeping ids and the id sequence. Run it in one
+    transaction; returns False if the table was already partitioned.
+    """
+    if is_partitioned(conn):
+        return False
+    conn.execute(text("LOCK TABLE user_activities IN ACCESS EXCLUSIVE MODE"))
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence('user_activities', 'id')")).scalar()
+    oldest = conn.execute(text('SELECT MIN("timestamp") FROM user_activities')).scalar()
+
+    conn.execute(text("ALTER TABLE user_activities RENAME TO user_activities_old"))
+    conn.execute(text("ALTER TABLE user_activities_old RENAME CONSTRAINT user_activities_pkey TO user_activities_old_pkey"))
+    conn.execute(text("DROP INDEX ix_user_activities_user_id"))
+    conn.execute(text("DROP INDEX ix_user_activities_timestamp"))
+
+    # The partition key has to be part of the primary key
+    conn.execute(text(f"""
+        CREATE TABLE user_activities (
+            id INTEGER NOT NULL DEFAULT nextval('{sequence}'),
+            user_id INTEGER NOT NULL,
+            action VARCHAR NOT NULL,
+            resource_type VARCHAR,
+            resource_id INTEGER,
+            details TEXT,
+            ip_address VARCHAR,
+            user_agent_id INTEGER,
+            "timestamp" TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, "timestamp"),
+            CONSTRAINT user_activities_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id),
+            CONSTRAINT fk_user_activities_user_agent_id FOREIGN KEY (user_agent_id) REFERENCES user_agents (id)
+        ) PARTITION BY RANGE ("timestamp")
+    """))
+    conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY user_activities.id"))
+    conn.execute(text("CREATE INDEX ix_user_activities_user_id ON user_activities (user_id)"))
+    conn.execute(text('CREATE INDEX ix_user_activities_timestamp ON user_activities ("timestamp")'))
+    conn.execute(text("CREATE TABLE user_activities_default PARTITION OF user_activities DEFAULT"))
+
+    last = today.replace(day=1)
+    for _ in range(PARTITION_MONTHS_AHEAD):
+        last = _next_month(last)
+    month = (oldest.date() if oldest else last).replace(day=1)
+    while month <= last:
+        conn.execute(text(
+            f"CREATE TABLE {partition_name(month)} PARTITION OF user_activities "
+            f"FOR VALUES FROM ('{month}') TO ('{_next_month(month)}')"
+        ))
+        month = _next_month(month)
+
+    conn.execute(text("""
+        INSERT INTO user_activities
+            (id, user_id, action, resource_type, resource_id, details, ip_address, user_agent_id, "timestamp")
+        SELECT id, user_id, action, resource_type, resource_id, details, ip_address, user_agent_id, "timestamp"
+        FROM user_activities_old
+    """))
+    conn.execute(text("DROP TABLE user_activities_old"))
+    return True
+
+
+def ensure_partitions(conn, today):
+    """Create the monthly partitions from ``today``'s month to PARTITION_MONTHS_AHEAD months ahead.
+
+    A month's events already in the default partition are moved into the new
+    partition before it is attached. Returns the names created.
+    """
+    existing = _partitions(conn)
+    created = []
+    month = today.replace(day=1)
+    for _ in range(PARTITION_MONTHS_AHEAD + 1):
+        name = partition_name(month)
+        if name not in existing:
+            bounds = {"start": month, "end": _next_month(month)}
+            conn.execute(text(f"CREATE TABLE {name} (LIKE user_activities INCLUDING DEFAULTS)"))
+            conn.execute(text(f"""
+                WITH moved AS (
+                    DELETE FROM user_activities_default
+                    WHERE "timestamp" >= :start AND "timestamp" < :end
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+            """), bounds)
+            conn.execute(text(
+                f"ALTER TABLE user_activities ATTACH PARTITION {name} "
+                f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+            ))
+            created.append(name)
+        month = _next_month(month)
+    return created
+
+
+def archive_month(conn, month, directory):
+    """Write ``month``'s events to a gzip CSV in ``directory``; returns (path, rows written).
+
+    Nothing is written for a month without events (path None).
+    """
+    start, end = month, _next_month(month)
+    query = (
+        select(
+            UserActivity.id,
+            UserActivity.timestamp,
+            UserActivity.user_id,
+            UserActivity.action,
+            UserActivity.resource_type,
+            UserActivity.resource_id,
+            UserActivity.details,
+            UserActivity.ip_address,
+            UserAgent.user_agent,
+        )
+        .outerjoin(UserAgent, UserActivity.user_agent_id == UserAgent.id)
+        .where(UserActivity.timestamp >= start, UserActivity.timestamp < end)
+        .order_by(UserActivity.timestamp, UserActivity.id)
+    )
+    path = os.path.join(directory, f"user_activities-{month:%Y-%m}.csv.gz")
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    rows = 0
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", newline="", encoding="utf-8") as out:
+            writer = csv.writer(out)
+            writer.writerow(ARCHIVE_HEADER)
+            result = conn.execute(query.execution_options(stream_results=True, max_row_buffer=ARCHIVE_BATCH_SIZE))
+            for row in result:
+                writer.writerow(row)
+                rows += 1
+        if not rows:
+            os.unlink(tmp_path)
+            return None, 0
+        # A re-run after a failed delete rewrites the same month in full
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path, rows
+
+
+def drop_month(conn, month):
+    """Remove ``month``'s events: its partition on PostgreSQL, plus any rows left elsewhere."""
+    start, end = month, _next_month(month)
+    if is_partitioned(conn) and partition_name(month) in _partitions(conn):
+        conn.execute(text(f"DROP TABLE {partition_name(month)}"))
+    table = UserActivity.__table__
+    conn.execute(table.delete().where(table.c.timestamp >= start, table.c.timestamp < end))
+
+
+def archive_old_events(now=None, retention_days=USAGE_RETENTION_DAYS, directory=USAGE_ARCHIVE_DIR):
+    """Archive and remove every month that ended more than ``retention_days`` ago.
+
+    Returns ``[(month, archive path, rows)]``.
+    """
+    if not retention_days:
+        return []
+    now = now or datetime.utcnow()
+    cutoff = (now - timedelta(days=retention_days)).date().replace(day=1)
+    with db.engine.connect() as conn:
+        oldest = conn.execute(select(func.min(UserActivity.timestamp))).scalar()
+        old_partitions = sorted(
+            name for name in _partitions(conn) if name[-6:].isdigit() and name < partition_name(cutoff)
+        ) if is_partitioned(conn) else []
+    if oldest is None and not old_partitions:
+        return []
+
+    os.makedirs(directory, exist_ok=True)
+    archived = []
+    month = oldest.date().replace(day=1) if oldest is not None else cutoff
+    while month < cutoff:
+        with db.engine.begin() as conn:
+            path, rows = archive_month(conn, month, directory)
+            drop_month(conn, month)
+        if rows:
+            archived.append((month, path, rows))
+        month = _next_month(month)
+
+    # Empty partitions of months before the first remaining event
+    if old_partitions:
+        with db.engine.begin() as conn:
+            for name in old_partitions:
+                conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+    return archived
+
+
+def run_retention(now=None):
+    """Create upcoming partitions (partitioned table only) and archive expired months."""
+    now = now or datetime.utcnow()
+    with db.engine.begin() as conn:
+        if is_partitioned(conn):
+            for name in ensure_partitions(conn, now.date()):
+                print(f"Created partition {name}")
+    for month, path, rows in archive_old_events(now):
+        print(f"Archived {rows} events of {month:%Y-%m} to {path}")
+
+
+if __name__ == "__main__":
+    from app import app
+
+    with app.app_context():
+        if sys.argv[1:] == ["partition"]:
+            if db.engine.dialect.name != "postgresql":
+                sys.exit("user_activities is only partitioned on PostgreSQL")
+            with db.engine.begin() as conn:
+                converted = partition_user_activities(conn, datetime.utcnow().date())
+            print("Partitioned user_activities by month" if converted else "user_activities is already partitioned")
+        else:
+            run_retention()
@@ -0,0 +1,131 @@
+"""Daily usage rollups for the /admin/usage page.
+
+``user_activity_daily`` holds one row per (UTC day, user_id, action) with
+the number of user_activities events. The usage tracking writer adds each
+batch's counts with ``record_daily_counts()`` in the transaction that
+inserts the events, so the rollups never drift from the event table; the
+usage page reads its totals from these few hundred rows instead of scanning
+the events of the whole window.
+
+Run this module directly to rebuild the table from scratch:
+
+    python usage_rollups.py
+"""
+from collections import Counter
+
+from sqlalchemy import func, insert
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import User, UserActivity, UserActivityDaily, db
+
+
+KEY = ("day", "user_id", "action")
+
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def daily_counts(rows):
+    """``{(day, user_id, action): count}`` for user_activities rows (dicts of column values)."""
+    return Counter((row["timestamp"].date(), row["user_id"], row["action"]) for row in rows)
+
+
+def record_daily_counts(conn, counts):
+    """Add ``counts`` (see daily_counts()) to user_activity_daily on ``conn`` (no commit).
+
+    Uses INSERT ... ON CONFLICT DO UPDATE where the dialect has it, so the
+    writers of several gunicorn workers can add to the same row.
+    """
+    if not counts:
+        return
+    table = UserActivityDaily.__table__
+    rows = [dict(zip(KEY, key), count=n) for key, n in counts.items()]
+    dialect_insert = UPSERT_INSERTS.get(conn.dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(table)
+        conn.execute(
+            stmt.on_conflict_do_update(
+                index_elements=list(KEY),
+                set_={"count": table.c.count + stmt.excluded.count},
+            ),
+            rows,
+        )
+        return
+    for row in rows:
+        result = conn.execute(
+            table.update()
+            .where(*[table.c[k] == row[k] for k in KEY])
+            .values(count=table.c.count + row["count"])
+        )
+        if result.rowcount == 0:
+            conn.execute(insert(table).values(**row))
+
+
+def rebuild_daily_counts(keep_actions=()):
+    """Recompute user_activity_daily from user_activities with one INSERT ... SELECT (no commit).
+
+    Days before the oldest event left in user_activities (archived by
+    usage_retention) keep their rows, and so do ``keep_actions``: actions
+    whose events are not all stored (counted or sampled, see usage_tracking).
+    """
+    oldest = db.session.query(func.min(UserActivity.timestamp)).scalar()
+    day = func.date(UserActivity.timestamp)
+    select = (
+        db.select(day, UserActivity.user_id, UserActivity.action, func.count(UserActivity.id))
+        .where(UserActivity.action.not_in(keep_actions))
+        .group_by(day, UserActivity.user_id, UserActivity.action)
+    )
+    table = UserActivityDaily.__table__
+    stale = table.c.action.not_in(keep_actions)
+    if oldest:
+        stale = stale & (table.c.day >= oldest.date())
+    db.session.execute(table.delete().where(stale))
+    db.session.execute(
+        insert(UserActivityDaily.__table__).from_select(list(KEY) + ["count"], select)
+    )
+
+
+def usage_summary(start_day):
+    """Totals since ``start_day`` (inclusive) for the usage page.
+
+    Returns ``(total, action_stats, user_stats, daily_stats)``: the event
+    count, ``(action, count)`` and ``(username, email, count)`` rows by
+    descending count, and ``("YYYY-MM-DD", count)`` rows newest day first.
+    """
+    total = func.sum(UserActivityDaily.count)
+    in_window = UserActivityDaily.day >= start_day
+
+    action_stats = (
+        db.session.query(UserActivityDaily.action, total.label("count"))
+        .filter(in_window)
+        .group_by(UserActivityDaily.action)
+        .order_by(total.desc())
+        .all()
+    )
+    user_stats = (
+        db.session.query(User.username, User.email, total.label("activity_count"))
+        .join(UserActivityDaily, User.id == UserActivityDaily.user_id)
+        .filter(in_window)
+        .group_by(User.id, User.username, User.email)
+        .order_by(total.desc())
+        .all()
+    )
+    daily_stats = [
+        (day.strftime("%Y-%m-%d"), count)
+        for day, count in db.session.query(UserActivityDaily.day, total)
+        .filter(in_window)
+        .group_by(UserActivityDaily.day)
+        .order_by(UserActivityDaily.day.desc())
+        .all()
+    ]
+    return sum(count for _, count in daily_stats), action_stats, user_stats, daily_stats
+
+
+if __name__ == "__main__":
+    from app import app
+
+    from usage_tracking import untracked_actions
+
+    with app.app_context():
+        rebuild_daily_counts(keep_actions=untracked_actions())
+        db.session.commit()
+        print(f"Rebuilt {UserActivityDaily.query.count()} daily usage rows.")
@@ -1,15 +1,301 @@
-"""Utility functions for tracking user activity and usage."""
+"""Utility functions for tracking user activity and usage.
 
+``log_user_activity()`` does not touch the request's database session: it
+captures the event and puts it on a bounded in-process queue. A background
+thread (one per process, started on first use) writes the queued events with
+one multi-row INSERT on its own connection every USAGE_FLUSH_EVENTS events
+or USAGE_FLUSH_MS milliseconds, whichever comes first, and once more at
+interpreter exit. The same transaction adds the batch to the daily rollups
+(see usage_rollups) and stores new User-Agent strings once in user_agents,
+the events referencing them by id. A batch that fails to write is retried
+once with the next one and then dropped; counters are kept until they are
+written. When the queue is full (database down or very slow), new events are
+dropped and counted instead of slowing requests down.
+
+What is recorded depends on the action's tracking policy:
+
+- ALWAYS (the default: mutations, downloads, logins): every event is stored;
+- SAMPLE: every event is counted in the daily rollups, and a random fraction
+  ``rate`` of them is also stored as events;
+- COUNT: events are only counted in the daily rollups, through in-memory
+  counters written with the next batch.
+
+Read-heavy page views are counted by default; USAGE_TRACKING_POLICY
+overrides any action, e.g. ``view_activities=sample:0.05,view_roadmap=always``.
+"""
+
+import atexit
+import hashlib
+import os
+import queue
+import random
+import threading
+import time
+from collections import Counter
 from datetime import datetime
 from functools import wraps
 
-from flask import request, session
+from flask import current_app, request, session
+from sqlalchemy import insert, select
+
+from models import UserActivity, UserAgent, db
+from usage_rollups import UPSERT_INSERTS, daily_counts, record_daily_counts
+
+
+USAGE_FLUSH_EVENTS = int(os.environ.get("USAGE_FLUSH_EVENTS", "100"))
+USAGE_FLUSH_MS = int(os.environ.get("USAGE_FLUSH_MS", "1000"))
+USAGE_QUEUE_SIZE = int(os.environ.get("USAGE_QUEUE_SIZE", "10000"))
+
+# Known user_agents ids kept per process; the map is emptied when it grows past this
+USER_AGENT_CACHE_SIZE = 10000
+
+ALWAYS = "always"
+SAMPLE = "sample"
+COUNT = "count"
+
+# Actions not listed here are always logged
+DEFAULT_TRACKING_POLICY = {
+    "view_activities": (COUNT, None),
+    "view_roadmap": (COUNT, None),
+}
 
-from models import UserActivity, db
+_STOP = object()
+_COUNTED = object()  # wakes the writer when the counters stop being empty
+
+
+def parse_tracking_policy(spec):
+    """``{action: (mode, rate)}`` from ``"action=mode[:rate],..."``; invalid entries are skipped."""
+    policy = {}
+    for entry in (spec or "").split(","):
+        if not entry.strip():
+            continue
+        try:
+            action, setting = (part.strip() for part in entry.split("="))
+            mode, _, rate = setting.partition(":")
+            if mode == SAMPLE:
+                rate = float(rate)
+                if not 0 < rate <= 1:
+                    raise ValueError(f"sample rate {rate} is not in (0, 1]")
+                policy[action] = (SAMPLE, rate)
+            elif mode in (ALWAYS, COUNT) and not rate:
+                policy[action] = (mode, None)
+            else:
+                raise ValueError(f"unknown mode {setting!r}")
+        except ValueError as e:
+            print(f"Ignoring usage tracking policy entry {entry.strip()!r}: {e}")
+    return policy
+
+
+TRACKING_POLICY = {**DEFAULT_TRACKING_POLICY, **parse_tracking_policy(os.environ.get("USAGE_TRACKING_POLICY"))}
+
+
+def tracking_policy(action):
+    """``(mode, sample rate)`` for ``action``."""
+    return TRACKING_POLICY.get(action, (ALWAYS, None))
+
+
+def untracked_actions():
+    """Actions whose events are not all stored (counted or sampled)."""
+    return sorted(action for action, (mode, _) in TRACKING_POLICY.items() if mode != ALWAYS)
+
+
+class UsageWriter:
+    """Bounded queue of user_activities rows plus the thread that inserts them in batches.
+
+    The thread is (re)started lazily in each process, so it also works when
+    the app is imported before gunicorn forks its workers.
+    """
+
+    def __init__(self, batch_size=USAGE_FLUSH_EVENTS, interval_ms=USAGE_FLUSH_MS, max_queued=USAGE_QUEUE_SIZE):
+        self.batch_size = batch_size
+        self.interval = interval_ms / 1000.0
+        self.max_queued = max_queued
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._app = None
+        self._agent_ids = {}  # User-Agent digest -> user_agents.id
+        self._counts_lock = threading.Lock()
+        self._counts = Counter()  # (day, user_id, action) -> events not stored individually
+        self._retry = []  # items of the last batch that failed, written with the next one
+        self._retried_counts = Counter()  # counts of that batch, merged back into _counts
+
+    def _ensure_started(self):
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._app = current_app._get_current_object()
+            self._queue = queue.Queue(maxsize=self.max_queued)
+            if self._pid is not None and self._pid != os.getpid():
+                # the parent process writes its own
+                self._counts = Counter()
+                self._retry = []
+                self._retried_counts = Counter()
+            self._thread = threading.Thread(target=self._run, name="usage-writer", daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def put(self, row, counted=False):
+        """Queue one user_activities row (a dict of column values); never blocks.
+
+        ``counted``: the event is already in the counters (see count()), so
+        the row is stored without being added to the daily rollups again.
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((row, counted))
+        except queue.Full:
+            self.dropped += 1
+
+    def count(self, day, user_id, action):
+        """Add one event to the in-memory daily counters, written with the next batch."""
+        self._ensure_started()
+        with self._counts_lock:
+            first = not self._counts
+            self._counts[(day, user_id, action)] += 1
+        if first:
+            try:
+                self._queue.put_nowait(_COUNTED)
+            except queue.Full:
+                pass  # written with the next batch anyway
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far is written (or ``timeout`` seconds pass)."""
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Write what is queued and stop the thread (registered with atexit)."""
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _run(self):
+        batch = []
+        deadline = None  # set while rows, counts or a failed batch are waiting
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._write(batch)
+                return
+            if isinstance(item, threading.Event):
+                self._write(batch)
+                batch = []
+                deadline = self._retry_deadline()
+                item.set()
+                continue
+            if item is not None:
+                if deadline is None:
+                    deadline = time.monotonic() + self.interval
+                if item is not _COUNTED:
+                    batch.append(item)
+            if deadline is not None and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(batch)
+                batch = []
+                deadline = self._retry_deadline()
+
+    def _retry_deadline(self):
+        """Next write time when a failed batch or counts are left over, else None."""
+        with self._counts_lock:
+            pending = bool(self._retry or self._counts)
+        return time.monotonic() + self.interval if pending else None
+
+    def _agent_ids_for(self, conn, agents):
+        """``{digest: user_agents.id}`` for the ``agents`` strings, inserting the new ones."""
+        wanted = {user_agent_digest(agent): agent for agent in agents if agent}
+        ids = {d: self._agent_ids[d] for d in wanted if d in self._agent_ids}
+        missing = [d for d in wanted if d not in ids]
+        if not missing:
+            return ids
+        table = UserAgent.__table__
+        lookup = select(table.c.digest, table.c.id).where(table.c.digest.in_(missing))
+        ids.update(conn.execute(lookup).all())
+        new = [{"digest": d, "user_agent": wanted[d]} for d in missing if d not in ids]
+        if new:
+            dialect_insert = UPSERT_INSERTS.get(conn.dialect.name)
+            if dialect_insert is not None:
+                # Another worker may be inserting the same string
+                conn.execute(dialect_insert(table).on_conflict_do_nothing(index_elements=["digest"]), new)
+            else:
+                conn.execute(insert(table), new)
+            ids.update(conn.execute(lookup).all())
+        return ids
+
+    def _write(self, batch):
+        if self.dropped:
+            self._app.logger.warning("Usage tracking queue was full; dropped %d events", self.dropped)
+            self.dropped = 0
+        retry, self._retry = self._retry, []
+        retried_counts, self._retried_counts = self._retried_counts, Counter()
+        with self._counts_lock:
+            counts, self._counts = self._counts, Counter()
+        items = retry + batch
+        if not items and not counts:
+            return
+        agent_ids = {}
+        try:
+            with self._app.app_context():
+                with db.engine.begin() as conn:
+                    if items:
+                        agent_ids = self._agent_ids_for(conn, {row["user_agent"] for row, _ in items})
+                        events = []
+                        for row, _ in items:
+                            event = dict(row)
+                            agent = event.pop("user_agent")
+                            event["user_agent_id"] = agent_ids[user_agent_digest(agent)] if agent else None
+                            events.append(event)
+                        conn.execute(insert(UserActivity.__table__).values(events))
+                    record_daily_counts(conn, counts + daily_counts(row for row, counted in items if not counted))
+            # Only ids of committed rows are remembered
+            if len(self._agent_ids) + len(agent_ids) > USER_AGENT_CACHE_SIZE:
+                self._agent_ids = {}
+            self._agent_ids.update(agent_ids)
+        except Exception:
+            # Log error but don't break the application; what failed twice is dropped
+            fresh_counts = counts - retried_counts
+            with self._counts_lock:
+                self._counts.update(fresh_counts)
+            self._retry, self._retried_counts = batch, fresh_counts
+            self._app.logger.exception(
+                "Error writing %d user activities (%d counted); retrying %d (%d counted) with the next batch",
+                len(items), sum(counts.values()), len(batch), sum(fresh_counts.values()),
+            )
+            if retry or retried_counts:
+                self._app.logger.error(
+                    "Dropped %d user activities (%d counted) that already failed once",
+                    len(retry), sum((counts - fresh_counts).values()),
+                )
+
+
+def user_agent_digest(user_agent):
+    """SHA-1 of a User-Agent string, its key in user_agents."""
+    return hashlib.sha1(user_agent.encode("utf-8")).hexdigest()
+
+
+usage_writer = UsageWriter()
+atexit.register(usage_writer.close)
 
 
 def log_user_activity(action, resource_type=None, resource_id=None, details=None):
-    """Log a user activity to the database.
+    """Queue a user activity for the background writer, as its tracking policy says.
     
     Args:
         action: The action performed (e.g., "login", "view_activities", "create_activity")
@@ -21,27 +307,32 @@ def log_user_activity(action, resource_type=None, resource_id=None, details=None
     if not user_id:
         return  # Don't log if user is not logged in
     
+    mode, rate = tracking_policy(action)
     try:
-        activity = UserActivity(
-            user_id=user_id,
-            action=action,
-            resource_type=resource_type,
-            resource_id=resource_id,
-            details=details,
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get("User-Agent"),
-            timestamp=datetime.utcnow()
-        )
-        db.session.add(activity)
-        db.session.commit()
-    except Exception as e:
+        timestamp = datetime.utcnow()
+        if mode != ALWAYS:
+            usage_writer.count(timestamp.date(), user_id, action)
+            if mode == COUNT or random.random() >= rate:
+                return
+        usage_writer.put({
+            "user_id": user_id,
+            "action": action,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "details": details,
+            "ip_address": request.remote_addr,
+            "user_agent": request.headers.get("User-Agent"),
+            "timestamp": timestamp,
+        }, counted=mode == SAMPLE)
+    except Exception:
         # Log error but don't break the application
-        print(f"Error logging user activity: {e}")
-        db.session.rollback()
+        current_app.logger.exception("Error logging user activity")
 
 
 def track_activity(action, resource_type=None):
     """Decorator to automatically track user activity for a route.
+
+    The action's tracking policy applies, as for log_user_activity().
     
     Usage:
         @activity_bp.route("/activity/new")